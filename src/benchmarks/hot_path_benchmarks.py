@@ -0,0 +1,361 @@
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import path
+from resource import RUSAGE_SELF, getrusage
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from hydra import compose, initialize
+from omegaconf import DictConfig
+
+from benchmarks.synthetic_corpus import (
+    HEADING_STYLES,
+    REFERENCE_STYLES,
+    SyntheticCorpusGenerator,
+)
+from data.corpus_reader import Corpus_Reader
+from data.paper_preprocessor import PaperContents
+
+BENCHMARK_NAMES = [
+    "read-papers",
+    "find-semantic-section",
+    "find-first-reference",
+    "cleaned-papers-generator",
+    "text-classification-reader",
+    "text-classification-reader-uncached",
+    "trainer-epoch",
+    "trainer-epoch-uncached",
+]
+
+
+def compose_benchmark_config(data_config: str, overrides: List[str]) -> DictConfig:
+    with initialize(config_path="../config"):
+        return compose(
+            config_name="config.yaml", overrides=[f"data={data_config}"] + overrides
+        )
+
+
+def read_dataset_papers(corpus_reader: Corpus_Reader) -> List[PaperContents]:
+    # Only papers of at least MIN_MAPPED_FILE_BYTES keep an open map, the papers
+    # held by the detection benchmarks are read into memory otherwise.
+    return [
+        corpus_reader.read_paper_folder_contents(
+            corpus_reader.cfg["data_path"], paper_id
+        )
+        for paper_id in corpus_reader.get_paper_folder_ids(
+            corpus_reader.cfg["data_path"]
+        )
+    ]
+
+
+class HotPathBenchmarks:
+    # Every benchmark prepares its inputs and returns a function processing the
+    # dataset once, which returns the number of papers it processed.
+    def __init__(self, corpus_path: str, output_path: str, overrides: List[str]):
+        self.corpus_path = corpus_path
+        self.output_path = output_path
+        self.overrides = overrides
+
+    def __call__(self, benchmark_name: str, repetitions: int) -> Dict:
+        if benchmark_name == "read-papers":
+            run_benchmark = self.create_read_papers_benchmark()
+        elif benchmark_name == "find-semantic-section":
+            run_benchmark = self.create_find_semantic_section_benchmark()
+        elif benchmark_name == "find-first-reference":
+            run_benchmark = self.create_find_first_reference_benchmark()
+        elif benchmark_name == "cleaned-papers-generator":
+            run_benchmark = self.create_cleaned_papers_generator_benchmark()
+        elif benchmark_name == "text-classification-reader":
+            run_benchmark = self.create_text_classification_reader_benchmark(True)
+        elif benchmark_name == "text-classification-reader-uncached":
+            run_benchmark = self.create_text_classification_reader_benchmark(False)
+        elif benchmark_name == "trainer-epoch":
+            run_benchmark = self.create_trainer_epoch_benchmark(True)
+        elif benchmark_name == "trainer-epoch-uncached":
+            run_benchmark = self.create_trainer_epoch_benchmark(False)
+        else:
+            raise NotImplementedError(f"Benchmark {benchmark_name} not supported!")
+        # The warmup pass builds the dataset index and feature cache of the readers,
+        # the cached benchmarks then time memmap reads and the uncached ones time the
+        # featurization of every paper.
+        run_benchmark()
+        run_times = []
+        for _ in range(repetitions):
+            start_time = perf_counter()
+            num_papers = run_benchmark()
+            run_times.append(perf_counter() - start_time)
+        return {
+            "benchmark": benchmark_name,
+            "num_papers": num_papers,
+            "seconds": min(run_times),
+            "papers_per_second": num_papers / min(run_times),
+        }
+
+    def create_exploration_corpus_reader(self) -> Corpus_Reader:
+        cfg = compose_benchmark_config(
+            "exploration",
+            [f"data.data_path={path.join(self.corpus_path, 'train')}"] + self.overrides,
+        )
+        return Corpus_Reader(**cfg.data)
+
+    def create_read_papers_benchmark(self) -> Callable[[], int]:
+        corpus_reader = self.create_exploration_corpus_reader()
+
+        def run_benchmark() -> int:
+            dataset_path = corpus_reader.cfg["data_path"]
+            paper_ids = corpus_reader.get_paper_folder_ids(dataset_path)
+            for paper_id in paper_ids:
+                corpus_reader.close_paper_contents(
+                    corpus_reader.read_paper_folder_contents(dataset_path, paper_id)
+                )
+            return len(paper_ids)
+
+        return run_benchmark
+
+    def create_find_semantic_section_benchmark(self) -> Callable[[], int]:
+        corpus_reader = self.create_exploration_corpus_reader()
+        papers_contents = read_dataset_papers(corpus_reader)
+
+        def run_benchmark() -> int:
+            for paper_contents in papers_contents:
+                for section_type in corpus_reader.paper_semantic_keywords_dict:
+                    try:
+                        corpus_reader.find_semantic_section_in_paper(
+                            paper_contents, section_type, True
+                        )
+                    except AssertionError:
+                        # Section not found in this paper.
+                        pass
+            return len(papers_contents)
+
+        return run_benchmark
+
+    def create_find_first_reference_benchmark(self) -> Callable[[], int]:
+        corpus_reader = self.create_exploration_corpus_reader()
+        papers_contents = read_dataset_papers(corpus_reader)
+
+        def run_benchmark() -> int:
+            for paper_contents in papers_contents:
+                corpus_reader.find_first_reference_in_paper(paper_contents)
+            return len(papers_contents)
+
+        return run_benchmark
+
+    def create_cleaned_papers_generator_benchmark(self) -> Callable[[], int]:
+        from main_operation_modes.generate_cleaned_papers import (
+            CleanedPapersGenerator,
+        )
+
+        cfg = compose_benchmark_config(
+            "paper_cleanup",
+            [
+                f"data.data_path={path.join(self.corpus_path, 'train')}",
+                f"data.cleanup_processing.output_path={path.join(self.output_path, 'cleaned')}",
+                # Every pass cleans the whole dataset again.
+                "data.cleanup_processing.resume_from_manifest=false",
+            ]
+            + self.overrides,
+        )
+        corpus_reader = Corpus_Reader(**cfg.data)
+        cleaned_papers_generator = CleanedPapersGenerator(cfg)
+
+        def run_benchmark() -> int:
+            cleaned_papers_generator(corpus_reader)
+            return len(corpus_reader.get_paper_folder_ids(cfg.data.data_path))
+
+        return run_benchmark
+
+    def compose_experiment_config(self, feature_cache_enabled: bool) -> DictConfig:
+        return compose_benchmark_config(
+            "experiments",
+            [
+                f"data.data_path={self.corpus_path}",
+                f"data.feature_cache.enabled={str(feature_cache_enabled).lower()}",
+                f"data.feature_cache.cache_dir={path.join(self.output_path, 'feature_cache')}",
+                f"data.dataset_index.index_dir={path.join(self.output_path, 'dataset_index')}",
+            ]
+            + self.overrides,
+        )
+
+    def create_text_classification_reader_benchmark(
+        self, feature_cache_enabled: bool
+    ) -> Callable[[], int]:
+        from data.experiment_corpus_readers import SklearnTextClassificationReader
+
+        cfg = self.compose_experiment_config(feature_cache_enabled)
+        train_reader = SklearnTextClassificationReader(
+            cfg.data, "train", cfg.experiment_seed
+        )
+
+        def run_benchmark() -> int:
+            for _ in train_reader:
+                pass
+            return train_reader.epoch_stats["num_papers"]
+
+        return run_benchmark
+
+    def create_trainer_epoch_benchmark(
+        self, feature_cache_enabled: bool
+    ) -> Callable[[], int]:
+        import mlflow
+        from trainer.trainer import TextClassificationTrainer
+
+        cfg = self.compose_experiment_config(feature_cache_enabled)
+        text_classification_trainer = TextClassificationTrainer(cfg)
+        # The epoch logs its reader stats to an mlflow run.
+        mlflow.set_tracking_uri(f"file://{path.join(self.output_path, 'mlruns')}")
+
+        def run_benchmark() -> int:
+            with mlflow.start_run():
+                text_classification_trainer.run_sklearn_training_epoch(
+                    text_classification_trainer.train_reader
+                )
+            return text_classification_trainer.train_reader.epoch_stats["num_papers"]
+
+        return run_benchmark
+
+
+def run_benchmark_in_process(
+    corpus_path: str,
+    output_path: str,
+    overrides: List[str],
+    benchmark_name: str,
+    repetitions: int,
+) -> Dict:
+    benchmark_result = HotPathBenchmarks(corpus_path, output_path, overrides)(
+        benchmark_name, repetitions
+    )
+    # ru_maxrss is in kilobytes on linux and in bytes on macos.
+    peak_memory = getrusage(RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_memory *= 1024
+    benchmark_result["peak_memory_mb"] = peak_memory / (1 << 20)
+    return benchmark_result
+
+
+def run_benchmark_in_fresh_process(
+    corpus_path: str,
+    output_path: str,
+    overrides: List[str],
+    benchmark_name: str,
+    repetitions: int,
+) -> Dict:
+    # A fresh interpreter per benchmark keeps the imports and caches of one benchmark
+    # out of the timings and peak memory of the others. Tracing allocations with
+    # tracemalloc would slow the sparse feature scaling down by an order of
+    # magnitude, the peak resident memory of the process is reported instead.
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=get_context("spawn")
+    ) as executor:
+        return executor.submit(
+            run_benchmark_in_process,
+            corpus_path,
+            output_path,
+            overrides,
+            benchmark_name,
+            repetitions,
+        ).result()
+
+
+def format_benchmark_report(
+    benchmark_results: List[Dict], corpus_description: str
+) -> str:
+    report_lines = [
+        f"Hot path benchmarks on {corpus_description}, python {sys.version.split()[0]}",
+        "",
+        f"{'benchmark':<38}{'papers':>8}{'seconds':>10}{'papers/s':>12}{'peak MB':>10}",
+    ]
+    for benchmark_result in benchmark_results:
+        report_lines.append(
+            f"{benchmark_result['benchmark']:<38}"
+            f"{benchmark_result['num_papers']:>8}"
+            f"{benchmark_result['seconds']:>10.3f}"
+            f"{benchmark_result['papers_per_second']:>12.1f}"
+            f"{benchmark_result['peak_memory_mb']:>10.1f}"
+        )
+    return "\n".join(report_lines) + "\n"
+
+
+if __name__ == "__main__":
+    argument_parser = ArgumentParser(
+        description="Papers per second and peak memory of the corpus reading, detection, featurization and training hot paths on a synthetic corpus."
+    )
+    argument_parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        choices=BENCHMARK_NAMES,
+        help="Benchmarks to run, defaults to all of them.",
+    )
+    argument_parser.add_argument("--repetitions", type=int, default=3)
+    argument_parser.add_argument(
+        "--corpus-path",
+        help="Existing corpus with train and valid splits, a synthetic corpus is generated otherwise.",
+    )
+    argument_parser.add_argument(
+        "--categories", nargs="+", default=["astrophysics", "economics", "robotics"]
+    )
+    argument_parser.add_argument("--train-papers-per-category", type=int, default=30)
+    argument_parser.add_argument("--valid-papers-per-category", type=int, default=10)
+    argument_parser.add_argument("--min-paper-lines", type=int, default=200)
+    argument_parser.add_argument("--max-paper-lines", type=int, default=800)
+    argument_parser.add_argument(
+        "--heading-styles", nargs="+", choices=HEADING_STYLES, default=HEADING_STYLES
+    )
+    argument_parser.add_argument(
+        "--reference-styles",
+        nargs="+",
+        choices=REFERENCE_STYLES,
+        default=REFERENCE_STYLES,
+    )
+    argument_parser.add_argument("--seed", type=int, default=43)
+    argument_parser.add_argument(
+        "--overrides",
+        nargs="*",
+        default=[],
+        help="Hydra overrides applied to every benchmark config, e.g. data.paper_contents_backend=list.",
+    )
+    argument_parser.add_argument(
+        "--report-path", help="Also write the report to this file."
+    )
+    arguments = argument_parser.parse_args()
+    with TemporaryDirectory() as temporary_path:
+        if arguments.corpus_path:
+            corpus_path = arguments.corpus_path
+            corpus_description = corpus_path
+        else:
+            corpus_path = SyntheticCorpusGenerator(
+                arguments.categories,
+                {
+                    "train": arguments.train_papers_per_category,
+                    "valid": arguments.valid_papers_per_category,
+                },
+                (arguments.min_paper_lines, arguments.max_paper_lines),
+                arguments.heading_styles,
+                arguments.reference_styles,
+                seed=arguments.seed,
+            )(path.join(temporary_path, "corpus"))
+            corpus_description = (
+                f"a synthetic corpus of {len(arguments.categories)} categories x "
+                f"{arguments.train_papers_per_category} train papers of "
+                f"{arguments.min_paper_lines}-{arguments.max_paper_lines} lines"
+            )
+        benchmark_results = [
+            run_benchmark_in_fresh_process(
+                corpus_path,
+                path.join(temporary_path, "outputs"),
+                arguments.overrides,
+                benchmark_name,
+                arguments.repetitions,
+            )
+            for benchmark_name in arguments.benchmarks or BENCHMARK_NAMES
+        ]
+    if arguments.overrides:
+        corpus_description += f" with overrides {' '.join(arguments.overrides)}"
+    benchmark_report = format_benchmark_report(benchmark_results, corpus_description)
+    print(benchmark_report, end="")
+    if arguments.report_path:
+        with open(arguments.report_path, "w") as report_file:
+            report_file.write(benchmark_report)
@@ -0,0 +1,144 @@
+import subprocess
+import sys
+from argparse import ArgumentParser
+from os import path
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+SOURCE_ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+# Modules main.py imports for every operation mode.
+OPERATION_MODE_MODULES = {
+    "exploration": "main_operation_modes.exploration",
+    "paper-cleanup": "main_operation_modes.paper_cleanup",
+    "experiment": "main_operation_modes.experiments",
+    "inference": "main_operation_modes.inference",
+    "prediction-server": "main_operation_modes.prediction_server",
+}
+
+
+def run_import_time_trace(imported_modules: List[str]) -> Tuple[float, str]:
+    # Wall clock time of a fresh interpreter importing the modules, and its
+    # python -X importtime trace.
+    start_time = perf_counter()
+    completed_process = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import {', '.join(imported_modules)}",
+        ],
+        cwd=SOURCE_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return perf_counter() - start_time, completed_process.stderr
+
+
+def parse_import_time_trace(
+    import_time_trace: str,
+) -> List[Tuple[str, int, int, int]]:
+    # (module name, nesting depth, self and cumulative microseconds) of every traced
+    # import.
+    traced_imports = []
+    for trace_line in import_time_trace.splitlines():
+        if not trace_line.startswith("import time:"):
+            continue
+        self_time, cumulative_time, module_field = trace_line[
+            len("import time:") :
+        ].split("|", 2)
+        if not cumulative_time.strip().isdigit():
+            # Header line of the trace.
+            continue
+        module_name = module_field[1:].rstrip()
+        nesting_depth = (len(module_name) - len(module_name.lstrip())) // 2
+        traced_imports.append(
+            (module_name.strip(), nesting_depth, int(self_time), int(cumulative_time))
+        )
+    return traced_imports
+
+
+def find_heaviest_packages(
+    traced_imports: List[Tuple[str, int, int, int]], package_count: int
+) -> List[Tuple[str, int]]:
+    # Own import time of the modules of every root package, wherever they are
+    # imported from.
+    package_times: Dict[str, int] = {}
+    for module_name, _, self_time, _ in traced_imports:
+        package_name = module_name.split(".")[0]
+        package_times[package_name] = package_times.get(package_name, 0) + self_time
+    return sorted(package_times.items(), key=lambda item: item[1], reverse=True)[
+        :package_count
+    ]
+
+
+def benchmark_operation_mode_startup(
+    operation_mode: str, repetitions: int, package_count: int
+) -> Dict:
+    imported_modules = ["main", OPERATION_MODE_MODULES[operation_mode]]
+    # The fastest repetition is the least disturbed by the rest of the machine.
+    startup_runs = [run_import_time_trace(imported_modules) for _ in range(repetitions)]
+    wall_time, import_time_trace = min(startup_runs, key=lambda run: run[0])
+    traced_imports = parse_import_time_trace(import_time_trace)
+    return {
+        "operation_mode": operation_mode,
+        "wall_time": wall_time,
+        "import_time": sum(
+            cumulative_time
+            for _, nesting_depth, _, cumulative_time in traced_imports
+            if nesting_depth == 0
+        )
+        / 1e6,
+        "heaviest_packages": find_heaviest_packages(traced_imports, package_count),
+    }
+
+
+def format_startup_report(startup_benchmarks: List[Dict]) -> str:
+    report_lines = [
+        f"Startup time per operation mode, python {sys.version.split()[0]}",
+        "",
+        f"{'mode':<20}{'wall (s)':>10}{'imports (s)':>13}  heaviest packages (s)",
+    ]
+    for startup_benchmark in startup_benchmarks:
+        heaviest_packages = ", ".join(
+            f"{package_name} {package_time / 1e6:.3f}"
+            for package_name, package_time in startup_benchmark["heaviest_packages"]
+        )
+        report_lines.append(
+            f"{startup_benchmark['operation_mode']:<20}"
+            f"{startup_benchmark['wall_time']:>10.3f}"
+            f"{startup_benchmark['import_time']:>13.3f}  {heaviest_packages}"
+        )
+    return "\n".join(report_lines) + "\n"
+
+
+if __name__ == "__main__":
+    argument_parser = ArgumentParser(
+        description="python -X importtime report of the startup of every operation mode."
+    )
+    argument_parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(OPERATION_MODE_MODULES),
+        default=list(OPERATION_MODE_MODULES),
+    )
+    argument_parser.add_argument("--repetitions", type=int, default=5)
+    argument_parser.add_argument("--package-count", type=int, default=4)
+    argument_parser.add_argument(
+        "--report-path", help="Also write the report to this file."
+    )
+    arguments = argument_parser.parse_args()
+    startup_report = format_startup_report(
+        [
+            benchmark_operation_mode_startup(
+                operation_mode, arguments.repetitions, arguments.package_count
+            )
+            for operation_mode in arguments.modes
+        ]
+    )
+    print(startup_report, end="")
+    if arguments.report_path:
+        with open(arguments.report_path, "w") as report_file:
+            report_file.write(startup_report)
@@ -0,0 +1,199 @@
+import random
+from os import makedirs, path
+from typing import Dict, List, Tuple
+
+BODY_WORDS = [
+    "we",
+    "the",
+    "a",
+    "of",
+    "in",
+    "and",
+    "model",
+    "data",
+    "theory",
+    "network",
+    "market",
+    "galaxy",
+    "energy",
+    "cell",
+    "robot",
+    "results",
+    "method",
+    "distribution",
+    "observations",
+    "proposed",
+]
+
+SECTION_NAMES = {
+    "intro": ["Introduction", "Background", "Overview"],
+    "body": ["Related work", "Methods", "Experimental setup", "Results"],
+    "conc": ["Conclusion", "Discussion", "Discussion and results"],
+    "acknow": ["Acknowledgements"],
+    "refer": ["References", "Bibliography", "Literature"],
+}
+
+HEADING_STYLES = ["numbered", "upper", "roman", "plain"]
+
+# bracketed: [1] A. Author..., numbered: 1 A. Author..., none: no reference list.
+REFERENCE_STYLES = ["bracketed", "numbered", "none"]
+
+ROMAN_NUMERALS = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X"]
+
+
+class SyntheticCorpusGenerator:
+    # Writes an arXiv like dataset in the layout read by Corpus_Reader and
+    # SklearnTextClassificationReader: <corpus_path>/<split>/<category>_<n>/ with the
+    # raw paper.txt and the processed_paper.txt left by the paper cleanup mode.
+    def __init__(
+        self,
+        categories: List[str],
+        papers_per_category: Dict[str, int],
+        paper_lines: Tuple[int, int],
+        heading_styles: List[str] = HEADING_STYLES,
+        reference_styles: List[str] = REFERENCE_STYLES,
+        references_per_paper: Tuple[int, int] = (10, 40),
+        seed: int = 43,
+    ):
+        for heading_style in heading_styles:
+            if heading_style not in HEADING_STYLES:
+                raise NotImplementedError(
+                    f"Heading style {heading_style} not supported!"
+                )
+        for reference_style in reference_styles:
+            if reference_style not in REFERENCE_STYLES:
+                raise NotImplementedError(
+                    f"Reference style {reference_style} not supported!"
+                )
+        self.categories = categories
+        self.papers_per_category = papers_per_category
+        self.paper_lines = paper_lines
+        self.heading_styles = heading_styles
+        self.reference_styles = reference_styles
+        self.references_per_paper = references_per_paper
+        self.seed = seed
+
+    def __call__(self, corpus_path: str) -> str:
+        random_generator = random.Random(self.seed)
+        for dataset_type, num_papers in self.papers_per_category.items():
+            for category in self.categories:
+                for paper_number in range(num_papers):
+                    self.write_paper(
+                        path.join(corpus_path, dataset_type),
+                        f"{category}_{paper_number}",
+                        self.generate_paper_lines(random_generator),
+                    )
+        return corpus_path
+
+    def generate_paper_lines(
+        self, random_generator: random.Random
+    ) -> Tuple[List[str], int]:
+        # Lines of a paper and the index of its first reference line, the paper
+        # length is the length of the body without the reference list.
+        heading_style = random_generator.choice(self.heading_styles)
+        reference_style = random_generator.choice(self.reference_styles)
+        num_body_lines = random_generator.randint(*self.paper_lines)
+        section_types = ["intro"] + ["body"] * random_generator.randint(1, 3)
+        section_types += ["conc", "acknow"]
+        lines_per_section = max(num_body_lines // len(section_types), 1)
+        paper_lines = [self.generate_sentence(random_generator, 2, 6) + "\n", "\n"]
+        for section_number, section_type in enumerate(section_types, start=1):
+            paper_lines.append(
+                self.format_heading(
+                    random_generator.choice(SECTION_NAMES[section_type]),
+                    section_number,
+                    heading_style,
+                )
+            )
+            paper_lines.extend(
+                self.generate_body_line(random_generator)
+                for _ in range(lines_per_section)
+            )
+        references_start = len(paper_lines)
+        if reference_style != "none":
+            paper_lines.append(
+                self.format_heading(
+                    random_generator.choice(SECTION_NAMES["refer"]),
+                    len(section_types) + 1,
+                    heading_style,
+                )
+            )
+            for reference_number in range(
+                1, random_generator.randint(*self.references_per_paper) + 1
+            ):
+                paper_lines.append(
+                    self.generate_reference_line(
+                        random_generator, reference_number, reference_style
+                    )
+                )
+        return paper_lines, references_start
+
+    def format_heading(
+        self, section_name: str, section_number: int, heading_style: str
+    ) -> str:
+        if heading_style == "numbered":
+            return f"{section_number} {section_name}\n"
+        elif heading_style == "upper":
+            return f"{section_name.upper()}\n"
+        elif heading_style == "roman":
+            roman_numeral = ROMAN_NUMERALS[(section_number - 1) % len(ROMAN_NUMERALS)]
+            return f"{roman_numeral}. {section_name.upper()}\n"
+        return f"{section_name}\n"
+
+    def generate_body_line(self, random_generator: random.Random) -> str:
+        # Mostly full lines, with short fragments for the token count filter and
+        # hyphenated line breaks joined back by the paper cleanup.
+        line_kind = random_generator.random()
+        if line_kind < 0.1:
+            return self.generate_sentence(random_generator, 1, 3) + "\n"
+        elif line_kind < 0.15:
+            return self.generate_sentence(random_generator, 4, 10) + " experi-\n"
+        return self.generate_sentence(random_generator, 6, 16) + "\n"
+
+    def generate_reference_line(
+        self,
+        random_generator: random.Random,
+        reference_number: int,
+        reference_style: str,
+    ) -> str:
+        author_initial = chr(ord("A") + random_generator.randrange(26))
+        reference_text = (
+            f"{author_initial}. Author, {self.generate_sentence(random_generator, 3, 8)}"
+            f" ({random_generator.randint(1950, 2021)})."
+        )
+        if reference_style == "bracketed":
+            return f"[{reference_number}] {reference_text}\n"
+        return f"{reference_number} {reference_text}\n"
+
+    def generate_sentence(
+        self, random_generator: random.Random, min_words: int, max_words: int
+    ) -> str:
+        return " ".join(
+            random_generator.choices(
+                BODY_WORDS, k=random_generator.randint(min_words, max_words)
+            )
+        )
+
+    def write_paper(
+        self,
+        dataset_path: str,
+        paper_id: str,
+        paper_info: Tuple[List[str], int],
+    ) -> None:
+        paper_lines, references_start = paper_info
+        paper_folder = path.join(dataset_path, paper_id)
+        makedirs(paper_folder, exist_ok=True)
+        with open(path.join(paper_folder, "paper.txt"), "w") as file_object:
+            file_object.write("".join(paper_lines))
+        # Same joining as CleanedPapersGenerator, without the reference list.
+        processed_contents = "".join(
+            (
+                current_line.replace("-\n", "")
+                if current_line.endswith("-\n")
+                else current_line.replace("\n", " ")
+            )
+            for current_line in paper_lines[:references_start]
+        )
+        with open(path.join(paper_folder, "processed_paper.txt"), "w") as file_object:
+            file_object.write(processed_contents)
+        return
@@ -1,10 +1,10 @@
-from os import listdir
 from posixpath import join
 from typing import Any, Dict, Generator, List, Tuple, Union
 from os.path import isfile, isdir
-from data.paper_preprocessor import Paper_Preprocessor
-from utils.dataset_utils import get_all_classes_for_text_classification
-import textdistance
+from data.dataset_index import DatasetIndex
+from data.mapped_paper import MappedPaper
+from data.paper_preprocessor import PaperContents, Paper_Preprocessor
+from utils.text_distance_utils import reaches_levenshtein_similarity_threshold
 import re
 
 
@@ -28,9 +28,13 @@ class Corpus_Reader(object):
             "refer": ["references", "literature", "bibliography"],
             "acknow": ["acknowledgements"],
         }
-        self.keyword_similarity_criterion = (
-            textdistance.levenshtein.normalized_similarity
-        )
+        # Thresholded textdistance levenshtein normalized similarity with identical
+        # decisions, textdistance itself is not imported at startup.
+        self.keyword_similarity_check = reaches_levenshtein_similarity_threshold
+        # Dataset indexes by data path, the categories and the paper generator
+        # share a single listdir of the dataset directory. Raw partitions are listed
+        # once per run, their indexes are kept in memory only.
+        self.dataset_indexes_by_path = {}
         if isdir(self.cfg["data_path"]):
             # Precompute all the corpus labels.
             self.paper_categories = self.find_all_paper_categories(
@@ -54,11 +58,11 @@ class Corpus_Reader(object):
         return self.paper_categories
 
     def find_all_paper_categories(self, data_path: str):
-        return get_all_classes_for_text_classification(data_path)
+        return self.get_dataset_index(data_path).categories
 
     def __call__(self):
         raw_contents = self.open_contents_from_data_path(self.cfg["data_path"])
-        if type(raw_contents) == list:
+        if isinstance(raw_contents, (list, MappedPaper)):
             if hasattr(self, "paper_contents_processor"):
                 filtered_contents = self.paper_contents_processor(raw_contents)
                 return filtered_contents
@@ -140,47 +144,68 @@ class Corpus_Reader(object):
         section_type: str,
         attempt_resolution: bool = False,
     ) -> List[Tuple[str, str, int]]:
-        keyword_tuples = []
-        for index_paper, current_line in enumerate(paper_contents):
-            normalized_line = current_line.strip().lower()
-            normalized_line = self.section_numbering_regex.sub("", normalized_line)
-            semantic_section_keywords = self.paper_semantic_keywords[section_type]
-            for section_keyword in semantic_section_keywords:
-                if (
-                    self.keyword_similarity_criterion(normalized_line, section_keyword)
-                    >= self.cfg["textdistance_config"]["similarity_threshold"]
-                ):
-                    if (index_paper / len(paper_contents)) < self.cfg[
-                        "textdistance_config"
-                    ]["selection_threshold_max_bound_pointer"]:
-                        keyword_tuples.append(
-                            (current_line, section_keyword, index_paper)
-                        )
+        keyword_tuples = self.find_semantic_sections_in_paper(
+            paper_contents, [section_type]
+        )[section_type]
         assert (
             len(keyword_tuples) != 0
         ), f"This lookup returned no semantic section for section type: {section_type}!"
         # For multiple entries, try out idea of returning the earliest index for that
         # section type.
         if attempt_resolution and len(keyword_tuples) > 1:
-            first_attempt_tuples = self.select_semantic_section_tuple_from_choices(
+            return self.resolve_semantic_section_tuples(
+                keyword_tuples, len(paper_contents)
+            )
+        else:
+            return keyword_tuples
+
+    def find_semantic_sections_in_paper(
+        self, paper_contents: List[str], section_types: List[str]
+    ) -> Dict[str, List[Tuple[str, str, int]]]:
+        # Scans the paper once for all section types, normalizing every line a single
+        # time. Section types without a match map to an empty list.
+        sections_keyword_tuples = {section_type: [] for section_type in section_types}
+        similarity_threshold = self.cfg["textdistance_config"]["similarity_threshold"]
+        max_bound_pointer = self.cfg["textdistance_config"][
+            "selection_threshold_max_bound_pointer"
+        ]
+        for index_paper, current_line in enumerate(paper_contents):
+            if (index_paper / len(paper_contents)) >= max_bound_pointer:
+                # Matches past the max bound pointer are discarded, stop comparing.
+                break
+            normalized_line = self.normalize_paper_line(current_line)
+            for section_type in section_types:
+                for section_keyword in self.paper_semantic_keywords[section_type]:
+                    if self.keyword_similarity_check(
+                        normalized_line, section_keyword, similarity_threshold
+                    ):
+                        sections_keyword_tuples[section_type].append(
+                            (current_line, section_keyword, index_paper)
+                        )
+        return sections_keyword_tuples
+
+    def normalize_paper_line(self, current_line: str) -> str:
+        normalized_line = current_line.strip().lower()
+        return self.section_numbering_regex.sub("", normalized_line)
+
+    def resolve_semantic_section_tuples(
+        self, keyword_tuples: List[Tuple[str, str, int]], paper_num_lines: int
+    ) -> List[Tuple[str, str, int]]:
+        first_attempt_tuples = self.select_semantic_section_tuple_from_choices(
+            keyword_tuples,
+            paper_num_lines,
+            self.cfg["textdistance_config"]["selection_threshold_paper_len_pointer"],
+        )
+        if len(first_attempt_tuples) == 1:
+            return first_attempt_tuples
+        else:
+            return self.select_semantic_section_tuple_from_choices(
                 keyword_tuples,
-                len(paper_contents),
+                paper_num_lines,
                 self.cfg["textdistance_config"][
-                    "selection_threshold_paper_len_pointer"
+                    "selection_threshold_paper_len_secondary"
                 ],
             )
-            if len(first_attempt_tuples) == 1:
-                return first_attempt_tuples
-            else:
-                return self.select_semantic_section_tuple_from_choices(
-                    keyword_tuples,
-                    len(paper_contents),
-                    self.cfg["textdistance_config"][
-                        "selection_threshold_paper_len_secondary"
-                    ],
-                )
-        else:
-            return keyword_tuples
 
     def select_semantic_section_tuple_from_choices(
         self,
@@ -216,7 +241,19 @@ class Corpus_Reader(object):
 
     def open_file_contents(
         self, data_path: str, file_encoding: str = "utf-8"
-    ) -> List[str]:
+    ) -> PaperContents:
+        paper_contents_backend = self.cfg.get("paper_contents_backend", "list")
+        if paper_contents_backend == "mmap" and file_encoding == "utf-8":
+            mapped_paper = MappedPaper.open(data_path, file_encoding)
+            # Line offsets only split on \n, papers with other line endings are read
+            # as a list of lines.
+            if not mapped_paper.has_carriage_returns():
+                return mapped_paper
+            mapped_paper.close()
+        elif paper_contents_backend not in {"mmap", "list"}:
+            raise NotImplementedError(
+                f"Paper contents backend {paper_contents_backend} not supported!"
+            )
         raw_file_contents = []
         with open(data_path, "r", encoding=file_encoding) as file_object:
             for current_line in file_object:
@@ -227,15 +264,43 @@ class Corpus_Reader(object):
         self, data_path: str
     ) -> Generator[Tuple[List[str], str], Any, Any]:
         # Yield the contents of one research paper at a time.
-        paper_folders = listdir(data_path)
-        for current_paper_folder in paper_folders:
-            if current_paper_folder.startswith("."):
-                continue
-            current_paper_filepath = join(data_path, current_paper_folder, "paper.txt")
-            raw_paper_contents = self.open_file_contents(current_paper_filepath)
-            if hasattr(self, "paper_contents_processor"):
-                yield self.paper_contents_processor(
-                    raw_paper_contents
-                ), current_paper_folder
-            else:
-                yield raw_paper_contents, current_paper_folder
+        # A paper is closed when the next one is read.
+        for current_paper_folder in self.get_paper_folder_ids(data_path):
+            paper_contents = self.read_paper_folder_contents(
+                data_path, current_paper_folder
+            )
+            try:
+                yield paper_contents, current_paper_folder
+            finally:
+                Corpus_Reader.close_paper_contents(paper_contents)
+
+    def get_dataset_index(self, data_path: str) -> DatasetIndex:
+        if data_path not in self.dataset_indexes_by_path:
+            self.dataset_indexes_by_path[data_path] = DatasetIndex.build(
+                data_path, "paper.txt"
+            )
+        return self.dataset_indexes_by_path[data_path]
+
+    def get_paper_folder_ids(self, data_path: str) -> List[str]:
+        return list(self.get_dataset_index(data_path).paper_ids)
+
+    @staticmethod
+    def close_paper_contents(paper_contents: PaperContents) -> None:
+        # Releases the map of mapped papers, list contents hold no file.
+        if isinstance(paper_contents, MappedPaper):
+            paper_contents.close()
+        return
+
+    def get_paper_folder_filepath(self, data_path: str, paper_folder: str) -> str:
+        return join(data_path, paper_folder, "paper.txt")
+
+    def read_paper_folder_contents(
+        self, data_path: str, paper_folder: str
+    ) -> PaperContents:
+        raw_paper_contents = self.open_file_contents(
+            self.get_paper_folder_filepath(data_path, paper_folder)
+        )
+        if hasattr(self, "paper_contents_processor"):
+            return self.paper_contents_processor(raw_paper_contents)
+        else:
+            return raw_paper_contents
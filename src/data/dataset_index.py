@@ -0,0 +1,81 @@
+from logging import getLogger
+from os import getpid, listdir, makedirs, path, replace, stat
+from typing import Dict
+
+import numpy as np
+from utils.dataset_utils import get_categories_of_paper_folders
+
+hydra_logger = getLogger(__name__)
+
+DATASET_INDEX_VERSION = 2
+
+
+class DatasetIndex:
+    # Listing of a dataset partition kept as compact numpy arrays: the paper folder
+    # ids and the sorted category names. Only the partition folder is listed, paper
+    # files are never opened or stat'ed. The index is rebuilt when the partition
+    # folder itself changes, which happens whenever paper folders are added, removed
+    # or renamed.
+    def __init__(self, index_arrays: Dict[str, np.ndarray]):
+        self.index_arrays = index_arrays
+        self.paper_ids = index_arrays["paper_ids"].tolist()
+        self.categories = index_arrays["categories"].tolist()
+
+    @property
+    def paper_filename(self) -> str:
+        return str(self.index_arrays["paper_filename"])
+
+    def get_paper_filepath(self, dataset_path: str, paper_id: str) -> str:
+        return path.join(dataset_path, paper_id, self.paper_filename)
+
+    @staticmethod
+    def load_or_build(
+        dataset_path: str, index_path: str, paper_filename: str
+    ) -> "DatasetIndex":
+        partition_mtime_ns = stat(dataset_path).st_mtime_ns
+        if path.isfile(index_path):
+            with np.load(index_path) as index_file:
+                index_arrays = dict(index_file)
+            if (
+                int(index_arrays["version"]) == DATASET_INDEX_VERSION
+                and int(index_arrays["partition_mtime_ns"]) == partition_mtime_ns
+                and str(index_arrays["paper_filename"]) == paper_filename
+            ):
+                return DatasetIndex(index_arrays)
+        hydra_logger.info(f"Building dataset index for {dataset_path} at {index_path}!")
+        dataset_index = DatasetIndex.build(dataset_path, paper_filename)
+        dataset_index.index_arrays["partition_mtime_ns"] = np.int64(partition_mtime_ns)
+        dataset_index.save(index_path)
+        return dataset_index
+
+    @staticmethod
+    def build(dataset_path: str, paper_filename: str) -> "DatasetIndex":
+        # Paper ids keep the listdir order, shuffling them with the experiment seed
+        # gives the same minibatches as shuffling the raw listing.
+        paper_ids = [
+            paper_folder
+            for paper_folder in listdir(dataset_path)
+            if not paper_folder.startswith(".")
+        ]
+        return DatasetIndex(
+            {
+                "version": np.int64(DATASET_INDEX_VERSION),
+                "paper_filename": np.array(paper_filename),
+                "paper_ids": np.array(paper_ids, dtype=str),
+                "categories": np.array(
+                    get_categories_of_paper_folders(paper_ids), dtype=str
+                ),
+            }
+        )
+
+    def save(self, index_path: str) -> None:
+        makedirs(path.dirname(index_path), exist_ok=True)
+        # Written next to the final path and moved in place, readers never see a
+        # partially written index.
+        build_path = f"{index_path}.tmp-{getpid()}.npz"
+        np.savez(build_path, **self.index_arrays)
+        replace(build_path, index_path)
+        return
+
+    def __len__(self) -> int:
+        return len(self.paper_ids)
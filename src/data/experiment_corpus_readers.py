@@ -1,19 +1,75 @@
 import logging
-from os import path, listdir
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from multiprocessing import get_context
+from os import path
+from typing import Dict, List, Optional, Tuple
 
-from utils.dataset_utils import get_all_classes_for_text_classification
+from data.dataset_index import DatasetIndex
+from data.feature_store import SklearnFeatureStore
+from data.label_vocabulary import LabelVocabulary
+from utils.dataset_utils import get_paper_folder_category
+from utils.paper_aggregation_utils import create_paper_offsets
+from utils.sentence_splitting_utils import (
+    iterate_sentences_in_file,
+    iterate_sentences_in_text,
+)
 from logging import getLogger
-import re
+from omegaconf import OmegaConf
+import numpy as np
 import random
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import HashingVectorizer
 
 hydra_logger = getLogger(__name__)
 
+# Feature extractor and sentence chunk size owned by each featurization worker
+# process, workers only hash paper files and never build a reader.
+worker_feature_extractor = None
+worker_sentence_chunk_size = None
+
+
+def initialize_featurization_worker(
+    hashing_vectorizer_params: Dict, sentence_chunk_size: int
+) -> None:
+    global worker_feature_extractor, worker_sentence_chunk_size
+    worker_feature_extractor = HashingVectorizer(**hashing_vectorizer_params)
+    worker_sentence_chunk_size = sentence_chunk_size
+    return
+
+
+def featurize_paper_in_worker(paper_filepath: str) -> csr_matrix:
+    return featurize_paper_file(
+        paper_filepath, worker_feature_extractor, worker_sentence_chunk_size
+    )
+
+
+def featurize_paper_file(
+    paper_filepath: str,
+    feature_extractor: HashingVectorizer,
+    sentence_chunk_size: int,
+) -> csr_matrix:
+    # Sentences are hashed as they are read, the paper is never fully in memory.
+    with open(paper_filepath, "r") as file_object:
+        paper_sentences = iterate_sentences_in_file(file_object, sentence_chunk_size)
+        first_sentence = next(paper_sentences, None)
+        if first_sentence is None:
+            # transform fails on an empty iterable, papers without sentences
+            # have no feature rows.
+            return csr_matrix(
+                (0, feature_extractor.n_features), dtype=feature_extractor.dtype
+            )
+        return feature_extractor.transform(chain([first_sentence], paper_sentences))
+
 
 class SklearnTextClassificationReader:
     def __init__(
-        self, reader_cfg: Dict, dataset_type: str, experiment_seed: Optional[int] = None
+        self,
+        reader_cfg: Dict,
+        dataset_type: str,
+        experiment_seed: Optional[int] = None,
+        label_vocabulary: Optional[LabelVocabulary] = None,
     ):
         if not path.exists(path.join(reader_cfg.data_path, dataset_type)):
             raise RuntimeError(
@@ -23,52 +79,402 @@ class SklearnTextClassificationReader:
         self.experiment_seed = experiment_seed
         self.dataset_type = dataset_type
         self.dataset_path = path.join(self.reader_cfg.data_path, self.dataset_type)
-        self.paper_categories = get_all_classes_for_text_classification(
-            self.dataset_path
+        # Characters read at a time when streaming the sentences of a paper.
+        self.sentence_chunk_size = 1 << 16
+        self.dataset_index = DatasetIndex.load_or_build(
+            self.dataset_path,
+            self.get_dataset_index_path(),
+            "processed_paper.txt",
         )
-        self.punctuation_regex = re.compile("[.!?]")
+        self.label_vocabulary = label_vocabulary or self.create_label_vocabulary()
+        self.paper_categories = self.label_vocabulary.labels
         self.feature_extractor = HashingVectorizer(
             **self.reader_cfg.sklearn_feature_extraction.hashing_vectorizer
         )
+        self.feature_store = None
+        self.featurization_pool = None
+        self.pending_papers_per_worker = 4
+        self.reset_epoch_stats()
 
     @property
     def labels(self):
         return self.paper_categories
 
     def __iter__(self):
-        dataset_paper_ids = listdir(self.dataset_path)
-        if self.experiment_seed:
-            self.shuffle_papers(self.experiment_seed, dataset_paper_ids)
-        minibatch_counter = 0
-        minibatch_papers = []
-        minibatch_labels = []
+        self.reset_epoch_stats()
+        if self.reader_cfg.batch_budget.unit != "papers":
+            minibatches = self.iterate_budgeted_minibatches()
+        elif self.reader_cfg.feature_cache.enabled:
+            minibatches = self.iterate_feature_store_minibatches()
+        else:
+            minibatches = self.iterate_raw_paper_minibatches()
+        for minibatch in minibatches:
+            self.record_minibatch_stats(minibatch)
+            yield minibatch
+
+    def reset_epoch_stats(self) -> None:
+        # Exact amount of data read during the current pass over the dataset.
+        self.epoch_stats = {
+            "num_minibatches": 0,
+            "num_papers": 0,
+            "num_sentences": 0,
+            "num_nonzeros": 0,
+            "num_skipped_papers": 0,
+        }
+        self.last_counted_paper_id = None
+        return
+
+    def record_minibatch_stats(self, minibatch: Tuple) -> None:
+        minibatch_features, _, minibatch_paper_ids, _ = minibatch
+        self.epoch_stats["num_minibatches"] += 1
+        self.epoch_stats["num_sentences"] += minibatch_features.shape[0]
+        self.epoch_stats["num_nonzeros"] += minibatch_features.nnz
+        for paper_id in minibatch_paper_ids:
+            # Chunks of a paper split by the batch budget are counted once.
+            if paper_id != self.last_counted_paper_id:
+                self.epoch_stats["num_papers"] += 1
+            self.last_counted_paper_id = paper_id
+        return
+
+    def iterate_budgeted_minibatches(self):
+        # Packs whole papers into minibatches of at most max_units_per_batch sentences
+        # or hashed non zeros. Papers above the budget are split into row chunks,
+        # each chunk is reported with the paper id and offsets of its paper.
+        budget_unit = self.reader_cfg.batch_budget.unit
+        if budget_unit not in {"sentences", "nonzeros"}:
+            raise NotImplementedError(
+                f"Minibatch budget unit {budget_unit} is not supported!"
+            )
+        max_units_per_batch = self.reader_cfg.batch_budget.max_units_per_batch
+        minibatch_features = []
         minibatch_paper_ids = []
-        for paper_id in dataset_paper_ids:
-            if paper_id.split("_")[0] not in self.paper_categories:
-                logging.warning(
-                    f"Read in {paper_id} id which is not part of the paper category set! Unexpected behaviour!"
+        minibatch_units = 0
+        for paper_id, paper_features in self.iterate_shuffled_paper_features():
+            for paper_chunk in self.split_paper_features_by_budget(
+                paper_features, budget_unit, max_units_per_batch
+            ):
+                chunk_units = self.count_budget_units(paper_chunk, budget_unit)
+                if (
+                    minibatch_paper_ids
+                    and minibatch_units + chunk_units > max_units_per_batch
+                ):
+                    yield self.stack_paper_features_minibatch(
+                        minibatch_features, minibatch_paper_ids
+                    )
+                    minibatch_features = []
+                    minibatch_paper_ids = []
+                    minibatch_units = 0
+                minibatch_features.append(paper_chunk)
+                minibatch_paper_ids.append(paper_id)
+                minibatch_units += chunk_units
+        if minibatch_paper_ids:
+            yield self.stack_paper_features_minibatch(
+                minibatch_features, minibatch_paper_ids
+            )
+
+    def iterate_shuffled_paper_features(self):
+        # Yields (paper_id, features) in the same shuffled order as the paper
+        # counted minibatches, from the feature store when it is enabled.
+        if self.reader_cfg.feature_cache.enabled:
+            feature_store = self.get_feature_store()
+            label_id_mapping = feature_store.get_label_id_mapping(self.paper_categories)
+            listing_positions = list(range(len(feature_store.dataset_listing)))
+            if self.experiment_seed:
+                self.shuffle_papers(self.experiment_seed, listing_positions)
+            for listing_position in listing_positions:
+                store_paper_index = feature_store.store_paper_indexes[listing_position]
+                if store_paper_index == -1:
+                    self.epoch_stats["num_skipped_papers"] += 1
+                    continue
+                paper_features, _, _ = feature_store.get_papers_minibatch(
+                    [store_paper_index], label_id_mapping
                 )
+                yield feature_store.dataset_listing[listing_position], paper_features
+        else:
+            dataset_paper_ids = list(self.dataset_index.paper_ids)
+            if self.experiment_seed:
+                self.shuffle_papers(self.experiment_seed, dataset_paper_ids)
+            for paper_id, paper_features, _ in self.iterate_featurized_papers(
+                dataset_paper_ids
+            ):
+                if paper_features is None:
+                    self.epoch_stats["num_skipped_papers"] += 1
+                    continue
+                yield paper_id, paper_features
+
+    def split_paper_features_by_budget(
+        self, paper_features: csr_matrix, budget_unit: str, max_units_per_batch: int
+    ) -> List[csr_matrix]:
+        if self.count_budget_units(paper_features, budget_unit) <= max_units_per_batch:
+            return [paper_features]
+        if budget_unit == "sentences":
+            row_units = np.ones(paper_features.shape[0], dtype=np.int64)
+        else:
+            row_units = np.diff(paper_features.indptr)
+        chunk_starts = [0]
+        chunk_units = 0
+        for row, current_row_units in enumerate(row_units.tolist()):
+            # A chunk holds at least one row, even above the budget.
+            if (
+                row > chunk_starts[-1]
+                and chunk_units + current_row_units > max_units_per_batch
+            ):
+                chunk_starts.append(row)
+                chunk_units = 0
+            chunk_units += current_row_units
+        chunk_starts.append(paper_features.shape[0])
+        return [
+            paper_features[chunk_start:chunk_end]
+            for chunk_start, chunk_end in zip(chunk_starts[:-1], chunk_starts[1:])
+        ]
+
+    def count_budget_units(self, paper_features: csr_matrix, budget_unit: str) -> int:
+        if budget_unit == "sentences":
+            return paper_features.shape[0]
+        return paper_features.nnz
+
+    def stack_paper_features_minibatch(
+        self, minibatch_features: List[csr_matrix], minibatch_paper_ids: List[str]
+    ):
+        minibatch_labels = []
+        for paper_id, paper_features in zip(minibatch_paper_ids, minibatch_features):
+            minibatch_labels += self.create_paper_contents_label_vector(
+                paper_id, paper_features.shape[0]
+            )
+        return (
+            vstack(minibatch_features, format="csr"),
+            minibatch_labels,
+            minibatch_paper_ids,
+            create_paper_offsets(
+                [paper_features.shape[0] for paper_features in minibatch_features]
+            ),
+        )
+
+    def iterate_feature_store_minibatches(self):
+        feature_store = self.get_feature_store()
+        label_id_mapping = feature_store.get_label_id_mapping(self.paper_categories)
+        # Shuffling the listing positions permutes papers exactly like shuffling the
+        # paper ids themselves, so batches match the ones read from raw files.
+        listing_positions = list(range(len(feature_store.dataset_listing)))
+        if self.experiment_seed:
+            self.shuffle_papers(self.experiment_seed, listing_positions)
+        minibatch_store_indexes = []
+        minibatch_paper_ids = []
+        for listing_position in listing_positions:
+            store_paper_index = feature_store.store_paper_indexes[listing_position]
+            if store_paper_index == -1:
+                self.epoch_stats["num_skipped_papers"] += 1
                 continue
-            raw_paper_contents = self.open_paper_id_contents(
-                paper_id, self.dataset_path
+            minibatch_store_indexes.append(store_paper_index)
+            minibatch_paper_ids.append(feature_store.dataset_listing[listing_position])
+            if len(minibatch_store_indexes) == self.reader_cfg.batch_size:
+                yield self.read_feature_store_minibatch(
+                    feature_store,
+                    minibatch_store_indexes,
+                    minibatch_paper_ids,
+                    label_id_mapping,
+                )
+                minibatch_store_indexes = []
+                minibatch_paper_ids = []
+        # The last minibatch of the epoch may hold fewer than batch_size papers.
+        if minibatch_store_indexes:
+            yield self.read_feature_store_minibatch(
+                feature_store,
+                minibatch_store_indexes,
+                minibatch_paper_ids,
+                label_id_mapping,
+            )
+
+    def read_feature_store_minibatch(
+        self,
+        feature_store: SklearnFeatureStore,
+        minibatch_store_indexes: List[int],
+        minibatch_paper_ids: List[str],
+        label_id_mapping: np.ndarray,
+    ):
+        (
+            minibatch_features,
+            minibatch_labels,
+            minibatch_paper_offsets,
+        ) = feature_store.get_papers_minibatch(
+            minibatch_store_indexes, label_id_mapping
+        )
+        return (
+            minibatch_features,
+            minibatch_labels,
+            minibatch_paper_ids,
+            minibatch_paper_offsets,
+        )
+
+    def create_label_vocabulary(self) -> LabelVocabulary:
+        if self.reader_cfg.label_vocabulary_path:
+            return LabelVocabulary.load(self.reader_cfg.label_vocabulary_path)
+        return LabelVocabulary(self.dataset_index.categories)
+
+    def get_dataset_index_path(self) -> str:
+        index_dir = self.reader_cfg.dataset_index.index_dir or path.join(
+            self.reader_cfg.data_path, ".dataset_index"
+        )
+        return path.join(index_dir, f"{self.dataset_type}.npz")
+
+    def get_feature_store(self) -> SklearnFeatureStore:
+        if self.feature_store is None:
+            dataset_listing = list(self.dataset_index.paper_ids)
+            store_key = SklearnFeatureStore.compute_store_key(
+                self.dataset_path,
+                dataset_listing,
+                self.paper_categories,
+                "processed_paper.txt",
+                OmegaConf.to_container(
+                    self.reader_cfg.sklearn_feature_extraction, resolve=True
+                ),
             )
-            paper_sentences = self.split_paper_contents_into_sentences(
-                raw_paper_contents
+            feature_store = SklearnFeatureStore(self.get_feature_cache_dir(), store_key)
+            if not feature_store.exists():
+                hydra_logger.info(
+                    f"Building feature store for dataset type {self.dataset_type} at {feature_store.store_path}!"
+                )
+                feature_store.build(self.iterate_featurized_papers(dataset_listing))
+            feature_store.load()
+            self.feature_store = feature_store
+        return self.feature_store
+
+    def get_feature_cache_dir(self) -> str:
+        if self.reader_cfg.feature_cache.cache_dir:
+            return self.reader_cfg.feature_cache.cache_dir
+        # Dot folders are skipped when listing categories, keep the cache next to
+        # the dataset partitions.
+        return path.join(self.reader_cfg.data_path, ".feature_cache")
+
+    def iterate_featurized_papers(self, dataset_paper_ids: List[str]):
+        # Yields (paper_id, features, category) in the order of dataset_paper_ids,
+        # features is None for papers outside of the category set.
+        if self.reader_cfg.num_workers > 1:
+            featurized_papers = self.featurize_papers_in_worker_pool(dataset_paper_ids)
+        else:
+            featurized_papers = self.featurize_papers_sequentially(dataset_paper_ids)
+        for paper_id, paper_features in featurized_papers:
+            yield paper_id, paper_features, get_paper_folder_category(paper_id)
+
+    def is_paper_in_category_set(self, paper_id: str) -> bool:
+        if get_paper_folder_category(paper_id) not in self.label_vocabulary:
+            logging.warning(
+                f"Read in {paper_id} id which is not part of the paper category set! Unexpected behaviour!"
             )
-            paper_label_vector = self.create_paper_contents_label_vector(
-                paper_id, len(paper_sentences)
+            return False
+        return True
+
+    def featurize_papers_sequentially(self, dataset_paper_ids: List[str]):
+        for paper_id in dataset_paper_ids:
+            if not self.is_paper_in_category_set(paper_id):
+                yield paper_id, None
+                continue
+            yield paper_id, self.featurize_paper(paper_id)
+
+    def get_featurization_pool(self) -> ProcessPoolExecutor:
+        # One pool per reader, reused by every epoch until the reader is closed.
+        # Epochs are usually iterated in the prefetcher thread, spawned workers
+        # avoid forking the process from a thread.
+        if self.featurization_pool is None:
+            self.featurization_pool = ProcessPoolExecutor(
+                max_workers=self.reader_cfg.num_workers,
+                mp_context=get_context("spawn"),
+                initializer=initialize_featurization_worker,
+                initargs=(
+                    OmegaConf.to_container(
+                        self.reader_cfg.sklearn_feature_extraction.hashing_vectorizer,
+                        resolve=True,
+                    ),
+                    self.sentence_chunk_size,
+                ),
             )
-            minibatch_papers += paper_sentences
-            minibatch_labels += paper_label_vector
+        return self.featurization_pool
+
+    def close(self) -> None:
+        if self.featurization_pool is not None:
+            self.featurization_pool.shutdown()
+            self.featurization_pool = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def featurize_papers_in_worker_pool(self, dataset_paper_ids: List[str]):
+        # Papers are submitted through a bounded window so results are yielded in
+        # submission order without featurizing the whole dataset ahead of the consumer.
+        max_pending_papers = (
+            self.reader_cfg.num_workers * self.pending_papers_per_worker
+        )
+        featurization_pool = self.get_featurization_pool()
+        pending_papers = deque()
+        try:
+            for paper_id in dataset_paper_ids:
+                if self.is_paper_in_category_set(paper_id):
+                    paper_future = featurization_pool.submit(
+                        featurize_paper_in_worker, self.get_paper_filepath(paper_id)
+                    )
+                else:
+                    paper_future = None
+                pending_papers.append((paper_id, paper_future))
+                if len(pending_papers) >= max_pending_papers:
+                    yield self.pop_pending_paper_features(pending_papers)
+            while pending_papers:
+                yield self.pop_pending_paper_features(pending_papers)
+        finally:
+            # An epoch stopped early leaves no work queued in the shared pool.
+            for _, paper_future in pending_papers:
+                if paper_future is not None:
+                    paper_future.cancel()
+
+    def pop_pending_paper_features(self, pending_papers: deque):
+        paper_id, paper_future = pending_papers.popleft()
+        if paper_future is None:
+            return paper_id, None
+        return paper_id, paper_future.result()
+
+    def featurize_paper(self, paper_id: str) -> csr_matrix:
+        return featurize_paper_file(
+            self.get_paper_filepath(paper_id),
+            self.feature_extractor,
+            self.sentence_chunk_size,
+        )
+
+    def get_paper_filepath(self, paper_id: str) -> str:
+        return self.dataset_index.get_paper_filepath(self.dataset_path, paper_id)
+
+    def iterate_raw_paper_minibatches(self):
+        dataset_paper_ids = list(self.dataset_index.paper_ids)
+        if self.experiment_seed:
+            self.shuffle_papers(self.experiment_seed, dataset_paper_ids)
+        yield from self.iterate_featurized_paper_minibatches(dataset_paper_ids)
+
+    def iterate_featurized_paper_minibatches(self, dataset_paper_ids: List[str]):
+        minibatch_features = []
+        minibatch_paper_ids = []
+        for paper_id, paper_features, _ in self.iterate_featurized_papers(
+            dataset_paper_ids
+        ):
+            if paper_features is None:
+                self.epoch_stats["num_skipped_papers"] += 1
+                continue
+            minibatch_features.append(paper_features)
             minibatch_paper_ids.append(paper_id)
-            minibatch_counter += 1
-            if minibatch_counter % self.reader_cfg.batch_size == 0:
-                yield self.feature_extractor.transform(
-                    minibatch_papers
-                ), minibatch_labels, minibatch_paper_ids
-                minibatch_papers = []
-                minibatch_labels = []
+            if len(minibatch_paper_ids) == self.reader_cfg.batch_size:
+                # Hashed rows are normalized independently, stacking per paper
+                # matrices matches transforming the whole minibatch at once.
+                yield self.stack_paper_features_minibatch(
+                    minibatch_features, minibatch_paper_ids
+                )
+                minibatch_features = []
                 minibatch_paper_ids = []
+        if minibatch_paper_ids:
+            yield self.stack_paper_features_minibatch(
+                minibatch_features, minibatch_paper_ids
+            )
 
     def shuffle_papers(self, seed: int, paper_ids: List[str]) -> None:
         random.seed(seed)
@@ -78,7 +484,9 @@ class SklearnTextClassificationReader:
     def create_paper_contents_label_vector(
         self, paper_id: str, num_sentences_in_paper: int
     ) -> List[int]:
-        class_number = self.paper_categories.index(paper_id.split("_")[0])
+        class_number = self.label_vocabulary.get_label_id(
+            get_paper_folder_category(paper_id)
+        )
         return [class_number] * num_sentences_in_paper
 
     def open_paper_id_contents(self, paper_id: str, dataset_path: str) -> str:
@@ -89,7 +497,4 @@ class SklearnTextClassificationReader:
         return paper_text_contents
 
     def split_paper_contents_into_sentences(self, raw_paper_contents: str) -> List[str]:
-        paper_sentences = re.split(self.punctuation_regex, raw_paper_contents)
-        return [
-            sentence for sentence in paper_sentences if sentence.replace(" ", "") != ""
-        ]
+        return list(iterate_sentences_in_text(raw_paper_contents))
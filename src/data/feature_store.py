@@ -0,0 +1,207 @@
+from hashlib import sha256
+from json import dump, dumps, load
+from os import getpid, makedirs, path, replace, stat
+from shutil import rmtree
+from typing import Dict, Iterable, List, Optional, Tuple
+from logging import getLogger
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from utils.paper_aggregation_utils import create_paper_offsets
+
+hydra_logger = getLogger(__name__)
+
+FEATURE_STORE_VERSION = 1
+
+
+class SklearnFeatureStore:
+    # On-disk CSR matrix holding the hashed sentence features of a dataset partition.
+    # Rows of a paper are contiguous, so a paper is addressed by its row offsets.
+    def __init__(self, cache_dir: str, store_key: str):
+        self.cache_dir = cache_dir
+        self.store_key = store_key
+        self.store_path = path.join(cache_dir, store_key)
+        self.meta_info = None
+
+    @staticmethod
+    def compute_store_key(
+        dataset_path: str,
+        dataset_listing: List[str],
+        paper_categories: List[str],
+        paper_filename: str,
+        feature_extraction_cfg: Dict,
+    ) -> str:
+        store_hash = sha256()
+        store_hash.update(
+            dumps(
+                {
+                    "version": FEATURE_STORE_VERSION,
+                    "features": feature_extraction_cfg,
+                    # Papers outside of the categories are left out of the store.
+                    "categories": sorted(paper_categories),
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+        for paper_id in dataset_listing:
+            store_hash.update(paper_id.encode("utf-8"))
+            if paper_id.split("_")[0] not in paper_categories:
+                continue
+            file_stats = stat(path.join(dataset_path, paper_id, paper_filename))
+            store_hash.update(f"{file_stats.st_size}:{file_stats.st_mtime_ns}".encode())
+        return store_hash.hexdigest()
+
+    def exists(self) -> bool:
+        return path.isfile(path.join(self.store_path, "meta.json"))
+
+    def build(
+        self, featurized_papers: Iterable[Tuple[str, Optional[csr_matrix], str]]
+    ) -> None:
+        # featurized_papers yields (paper_id, features, category) in listing order,
+        # with features set to None for papers that are skipped by the reader.
+        build_path = f"{self.store_path}.tmp-{getpid()}"
+        makedirs(build_path, exist_ok=True)
+        dataset_listing = []
+        store_paper_indexes = []
+        categories = []
+        paper_offsets = [0]
+        num_nonzeros = 0
+        num_features = None
+        data_dtype = None
+        with open(path.join(build_path, "data.bin"), "wb") as data_file, open(
+            path.join(build_path, "indices.bin"), "wb"
+        ) as indices_file, open(
+            path.join(build_path, "indptr.bin"), "wb"
+        ) as indptr_file, open(
+            path.join(build_path, "labels.bin"), "wb"
+        ) as labels_file:
+            np.zeros(1, dtype=np.int64).tofile(indptr_file)
+            for paper_id, paper_features, paper_category in featurized_papers:
+                dataset_listing.append(paper_id)
+                if paper_features is None:
+                    store_paper_indexes.append(-1)
+                    continue
+                if paper_category not in categories:
+                    categories.append(paper_category)
+                store_paper_indexes.append(len(paper_offsets) - 1)
+                num_features = paper_features.shape[1]
+                data_dtype = paper_features.dtype
+                paper_features.data.tofile(data_file)
+                paper_features.indices.astype(np.int32, copy=False).tofile(indices_file)
+                (paper_features.indptr[1:].astype(np.int64) + num_nonzeros).tofile(
+                    indptr_file
+                )
+                np.full(
+                    paper_features.shape[0],
+                    categories.index(paper_category),
+                    dtype=np.int32,
+                ).tofile(labels_file)
+                num_nonzeros += paper_features.nnz
+                paper_offsets.append(paper_offsets[-1] + paper_features.shape[0])
+        np.array(paper_offsets, dtype=np.int64).tofile(
+            path.join(build_path, "paper_offsets.bin")
+        )
+        meta_info = {
+            "version": FEATURE_STORE_VERSION,
+            "dataset_listing": dataset_listing,
+            "store_paper_indexes": store_paper_indexes,
+            "categories": categories,
+            "num_rows": paper_offsets[-1],
+            "num_nonzeros": num_nonzeros,
+            "num_features": num_features,
+            "data_dtype": np.dtype(data_dtype or np.float64).str,
+        }
+        with open(path.join(build_path, "meta.json"), "w") as file_object:
+            dump(meta_info, file_object)
+        try:
+            replace(build_path, self.store_path)
+        except OSError:
+            # Another process finished building the same store first.
+            rmtree(build_path, ignore_errors=True)
+        hydra_logger.info(
+            f"Built feature store with {meta_info['num_rows']} rows at {self.store_path}!"
+        )
+        return
+
+    def load(self) -> None:
+        with open(path.join(self.store_path, "meta.json"), "r") as file_object:
+            self.meta_info = load(file_object)
+        self.data = self.open_store_array("data.bin", self.meta_info["data_dtype"])
+        self.indices = self.open_store_array("indices.bin", np.int32)
+        self.indptr = self.open_store_array("indptr.bin", np.int64)
+        self.row_labels = self.open_store_array("labels.bin", np.int32)
+        self.paper_offsets = self.open_store_array("paper_offsets.bin", np.int64)
+        return
+
+    def open_store_array(self, array_filename: str, dtype) -> np.ndarray:
+        array_path = path.join(self.store_path, array_filename)
+        if path.getsize(array_path) == 0:
+            # np.memmap refuses to map empty files.
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(array_path, dtype=dtype, mode="r")
+
+    @property
+    def dataset_listing(self) -> List[str]:
+        return self.meta_info["dataset_listing"]
+
+    @property
+    def store_paper_indexes(self) -> List[int]:
+        return self.meta_info["store_paper_indexes"]
+
+    def get_label_id_mapping(self, paper_categories: List[str]) -> np.ndarray:
+        # Stored labels index into the categories seen at build time, remap them to
+        # the label ids of the current reader.
+        return np.array(
+            [
+                paper_categories.index(category)
+                for category in self.meta_info["categories"]
+            ],
+            dtype=np.int32,
+        )
+
+    def get_papers_minibatch(
+        self, store_paper_indexes: List[int], label_id_mapping: np.ndarray
+    ) -> Tuple[csr_matrix, List[int], np.ndarray]:
+        data_slices = []
+        indices_slices = []
+        indptr_slices = [np.zeros(1, dtype=np.int64)]
+        label_slices = []
+        paper_num_rows = []
+        num_rows = 0
+        num_nonzeros = 0
+        for store_paper_index in store_paper_indexes:
+            row_start = self.paper_offsets[store_paper_index]
+            row_end = self.paper_offsets[store_paper_index + 1]
+            nnz_start = self.indptr[row_start]
+            nnz_end = self.indptr[row_end]
+            data_slices.append(self.data[nnz_start:nnz_end])
+            indices_slices.append(self.indices[nnz_start:nnz_end])
+            indptr_slices.append(
+                self.indptr[row_start + 1 : row_end + 1] - nnz_start + num_nonzeros
+            )
+            label_slices.append(self.row_labels[row_start:row_end])
+            paper_num_rows.append(row_end - row_start)
+            num_rows += row_end - row_start
+            num_nonzeros += nnz_end - nnz_start
+        minibatch_features = csr_matrix(
+            (
+                np.concatenate(data_slices) if data_slices else np.zeros(0),
+                (
+                    np.concatenate(indices_slices)
+                    if indices_slices
+                    else np.zeros(0, dtype=np.int32)
+                ),
+                np.concatenate(indptr_slices),
+            ),
+            shape=(num_rows, self.meta_info["num_features"]),
+        )
+        minibatch_labels = (
+            label_id_mapping[np.concatenate(label_slices)].tolist()
+            if label_slices
+            else []
+        )
+        return (
+            minibatch_features,
+            minibatch_labels,
+            create_paper_offsets(paper_num_rows),
+        )
@@ -0,0 +1,52 @@
+from json import dump, load
+from typing import Dict, Iterable
+
+LABEL_VOCABULARY_VERSION = 1
+
+
+class LabelVocabulary:
+    # Sorted category names, a label id is the position of its category. The same
+    # vocabulary is shared by the train and valid readers, the featurization workers
+    # and the saved checkpoints, so label ids agree across processes.
+    def __init__(self, labels: Iterable[str]):
+        self.labels = sorted(set(labels))
+        self.label_ids = {label: label_id for label_id, label in enumerate(self.labels)}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.label_ids
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, LabelVocabulary) and self.labels == other.labels
+
+    def get_label_id(self, label: str) -> int:
+        return self.label_ids[label]
+
+    @property
+    def ids_to_labels(self) -> Dict[int, str]:
+        return dict(enumerate(self.labels))
+
+    def save(self, vocabulary_path: str) -> None:
+        with open(vocabulary_path, "w") as file_object:
+            dump(
+                {"version": LABEL_VOCABULARY_VERSION, "labels": self.labels},
+                file_object,
+            )
+        return
+
+    @staticmethod
+    def load(vocabulary_path: str) -> "LabelVocabulary":
+        with open(vocabulary_path, "r") as file_object:
+            vocabulary_info = load(file_object)
+        if vocabulary_info.get("version") != LABEL_VOCABULARY_VERSION:
+            raise RuntimeError(
+                f"Label vocabulary at {vocabulary_path} has unsupported version {vocabulary_info.get('version')}!"
+            )
+        labels = vocabulary_info["labels"]
+        if labels != sorted(set(labels)):
+            raise RuntimeError(
+                f"Label vocabulary at {vocabulary_path} is not sorted, label ids would change!"
+            )
+        return LabelVocabulary(labels)
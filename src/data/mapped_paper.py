@@ -0,0 +1,139 @@
+from mmap import ACCESS_READ, mmap
+from os import fstat
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+# Smaller paper files are read into memory. A map keeps a file descriptor open until
+# it is closed, which readers holding many papers at once could run out of.
+MIN_MAPPED_FILE_BYTES = 1 << 20
+
+
+class MappedPaper:
+    # Lines of a paper file read through a memory map. line_offsets holds the byte
+    # offset of every line start plus the file size, line_indexes the lines kept by
+    # the filters applied so far. Filtering and slicing only create a new index
+    # array over the same map, lines are decoded when they are accessed.
+    def __init__(
+        self,
+        file_buffer: Union[mmap, bytes],
+        line_offsets: np.ndarray,
+        line_indexes: np.ndarray,
+        file_encoding: str = "utf-8",
+    ):
+        self.file_buffer = file_buffer
+        self.line_offsets = line_offsets
+        self.line_indexes = line_indexes
+        self.file_encoding = file_encoding
+
+    @staticmethod
+    def open(
+        data_path: str,
+        file_encoding: str = "utf-8",
+        min_mapped_file_bytes: int = MIN_MAPPED_FILE_BYTES,
+    ) -> "MappedPaper":
+        with open(data_path, "rb") as file_object:
+            file_size = fstat(file_object.fileno()).st_size
+            if file_size == 0 or file_size < min_mapped_file_bytes:
+                # Empty files cannot be mapped.
+                file_buffer = file_object.read()
+            else:
+                file_buffer = mmap(file_object.fileno(), 0, access=ACCESS_READ)
+        file_bytes = np.frombuffer(file_buffer, dtype=np.uint8)
+        line_ends = np.flatnonzero(file_bytes == ord("\n")) + 1
+        if len(file_bytes) and file_bytes[-1] != ord("\n"):
+            # Last line without a trailing newline.
+            line_ends = np.append(line_ends, len(file_bytes))
+        line_offsets = np.zeros(len(line_ends) + 1, dtype=np.int64)
+        line_offsets[1:] = line_ends
+        return MappedPaper(
+            file_buffer,
+            line_offsets,
+            np.arange(len(line_ends), dtype=np.int64),
+            file_encoding,
+        )
+
+    def close(self) -> None:
+        # Lines selected from this paper share its map and are closed with it.
+        if isinstance(self.file_buffer, mmap):
+            self.file_buffer.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def has_carriage_returns(self) -> bool:
+        # Text mode reads \r and \r\n as line endings, the byte offsets only split
+        # lines on \n.
+        return self.file_buffer.find(b"\r") != -1
+
+    def __len__(self) -> int:
+        return len(self.line_indexes)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[str, "MappedPaper"]:
+        if isinstance(key, slice):
+            return self.select_lines(key)
+        return self.decode_line(self.line_indexes[key])
+
+    def __iter__(self) -> Iterator[str]:
+        for line_index in self.line_indexes:
+            yield self.decode_line(line_index)
+
+    def decode_line(self, line_index: int) -> str:
+        return self.file_buffer[
+            self.line_offsets[line_index] : self.line_offsets[line_index + 1]
+        ].decode(self.file_encoding)
+
+    def select_lines(self, line_selection: Union[np.ndarray, slice]) -> "MappedPaper":
+        # Accepts a boolean mask over the current lines, positions or a slice.
+        return MappedPaper(
+            self.file_buffer,
+            self.line_offsets,
+            self.line_indexes[line_selection],
+            self.file_encoding,
+        )
+
+    def get_line_byte_lengths(self) -> np.ndarray:
+        return (
+            self.line_offsets[self.line_indexes + 1]
+            - self.line_offsets[self.line_indexes]
+        )
+
+    def find_lines_equal_to(self, line_values: Iterable[str]) -> np.ndarray:
+        # Boolean mask of the lines equal to any of line_values, compared on the raw
+        # bytes without decoding the lines.
+        file_bytes = np.frombuffer(self.file_buffer, dtype=np.uint8)
+        line_starts = self.line_offsets[self.line_indexes]
+        line_byte_lengths = self.get_line_byte_lengths()
+        matching_lines = np.zeros(len(self), dtype=bool)
+        for line_value in line_values:
+            encoded_value = line_value.encode(self.file_encoding)
+            value_matches = line_byte_lengths == len(encoded_value)
+            for byte_position, value_byte in enumerate(encoded_value):
+                candidate_lines = np.flatnonzero(value_matches)
+                value_matches[candidate_lines] = (
+                    file_bytes[line_starts[candidate_lines] + byte_position]
+                    == value_byte
+                )
+            matching_lines |= value_matches
+        return matching_lines
+
+    def count_masked_bytes_in_lines(self, file_byte_mask: np.ndarray) -> np.ndarray:
+        # Number of masked bytes of every line, from the positions of all the masked
+        # bytes of the file.
+        masked_byte_positions = np.flatnonzero(file_byte_mask)
+        return np.diff(np.searchsorted(masked_byte_positions, self.line_offsets))[
+            self.line_indexes
+        ]
+
+    def count_byte_in_lines(self, byte_value: int) -> np.ndarray:
+        file_bytes = np.frombuffer(self.file_buffer, dtype=np.uint8)
+        return self.count_masked_bytes_in_lines(file_bytes == byte_value)
+
+    def find_non_ascii_lines(self) -> np.ndarray:
+        file_bytes = np.frombuffer(self.file_buffer, dtype=np.uint8)
+        return self.count_masked_bytes_in_lines(file_bytes >= 0x80) > 0
@@ -0,0 +1,101 @@
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import perf_counter
+from typing import Any, Dict, Iterable
+
+
+class MinibatchPrefetcher:
+    # Keeps up to prefetch_depth minibatches of a reader ready in a background thread
+    # while the consumer works on the current one. A depth of 0 iterates the reader
+    # synchronously, which still reports how long the consumer waited on it.
+    def __init__(self, minibatch_iterable: Iterable, prefetch_depth: int):
+        self.minibatch_iterable = minibatch_iterable
+        self.prefetch_depth = prefetch_depth
+        self.queue_poll_seconds = 0.1
+        self.reset_wait_stats()
+
+    def reset_wait_stats(self) -> None:
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.num_minibatches = 0
+        return
+
+    @property
+    def wait_stats(self) -> Dict[str, float]:
+        return {
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+            "mean_wait_seconds": self.wait_seconds / max(self.num_minibatches, 1),
+            "num_minibatches": self.num_minibatches,
+        }
+
+    def __iter__(self):
+        self.reset_wait_stats()
+        if self.prefetch_depth > 0:
+            minibatch_iterator = self.iterate_prefetched_minibatches()
+        else:
+            minibatch_iterator = iter(self.minibatch_iterable)
+        while True:
+            wait_start = perf_counter()
+            try:
+                minibatch = next(minibatch_iterator)
+            except StopIteration:
+                return
+            self.record_wait(perf_counter() - wait_start)
+            yield minibatch
+
+    def record_wait(self, waited_seconds: float) -> None:
+        self.wait_seconds += waited_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, waited_seconds)
+        self.num_minibatches += 1
+        return
+
+    def iterate_prefetched_minibatches(self):
+        minibatch_queue = Queue(maxsize=self.prefetch_depth)
+        stop_event = Event()
+        producer_thread = Thread(
+            target=self.produce_minibatches,
+            args=(minibatch_queue, stop_event),
+            daemon=True,
+        )
+        producer_thread.start()
+        try:
+            while True:
+                is_finished, minibatch, producer_error = minibatch_queue.get()
+                if producer_error is not None:
+                    raise producer_error
+                if is_finished:
+                    return
+                yield minibatch
+        finally:
+            # Unblock the producer if the consumer stopped before the reader ended.
+            stop_event.set()
+            while producer_thread.is_alive():
+                try:
+                    minibatch_queue.get_nowait()
+                except Empty:
+                    producer_thread.join(self.queue_poll_seconds)
+
+    def produce_minibatches(self, minibatch_queue: Queue, stop_event: Event) -> None:
+        try:
+            for minibatch in self.minibatch_iterable:
+                if not self.put_in_queue(
+                    minibatch_queue, stop_event, (False, minibatch, None)
+                ):
+                    return
+        except Exception as producer_error:
+            self.put_in_queue(minibatch_queue, stop_event, (True, None, producer_error))
+            return
+        self.put_in_queue(minibatch_queue, stop_event, (True, None, None))
+        return
+
+    def put_in_queue(
+        self, minibatch_queue: Queue, stop_event: Event, queue_item: Any
+    ) -> bool:
+        while not stop_event.is_set():
+            try:
+                minibatch_queue.put(queue_item, timeout=self.queue_poll_seconds)
+                return True
+            except Full:
+                continue
+        return False
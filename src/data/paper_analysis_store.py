@@ -0,0 +1,266 @@
+import sqlite3
+from itertools import groupby
+from json import loads
+from typing import Any, Dict, List, Tuple
+
+from utils.serialization_utils import SpilledJsonDict, SpilledJsonList
+
+FIRST_REFERENCE_SECTION_TYPE = "first-reference"
+
+ANALYSIS_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS paper_records (
+    record_index INTEGER PRIMARY KEY,
+    paper_id TEXT NOT NULL,
+    detection_type TEXT NOT NULL,
+    paper_len_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS section_detections (
+    record_index INTEGER NOT NULL,
+    section_type TEXT NOT NULL,
+    match_count INTEGER NOT NULL,
+    PRIMARY KEY (record_index, section_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS detection_matches (
+    record_index INTEGER NOT NULL,
+    section_type TEXT NOT NULL,
+    match_position INTEGER NOT NULL,
+    line_text TEXT NOT NULL,
+    matched_keyword TEXT,
+    line_index INTEGER NOT NULL,
+    PRIMARY KEY (record_index, section_type, match_position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_records_by_paper_id
+    ON paper_records (detection_type, paper_id);
+"""
+
+# Every detected section other than the introduction counts as an ending, first
+# reference matches are stored under their own section type.
+ENDING_SECTION_EXISTS_QUERY = """
+EXISTS (
+    SELECT 1 FROM section_detections d
+    WHERE d.record_index = r.record_index
+    AND d.section_type NOT IN ('intro', 'first-reference')
+    AND d.match_count > 0
+)
+"""
+
+
+class PaperAnalysisStore:
+    # SQLite tables of the detect-keywords and detect-first-reference summaries: one
+    # row per paper summary, one per searched section with its match count and one
+    # per matched line. Summaries are written in batches of flush_every_records,
+    # the analysis modes aggregate them with SQL instead of re-parsing jsonl.
+    def __init__(self, store_path: str, flush_every_records: int = 1000):
+        self.store_path = store_path
+        self.flush_every_records = flush_every_records
+        self.connection = None
+        self.next_record_index = 0
+        self.pending_rows = {
+            "paper_records": [],
+            "section_detections": [],
+            "detection_matches": [],
+        }
+
+    def __enter__(self):
+        self.connection = sqlite3.connect(self.store_path)
+        self.connection.executescript(ANALYSIS_STORE_SCHEMA)
+        # Reruns append after the summaries already stored, like the jsonl output.
+        (self.next_record_index,) = self.connection.execute(
+            "SELECT COALESCE(MAX(record_index) + 1, 0) FROM paper_records"
+        ).fetchone()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+            self.connection = None
+        return False
+
+    def write_record(self, record: Dict[str, Any]) -> None:
+        record_index = self.next_record_index
+        self.next_record_index += 1
+        if "first_ref_det_info" in record:
+            self.pending_rows["paper_records"].append(
+                (
+                    record_index,
+                    record["id"],
+                    "first-reference",
+                    record["paper_len_count"],
+                )
+            )
+            self.add_section_detection_rows(
+                record_index,
+                FIRST_REFERENCE_SECTION_TYPE,
+                record["first_ref_det_info"]["ref_tuples"],
+            )
+        else:
+            self.pending_rows["paper_records"].append(
+                (record_index, record["id"], "section-keywords", None)
+            )
+            for section_type, section_tuples in record[
+                "section_keyword_detection"
+            ].items():
+                if section_tuples and isinstance(section_tuples[0], str):
+                    # ["Not found!"] marks a section without matches.
+                    section_tuples = []
+                self.add_section_detection_rows(
+                    record_index, section_type, section_tuples
+                )
+        if len(self.pending_rows["paper_records"]) >= self.flush_every_records:
+            self.flush()
+        return
+
+    def write_serialized_record(self, serialized_record: str) -> None:
+        self.write_record(loads(serialized_record))
+        return
+
+    def add_section_detection_rows(
+        self, record_index: int, section_type: str, section_tuples: List
+    ) -> None:
+        self.pending_rows["section_detections"].append(
+            (record_index, section_type, len(section_tuples))
+        )
+        for match_position, section_tuple in enumerate(section_tuples):
+            # Semantic section matches are (line, keyword, line index), numerical
+            # first references are (line, line index).
+            matched_keyword = section_tuple[1] if len(section_tuple) == 3 else None
+            self.pending_rows["detection_matches"].append(
+                (
+                    record_index,
+                    section_type,
+                    match_position,
+                    section_tuple[0],
+                    matched_keyword,
+                    section_tuple[-1],
+                )
+            )
+        return
+
+    def flush(self) -> None:
+        with self.connection:
+            for table_name, table_rows in self.pending_rows.items():
+                if table_rows:
+                    row_placeholders = ", ".join("?" * len(table_rows[0]))
+                    self.connection.executemany(
+                        f"INSERT INTO {table_name} VALUES ({row_placeholders})",
+                        table_rows,
+                    )
+                    table_rows.clear()
+        return
+
+    def compute_first_reference_detection_breakdown(self) -> Tuple[Dict, Dict]:
+        (dataset_size,) = self.connection.execute(
+            "SELECT COUNT(*) FROM paper_records WHERE detection_type = 'first-reference'"
+        ).fetchone()
+        breakdown_jsons = {
+            is_single_count: {
+                "total_count": 0,
+                "dataset_size_diff": 0,
+                "samples_info": SpilledJsonDict(),
+            }
+            for is_single_count in [True, False]
+        }
+        for is_single_count, total_count in self.connection.execute("""
+            SELECT d.match_count = 1, COUNT(*)
+            FROM paper_records r JOIN section_detections d USING (record_index)
+            WHERE r.detection_type = 'first-reference'
+            GROUP BY d.match_count = 1
+            """):
+            breakdown_jsons[bool(is_single_count)]["total_count"] = total_count
+        for breakdown_json in breakdown_jsons.values():
+            breakdown_json["dataset_size_diff"] = (
+                dataset_size - breakdown_json["total_count"]
+            )
+        # Matches are merged into the paper summaries in record order, a paper
+        # summarized by several runs keeps the tuples of its last summary.
+        paper_summaries = self.connection.execute("""
+            SELECT r.record_index, r.paper_id, d.match_count = 1, r.paper_len_count
+            FROM paper_records r JOIN section_detections d USING (record_index)
+            WHERE r.detection_type = 'first-reference'
+            ORDER BY r.record_index
+            """)
+        record_ref_tuples = self.iterate_record_ref_tuples(FIRST_REFERENCE_SECTION_TYPE)
+        next_ref_tuples = next(record_ref_tuples, None)
+        for record_index, paper_id, is_single_count, paper_len_count in paper_summaries:
+            ref_tuples = []
+            if next_ref_tuples is not None and next_ref_tuples[0] == record_index:
+                ref_tuples = next_ref_tuples[1]
+                next_ref_tuples = next(record_ref_tuples, None)
+            breakdown_jsons[bool(is_single_count)]["samples_info"][paper_id] = {
+                "ref_tuples": ref_tuples,
+                "paper_len_count": paper_len_count,
+            }
+        return breakdown_jsons[True], breakdown_jsons[False]
+
+    def iterate_record_ref_tuples(self, section_type: str):
+        detection_matches = self.connection.execute(
+            """
+            SELECT record_index, line_text, matched_keyword, line_index
+            FROM detection_matches WHERE section_type = ?
+            ORDER BY record_index, match_position
+            """,
+            (section_type,),
+        )
+        for record_index, record_matches in groupby(
+            detection_matches, key=lambda detection_match: detection_match[0]
+        ):
+            yield record_index, [
+                (
+                    [line_text, line_index]
+                    if matched_keyword is None
+                    else [line_text, matched_keyword, line_index]
+                )
+                for _, line_text, matched_keyword, line_index in record_matches
+            ]
+
+    def compute_semantic_section_full_dataset_metrics(self) -> Dict:
+        (dataset_size,) = self.connection.execute(
+            "SELECT COUNT(*) FROM paper_records WHERE detection_type = 'section-keywords'"
+        ).fetchone()
+        (intro_count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM section_detections WHERE section_type = 'intro' AND match_count > 0"
+        ).fetchone()
+        (ending_count,) = self.connection.execute(f"""
+            SELECT COUNT(*) FROM paper_records r
+            WHERE r.detection_type = 'section-keywords' AND {ENDING_SECTION_EXISTS_QUERY}
+            """).fetchone()
+        intro_paper_ids_missing = self.spill_paper_ids("""
+                SELECT r.paper_id
+                FROM paper_records r JOIN section_detections d USING (record_index)
+                WHERE d.section_type = 'intro' AND d.match_count = 0
+                ORDER BY r.record_index
+                """)
+        # A paper misses an ending section when its last summary has none. Papers
+        # keep the position of their first summary.
+        ending_paper_ids_missing = self.spill_paper_ids(f"""
+                SELECT r.paper_id FROM paper_records r
+                WHERE r.detection_type = 'section-keywords'
+                AND NOT {ENDING_SECTION_EXISTS_QUERY}
+                AND r.record_index = (
+                    SELECT MAX(record_index) FROM paper_records
+                    WHERE detection_type = r.detection_type AND paper_id = r.paper_id
+                )
+                ORDER BY (
+                    SELECT MIN(record_index) FROM paper_records
+                    WHERE detection_type = r.detection_type AND paper_id = r.paper_id
+                )
+                """)
+        return {
+            "intro": {
+                "count": intro_count,
+                "paper_ids_missing": intro_paper_ids_missing,
+            },
+            "ending": {
+                "count": ending_count,
+                "paper_ids_missing": ending_paper_ids_missing,
+            },
+            "dataset_size": dataset_size,
+        }
+
+    def spill_paper_ids(self, paper_ids_query: str) -> SpilledJsonList:
+        paper_ids = SpilledJsonList()
+        for (paper_id,) in self.connection.execute(paper_ids_query):
+            paper_ids.append(paper_id)
+        return paper_ids
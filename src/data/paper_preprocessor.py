@@ -1,43 +1,148 @@
-from typing import List, Optional
+import re
+from typing import AnyStr, List, Optional, Union
+
+import numpy as np
+from data.mapped_paper import MappedPaper
+from utils.paper_aggregation_utils import create_paper_offsets
+
+PaperContents = Union[List[str], MappedPaper]
+
+BLANK_PAPER_LINES = ["\n", " \n", "\n "]
 
 
 class Paper_Preprocessor(object):
     def __init__(self):
         self.paper_processing_methods = [self.remove_newline_characters_from_contents]
+        # Compiled keyword alternations by keep_semantic_lines.
+        self.keyword_regexes = {}
 
-    def __call__(self, paper_contents: List[str]) -> List[str]:
+    def __call__(self, paper_contents: PaperContents) -> PaperContents:
         for current_processor in self.paper_processing_methods:
             paper_contents = current_processor(paper_contents)
         return paper_contents
 
     def remove_newline_characters_from_contents(
-        self, paper_contents: List[str]
-    ) -> List[str]:
+        self, paper_contents: PaperContents
+    ) -> PaperContents:
+        if isinstance(paper_contents, MappedPaper):
+            return paper_contents.select_lines(
+                ~paper_contents.find_lines_equal_to(BLANK_PAPER_LINES)
+            )
         filtered_contents = []
         for current_line in paper_contents:
-            if current_line in {"\n", " \n", "\n "}:
+            if current_line in BLANK_PAPER_LINES:
                 continue
             filtered_contents.append(current_line)
         return filtered_contents
 
     def remove_paper_contents_by_token_count(
         self,
-        paper_contents: List[str],
+        paper_contents: PaperContents,
         token_thresh: int,
         keep_semantic_lines: Optional[List[str]] = None,
-    ) -> List[str]:
-        filtered_contents = []
-        for current_line in paper_contents:
-            found_section_keyword = False
-            if keep_semantic_lines:
-                for current_keyword_to_keep in keep_semantic_lines:
-                    if current_keyword_to_keep in current_line.lower():
-                        found_section_keyword = True
-            if found_section_keyword:
-                filtered_contents.append(current_line)
-                continue
-            current_line_tokens = current_line.split(" ")
-            if len(current_line_tokens) <= token_thresh:
-                continue
-            filtered_contents.append(current_line)
-        return filtered_contents
+    ) -> PaperContents:
+        # Keeps the lines with more than token_thresh space separated tokens and the
+        # lines whose lowercased text contains one of keep_semantic_lines, computed
+        # for all the lines of the paper at once.
+        keep_semantic_lines = keep_semantic_lines or []
+        if isinstance(paper_contents, MappedPaper):
+            # Mapped papers keep a mask of the lines instead of copying them.
+            return paper_contents.select_lines(
+                self.find_mapped_paper_lines_to_keep(
+                    paper_contents, token_thresh, keep_semantic_lines
+                )
+            )
+        paper_text = "\n".join(paper_contents)
+        if paper_text.isascii() and not has_multiline_keywords(keep_semantic_lines):
+            # The joined lines are indexed like a mapped paper, no keyword match can
+            # span the newlines between them.
+            joined_paper = MappedPaper(
+                paper_text.encode("ascii"),
+                create_paper_offsets(
+                    [len(current_line) + 1 for current_line in paper_contents]
+                ),
+                np.arange(len(paper_contents)),
+            )
+            keep_lines = self.find_mapped_paper_lines_to_keep(
+                joined_paper, token_thresh, keep_semantic_lines
+            )
+        else:
+            keep_lines = [
+                len(current_line.split(" ")) > token_thresh
+                or self.line_contains_keywords(current_line, keep_semantic_lines)
+                for current_line in paper_contents
+            ]
+        return [
+            current_line
+            for current_line, keep_line in zip(paper_contents, keep_lines)
+            if keep_line
+        ]
+
+    def find_mapped_paper_lines_to_keep(
+        self, mapped_paper: MappedPaper, token_thresh: int, keywords: List[str]
+    ) -> np.ndarray:
+        # Splitting a line on spaces gives one more token than it has spaces.
+        keep_lines = mapped_paper.count_byte_in_lines(ord(" ")) + 1 > token_thresh
+        if keywords:
+            keep_lines |= self.find_mapped_paper_lines_with_keywords(
+                mapped_paper, keywords
+            )
+        return keep_lines
+
+    def find_mapped_paper_lines_with_keywords(
+        self, mapped_paper: MappedPaper, keywords: List[str]
+    ) -> np.ndarray:
+        if has_multiline_keywords(keywords):
+            return np.fromiter(
+                (
+                    self.line_contains_keywords(current_line, keywords)
+                    for current_line in mapped_paper
+                ),
+                dtype=bool,
+                count=len(mapped_paper),
+            )
+        # Lowercasing an ascii line only lowers A-Z, the same as lowercasing the
+        # bytes of the file. Lines with other characters are lowercased one by one.
+        keyword_lines = find_lines_containing_keywords(
+            mapped_paper.file_buffer[:].lower(),
+            mapped_paper.line_offsets,
+            [keyword.encode(mapped_paper.file_encoding) for keyword in keywords],
+        )[mapped_paper.line_indexes]
+        non_ascii_lines = mapped_paper.find_non_ascii_lines()
+        for line_position in np.flatnonzero(non_ascii_lines):
+            keyword_lines[line_position] = self.line_contains_keywords(
+                mapped_paper[line_position], keywords
+            )
+        return keyword_lines
+
+    def line_contains_keywords(self, current_line: str, keywords: List[str]) -> bool:
+        if not keywords:
+            return False
+        keywords_key = tuple(keywords)
+        if keywords_key not in self.keyword_regexes:
+            self.keyword_regexes[keywords_key] = re.compile(
+                "|".join(map(re.escape, keywords))
+            )
+        return (
+            self.keyword_regexes[keywords_key].search(current_line.lower()) is not None
+        )
+
+
+def has_multiline_keywords(keywords: List[str]) -> bool:
+    return any("\n" in keyword for keyword in keywords)
+
+
+def find_lines_containing_keywords(
+    text: AnyStr, line_offsets: np.ndarray, keywords: List[AnyStr]
+) -> np.ndarray:
+    # Searches the whole text once per keyword. After a match the search resumes at
+    # the next line, further matches would not change the line mask.
+    keyword_lines = np.zeros(len(line_offsets) - 1, dtype=bool)
+    for keyword in keywords:
+        match_start = text.find(keyword)
+        # Empty keywords also match at the end of the text, past the last line.
+        while match_start != -1 and match_start < line_offsets[-1]:
+            line_position = np.searchsorted(line_offsets, match_start, side="right") - 1
+            keyword_lines[line_position] = True
+            match_start = text.find(keyword, line_offsets[line_position + 1])
+    return keyword_lines
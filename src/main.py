@@ -1,18 +1,34 @@
 import hydra
-from main_operation_modes.exploration import main_exploration_mode
-from main_operation_modes.paper_cleanup import main_paper_cleanup_mode
-from main_operation_modes.experiments import main_experiment_mode
 from omegaconf import DictConfig
 
 
+# Operation modes are imported when they are selected: the experiment, inference
+# and prediction server modes pull in sklearn and mlflow, which would otherwise
+# dominate the startup of the short exploration and paper cleanup runs.
 @hydra.main(config_path="config", config_name="config")
 def main(cfg: DictConfig):
     if cfg.main_operation_mode == "exploration":
+        from main_operation_modes.exploration import main_exploration_mode
+
         main_exploration_mode(cfg)
     elif cfg.main_operation_mode == "paper-cleanup":
+        from main_operation_modes.paper_cleanup import main_paper_cleanup_mode
+
         main_paper_cleanup_mode(cfg)
     elif cfg.main_operation_mode == "experiment":
+        from main_operation_modes.experiments import main_experiment_mode
+
         main_experiment_mode(cfg)
+    elif cfg.main_operation_mode == "inference":
+        from main_operation_modes.inference import main_inference_mode
+
+        main_inference_mode(cfg)
+    elif cfg.main_operation_mode == "prediction-server":
+        from main_operation_modes.prediction_server import (
+            main_prediction_server_mode,
+        )
+
+        main_prediction_server_mode(cfg)
     else:
         raise NotImplementedError(
             f"Operation mode {cfg.main_operation_mode} not supported!"
@@ -1,71 +1,297 @@
 from logging import getLogger, log
 import logging
-from omegaconf import DictConfig
-from typing import Generator, Tuple, List, Any, Type
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from json import dumps, loads
+from omegaconf import DictConfig, OmegaConf
+from typing import Dict, Generator, Optional, Tuple, List, Any, Type
 from data.corpus_reader import Corpus_Reader, ReferenceInfo
-from os import getcwd, path, makedirs
+from os import getcwd, path, makedirs, stat
 
 hydra_logger = getLogger(__name__)
 
+# Paper cleaner and corpus reader owned by each cleanup worker process.
+worker_papers_generator = None
+worker_corpus_reader = None
+
+
+def initialize_cleanup_worker(cfg: DictConfig) -> None:
+    global worker_papers_generator, worker_corpus_reader
+    worker_papers_generator = CleanedPapersGenerator(cfg)
+    worker_corpus_reader = Corpus_Reader(**cfg.data)
+    return
+
+
+def clean_paper_in_worker(
+    paper_task: Tuple[str, str],
+) -> Tuple[str, str, Optional[Dict[str, int]]]:
+    paper_id, output_dataset_path = paper_task
+    return (paper_id,) + worker_papers_generator.clean_paper(
+        paper_id, output_dataset_path, worker_corpus_reader
+    )
+
+
+class CleanupManifest:
+    # Append-only jsonl log of processed papers. The last record of a paper wins, so
+    # reruns only need to clean papers whose source file or cleanup config changed.
+    def __init__(self, manifest_path: str, config_hash: str):
+        self.manifest_path = manifest_path
+        self.config_hash = config_hash
+        self.completed_statuses = {"cleaned", "references-not-found"}
+        self.paper_records = self.load_paper_records(manifest_path)
+        self.file_object = None
+
+    def load_paper_records(self, manifest_path: str) -> Dict[str, Dict]:
+        paper_records = {}
+        if not path.exists(manifest_path):
+            return paper_records
+        with open(manifest_path, "r") as file_object:
+            for manifest_line in file_object:
+                try:
+                    paper_record = loads(manifest_line)
+                except ValueError:
+                    # Partially written line from an interrupted run.
+                    continue
+                paper_records[paper_record["id"]] = paper_record
+        return paper_records
+
+    @staticmethod
+    def get_source_file_info(source_filepath: str) -> Dict[str, int]:
+        file_stats = stat(source_filepath)
+        return {
+            "source_size": file_stats.st_size,
+            "source_mtime_ns": file_stats.st_mtime_ns,
+        }
+
+    def is_paper_up_to_date(
+        self, paper_id: str, source_filepath: str, output_filepath: str
+    ) -> bool:
+        paper_record = self.paper_records.get(paper_id)
+        if (
+            paper_record is None
+            or paper_record["status"] not in self.completed_statuses
+            or paper_record["config_hash"] != self.config_hash
+            or not path.exists(output_filepath)
+            or not path.exists(source_filepath)
+        ):
+            return False
+        source_file_info = CleanupManifest.get_source_file_info(source_filepath)
+        return all(
+            paper_record[info_key] == info_value
+            for info_key, info_value in source_file_info.items()
+        )
+
+    def __enter__(self):
+        self.file_object = open(self.manifest_path, "a")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file_object.close()
+        self.file_object = None
+        return False
+
+    def record_paper(
+        self,
+        paper_id: str,
+        status: str,
+        source_file_info: Optional[Dict[str, int]],
+    ) -> None:
+        paper_record = {"id": paper_id}
+        if status in self.completed_statuses:
+            # Failed papers are cleaned again on the next run whatever their source
+            # file, which may be missing or unreadable.
+            paper_record.update(source_file_info)
+        paper_record["config_hash"] = self.config_hash
+        paper_record["status"] = status
+        self.paper_records[paper_id] = paper_record
+        self.file_object.write(dumps(paper_record))
+        self.file_object.write("\n")
+        # Flush every record so a crash keeps the progress made so far.
+        self.file_object.flush()
+        return
+
 
 class CleanedPapersGenerator:
     def __init__(self, cfg: DictConfig):
         self.cfg = cfg
 
-    def __call__(
+    def __call__(self, dataset_reader_handler: Type[Corpus_Reader]):
+        output_dataset_path, dataset_type = self.create_dataset_type_folder_structure()
+        cleanup_manifest = self.create_manifest(output_dataset_path)
+        paper_ids = self.find_papers_to_clean(
+            dataset_reader_handler, cleanup_manifest, output_dataset_path
+        )
+        logging.info(
+            f"Cleaning up {len(paper_ids)} papers for dataset type {dataset_type}!"
+        )
+        with cleanup_manifest:
+            for paper_id, cleanup_status, source_file_info in self.clean_papers(
+                paper_ids, output_dataset_path, dataset_reader_handler
+            ):
+                cleanup_manifest.record_paper(
+                    paper_id, cleanup_status, source_file_info
+                )
+        logging.info(
+            f"Finished processing paper dataset! Output path: {output_dataset_path}"
+        )
+        return
+
+    def create_manifest(self, output_dataset_path: str) -> CleanupManifest:
+        return CleanupManifest(
+            path.join(output_dataset_path, "cleanup_manifest.jsonl"),
+            self.compute_cleanup_config_hash(),
+        )
+
+    def compute_cleanup_config_hash(self) -> str:
+        cleanup_config = {
+            config_key: OmegaConf.to_container(self.cfg.data[config_key], resolve=True)
+            for config_key in ["textdistance_config", "token_processing"]
+        }
+        cleanup_config["apply_paper_processor_in_reader"] = (
+            self.cfg.data.apply_paper_processor_in_reader
+        )
+        return sha256(dumps(cleanup_config, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def find_papers_to_clean(
         self,
-        dataset_reader: Generator[Tuple[List[str], str], Any, Any],
         dataset_reader_handler: Type[Corpus_Reader],
-    ):
-        output_dataset_path, dataset_type = self.create_dataset_type_folder_structure()
-        for current_paper_contents, paper_id in dataset_reader:
-            logging.info(
-                f"Starting to clean up paper {paper_id} for dataset type {dataset_type}!"
+        cleanup_manifest: CleanupManifest,
+        output_dataset_path: str,
+    ) -> List[str]:
+        paper_ids = dataset_reader_handler.get_paper_folder_ids(self.cfg.data.data_path)
+        if not self.cfg.data.cleanup_processing.resume_from_manifest:
+            return paper_ids
+        papers_to_clean = [
+            paper_id
+            for paper_id in paper_ids
+            if not cleanup_manifest.is_paper_up_to_date(
+                paper_id,
+                dataset_reader_handler.get_paper_folder_filepath(
+                    self.cfg.data.data_path, paper_id
+                ),
+                CleanedPapersGenerator.get_output_filepath(
+                    output_dataset_path, paper_id
+                ),
             )
-            (
-                reference_tuple,
-                current_paper_contents,
-            ) = self.find_start_of_references_in_paper(
-                current_paper_contents, dataset_reader_handler
-            )
-            # In case we cannot find an indicator for a reference section, we keep the entire
-            # paper and document these ids.
-            if reference_tuple:
-                cleaned_paper_contents = self.extract_non_reference_paper_contents(
-                    current_paper_contents, reference_tuple
+        ]
+        logging.info(
+            f"Skipping {len(paper_ids) - len(papers_to_clean)} papers already cleaned with the current config!"
+        )
+        return papers_to_clean
+
+    def clean_papers(
+        self,
+        paper_ids: List[str],
+        output_dataset_path: str,
+        dataset_reader_handler: Type[Corpus_Reader],
+    ) -> Generator[Tuple[str, str, Optional[Dict[str, int]]], None, None]:
+        num_workers = self.cfg.data.cleanup_processing.num_workers
+        if num_workers <= 1:
+            for paper_id in paper_ids:
+                yield (paper_id,) + self.clean_paper(
+                    paper_id, output_dataset_path, dataset_reader_handler
                 )
-            else:
-                logging.error(
-                    f"Could not detect the start of the references section for paper {paper_id} in dataset type {dataset_type}"
+            return
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=initialize_cleanup_worker,
+            initargs=(self.cfg,),
+        ) as executor:
+            yield from executor.map(
+                clean_paper_in_worker,
+                [(paper_id, output_dataset_path) for paper_id in paper_ids],
+                chunksize=self.cfg.data.cleanup_processing.worker_chunksize,
+            )
+
+    def clean_paper(
+        self,
+        paper_id: str,
+        output_dataset_path: str,
+        dataset_reader_handler: Type[Corpus_Reader],
+    ) -> Tuple[str, Optional[Dict[str, int]]]:
+        dataset_type = path.basename(output_dataset_path)
+        logging.info(
+            f"Starting to clean up paper {paper_id} for dataset type {dataset_type}!"
+        )
+        try:
+            # Taken before the paper is read, so a source edited during its cleanup
+            # is cleaned again on the next run.
+            source_file_info = CleanupManifest.get_source_file_info(
+                dataset_reader_handler.get_paper_folder_filepath(
+                    self.cfg.data.data_path, paper_id
                 )
-                cleaned_paper_contents = current_paper_contents
-            paper_contents_str = self.join_paper_contents_together(
-                cleaned_paper_contents
             )
-            CleanedPapersGenerator.write_paper_contents_to_disk(
-                output_dataset_path, paper_id, paper_contents_str
+            current_paper_contents = dataset_reader_handler.read_paper_folder_contents(
+                self.cfg.data.data_path, paper_id
+            )
+            try:
+                paper_contents_str, cleanup_status = self.clean_paper_contents(
+                    current_paper_contents, dataset_reader_handler
+                )
+            finally:
+                dataset_reader_handler.close_paper_contents(current_paper_contents)
+        except Exception:
+            # A failed paper is retried on the next run instead of stopping the
+            # whole partition.
+            hydra_logger.exception(
+                f"Failed to clean up paper {paper_id} for dataset type {dataset_type}!"
             )
-            logging.info(
-                f"Finished cleaning up paper {paper_id} for dataset type {dataset_type}!"
+            return "failed", None
+        if cleanup_status == "references-not-found":
+            logging.error(
+                f"Could not detect the start of the references section for paper {paper_id} in dataset type {dataset_type}"
             )
+        CleanedPapersGenerator.write_paper_contents_to_disk(
+            output_dataset_path, paper_id, paper_contents_str
+        )
         logging.info(
-            f"Finished processing paper dataset! Output path: {output_dataset_path}"
+            f"Finished cleaning up paper {paper_id} for dataset type {dataset_type}!"
         )
-        return
+        return cleanup_status, source_file_info
+
+    def clean_paper_contents(
+        self,
+        current_paper_contents: List[str],
+        dataset_reader_handler: Type[Corpus_Reader],
+    ) -> Tuple[str, str]:
+        (
+            reference_tuple,
+            current_paper_contents,
+        ) = self.find_start_of_references_in_paper(
+            current_paper_contents, dataset_reader_handler
+        )
+        # In case we cannot find an indicator for a reference section, we keep the entire
+        # paper and document these ids.
+        if reference_tuple:
+            cleaned_paper_contents = self.extract_non_reference_paper_contents(
+                current_paper_contents, reference_tuple
+            )
+            cleanup_status = "cleaned"
+        else:
+            cleaned_paper_contents = current_paper_contents
+            cleanup_status = "references-not-found"
+        return self.join_paper_contents_together(cleaned_paper_contents), cleanup_status
 
     def create_dataset_type_folder_structure(self):
         dataset_type = self.cfg.data.data_path.split("/")[-1]
-        dataset_output_path = path.join(getcwd(), dataset_type)
+        dataset_output_path = path.join(
+            self.cfg.data.cleanup_processing.output_path or getcwd(), dataset_type
+        )
         CleanedPapersGenerator.create_directory(dataset_output_path)
         return dataset_output_path, dataset_type
 
+    @staticmethod
+    def get_output_filepath(folder_path: str, paper_id: str) -> str:
+        return path.join(folder_path, paper_id, "processed_paper.txt")
+
     @staticmethod
     def write_paper_contents_to_disk(
         folder_path: str, paper_id: str, paper_contents: str
     ):
-        output_path = path.join(folder_path, paper_id)
-        output_filename = path.join(output_path, "processed_paper.txt")
-        CleanedPapersGenerator.create_directory(output_path)
+        output_filename = CleanedPapersGenerator.get_output_filepath(
+            folder_path, paper_id
+        )
+        CleanedPapersGenerator.create_directory(path.dirname(output_filename))
         with open(output_filename, "w") as file_object:
             file_object.write(paper_contents)
         return
@@ -0,0 +1,159 @@
+from json import dumps
+from logging import getLogger
+from os import listdir, path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from omegaconf import DictConfig, OmegaConf
+from sklearn.feature_extraction.text import HashingVectorizer
+from data.label_vocabulary import LabelVocabulary
+from models.sklearn_text_classifier import SklearnTextClassifier
+from utils.paper_aggregation_utils import create_paper_offsets
+from utils.sentence_splitting_utils import iterate_sentences_in_text
+from utils.serialization_utils import get_jsonl_reader_iterator
+
+hydra_logger = getLogger(__name__)
+
+
+class SklearnPaperClassifier:
+    # Classifies papers with a checkpoint saved by the trainer. The sentences of
+    # micro_batch_size papers are featurized and predicted together, then their
+    # sentence predictions are aggregated per paper.
+    def __init__(self, cfg: DictConfig):
+        self.cfg = cfg
+        self.inference_cfg = cfg.data.inference
+        if not self.inference_cfg.model_path:
+            raise RuntimeError("Inference mode requires data.inference.model_path!")
+        self.label_vocabulary = LabelVocabulary.load(
+            path.join(self.inference_cfg.model_path, "labels.json")
+        )
+        self.labels = self.label_vocabulary.labels
+        self.model_class = SklearnTextClassifier(
+            cfg.models, list(range(len(self.labels)))
+        )
+        self.model_class.load_model(self.inference_cfg.model_path)
+        self.feature_extractor = HashingVectorizer(
+            **self.get_feature_extraction_params()
+        )
+
+    def get_feature_extraction_params(self) -> Dict:
+        if self.model_class.feature_extraction_params is not None:
+            return self.model_class.feature_extraction_params
+        # Checkpoints saved without their feature extraction params.
+        hydra_logger.warning(
+            f"Checkpoint at {self.inference_cfg.model_path} has no feature extraction params, using data.sklearn_feature_extraction!"
+        )
+        return OmegaConf.to_container(
+            self.cfg.data.sklearn_feature_extraction.hashing_vectorizer, resolve=True
+        )
+
+    def __call__(self):
+        output_path = self.inference_cfg.output_path
+        num_papers = 0
+        with open(output_path, "w") as file_object:
+            for paper_prediction in self.predict_papers(self.iterate_input_papers()):
+                file_object.write(dumps(paper_prediction))
+                file_object.write("\n")
+                num_papers += 1
+        hydra_logger.info(
+            f"Finished classifying {num_papers} papers! Output path: {output_path}"
+        )
+        return
+
+    def iterate_input_papers(self) -> Iterator[Tuple[str, str]]:
+        input_path = self.inference_cfg.input_path
+        if self.inference_cfg.input_format == "directory":
+            for paper_id in listdir(input_path):
+                paper_filepath = path.join(
+                    input_path, paper_id, self.inference_cfg.paper_filename
+                )
+                if paper_id.startswith(".") or not path.isfile(paper_filepath):
+                    continue
+                with open(paper_filepath, "r") as file_object:
+                    yield paper_id, file_object.read()
+        elif self.inference_cfg.input_format == "jsonl":
+            for paper_record in get_jsonl_reader_iterator(input_path):
+                yield (
+                    paper_record[self.inference_cfg.jsonl_id_field],
+                    paper_record[self.inference_cfg.jsonl_text_field],
+                )
+        else:
+            raise NotImplementedError(
+                f"Inference input format {self.inference_cfg.input_format} not supported!"
+            )
+
+    def predict_papers(
+        self, papers: Iterator[Tuple[str, str]]
+    ) -> Iterator[Dict[str, object]]:
+        micro_batch_paper_ids = []
+        micro_batch_paper_contents = []
+        for paper_id, paper_contents in papers:
+            micro_batch_paper_ids.append(paper_id)
+            micro_batch_paper_contents.append(paper_contents)
+            if len(micro_batch_paper_ids) == self.inference_cfg.micro_batch_size:
+                yield from self.predict_papers_micro_batch(
+                    micro_batch_paper_ids, micro_batch_paper_contents
+                )
+                micro_batch_paper_ids = []
+                micro_batch_paper_contents = []
+        if micro_batch_paper_ids:
+            yield from self.predict_papers_micro_batch(
+                micro_batch_paper_ids, micro_batch_paper_contents
+            )
+
+    def predict_papers_micro_batch(
+        self, paper_ids: List[str], paper_contents: List[str]
+    ) -> List[Dict[str, object]]:
+        micro_batch_sentences = []
+        paper_num_sentences = []
+        for current_paper_contents in paper_contents:
+            paper_sentences = self.split_paper_contents_into_sentences(
+                current_paper_contents
+            )
+            micro_batch_sentences += paper_sentences
+            paper_num_sentences.append(len(paper_sentences))
+        paper_scores = self.predict_paper_scores(
+            micro_batch_sentences, paper_num_sentences
+        )
+        predicted_label_ids = paper_scores.argmax(axis=1)
+        return [
+            {
+                "paper_id": paper_id,
+                # Papers without sentences have no scores to pick a label from.
+                "predicted_label": (
+                    self.labels[predicted_label_id] if num_sentences else None
+                ),
+                "num_sentences": num_sentences,
+            }
+            for paper_id, predicted_label_id, num_sentences in zip(
+                paper_ids, predicted_label_ids.tolist(), paper_num_sentences
+            )
+        ]
+
+    def predict_paper_scores(
+        self, micro_batch_sentences: List[str], paper_num_sentences: List[int]
+    ) -> np.ndarray:
+        if not micro_batch_sentences:
+            return np.zeros((len(paper_num_sentences), len(self.labels)))
+        transformed_features = self.model_class(
+            self.feature_extractor.transform(micro_batch_sentences)
+        )
+        return self.model_class.predict_paper_scores_from_features(
+            transformed_features,
+            create_paper_offsets(paper_num_sentences),
+            self.inference_cfg.paper_aggregation,
+        )
+
+    def split_paper_contents_into_sentences(self, raw_paper_contents: str) -> List[str]:
+        return list(iterate_sentences_in_text(raw_paper_contents))
+
+
+def main_inference_mode(cfg: DictConfig):
+    if cfg.trainer.model_framework == "sklearn":
+        sklearn_paper_classifier = SklearnPaperClassifier(cfg)
+        sklearn_paper_classifier()
+    else:
+        raise NotImplementedError(
+            f"Inference for framework {cfg.trainer.model_framework} not supported!"
+        )
+    return
@@ -0,0 +1,188 @@
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from logging import getLogger
+from queue import Empty, Queue
+from threading import Thread
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from omegaconf import DictConfig
+from main_operation_modes.inference import SklearnPaperClassifier
+
+hydra_logger = getLogger(__name__)
+
+
+class PredictionRequestCoalescer:
+    # Groups the papers of concurrent requests into one featurization and predict
+    # call. A batch is closed coalescing_window_ms after its first request arrived
+    # or once it holds max_batch_size papers.
+    def __init__(
+        self,
+        sklearn_paper_classifier: SklearnPaperClassifier,
+        coalescing_window_ms: float,
+        max_batch_size: int,
+    ):
+        self.sklearn_paper_classifier = sklearn_paper_classifier
+        self.coalescing_window_seconds = coalescing_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.request_queue = Queue()
+        self.prediction_thread = None
+
+    def start(self) -> None:
+        self.prediction_thread = Thread(target=self.run_prediction_loop, daemon=True)
+        self.prediction_thread.start()
+        return
+
+    def stop(self) -> None:
+        if self.prediction_thread is not None:
+            self.request_queue.put(None)
+            self.prediction_thread.join()
+            self.prediction_thread = None
+        return
+
+    def submit(self, paper_id: str, paper_contents: str) -> Future:
+        prediction_future = Future()
+        self.request_queue.put((paper_id, paper_contents, prediction_future))
+        return prediction_future
+
+    def run_prediction_loop(self) -> None:
+        is_stopping = False
+        while not is_stopping:
+            first_request = self.request_queue.get()
+            if first_request is None:
+                return
+            batch_requests = [first_request]
+            batch_deadline = perf_counter() + self.coalescing_window_seconds
+            while len(batch_requests) < self.max_batch_size:
+                try:
+                    request = self.request_queue.get(
+                        timeout=max(batch_deadline - perf_counter(), 0)
+                    )
+                except Empty:
+                    break
+                if request is None:
+                    # Answer the requests already taken before stopping.
+                    is_stopping = True
+                    break
+                batch_requests.append(request)
+            self.predict_batch(batch_requests)
+
+    def predict_batch(self, batch_requests: List[Tuple[str, str, Future]]) -> None:
+        paper_ids, paper_contents, prediction_futures = zip(*batch_requests)
+        try:
+            paper_predictions = (
+                self.sklearn_paper_classifier.predict_papers_micro_batch(
+                    list(paper_ids), list(paper_contents)
+                )
+            )
+        except Exception as prediction_error:
+            for prediction_future in prediction_futures:
+                prediction_future.set_exception(prediction_error)
+            return
+        for prediction_future, paper_prediction in zip(
+            prediction_futures, paper_predictions
+        ):
+            prediction_future.set_result(paper_prediction)
+        return
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    # POST /predict with {"text": ..., "paper_id": ...} returns the paper prediction.
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json_response(200, {"status": "ok"})
+        else:
+            self.send_json_response(404, {"error": f"Unknown path {self.path}!"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_json_response(404, {"error": f"Unknown path {self.path}!"})
+            return
+        try:
+            request_body = loads(
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            )
+            paper_contents = request_body["text"]
+        except (ValueError, KeyError, TypeError):
+            self.send_json_response(
+                400, {"error": "Request body must be a json object with a text field!"}
+            )
+            return
+        if not isinstance(paper_contents, str):
+            # Rejected here, a bad request would fail its whole coalesced batch.
+            self.send_json_response(400, {"error": "The text field must be a string!"})
+            return
+        prediction_future = self.server.prediction_coalescer.submit(
+            request_body.get("paper_id"), paper_contents
+        )
+        try:
+            paper_prediction = prediction_future.result(
+                self.server.request_timeout_seconds
+            )
+        except Exception as prediction_error:
+            self.send_json_response(500, {"error": str(prediction_error)})
+            return
+        self.send_json_response(200, paper_prediction)
+
+    def send_json_response(self, status_code: int, response_body: Dict) -> None:
+        encoded_body = dumps(response_body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+        return
+
+    def log_message(self, format: str, *args):
+        hydra_logger.debug(f"{self.address_string()} {format % args}")
+
+
+class PredictionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of concurrent clients overflow the default listen backlog of 5.
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        prediction_coalescer: PredictionRequestCoalescer,
+        request_timeout_seconds: float,
+    ):
+        super().__init__(server_address, PredictionRequestHandler)
+        self.prediction_coalescer = prediction_coalescer
+        self.request_timeout_seconds = request_timeout_seconds
+
+
+def create_prediction_server(cfg: DictConfig) -> PredictionHTTPServer:
+    server_cfg = cfg.data.prediction_server
+    # The checkpoint is loaded once and shared by every request.
+    prediction_coalescer = PredictionRequestCoalescer(
+        SklearnPaperClassifier(cfg),
+        server_cfg.coalescing_window_ms,
+        server_cfg.max_batch_size,
+    )
+    return PredictionHTTPServer(
+        (server_cfg.host, server_cfg.port),
+        prediction_coalescer,
+        server_cfg.request_timeout_seconds,
+    )
+
+
+def main_prediction_server_mode(cfg: DictConfig):
+    if cfg.trainer.model_framework != "sklearn":
+        raise NotImplementedError(
+            f"Prediction server for framework {cfg.trainer.model_framework} not supported!"
+        )
+    prediction_server = create_prediction_server(cfg)
+    prediction_server.prediction_coalescer.start()
+    host, port = prediction_server.server_address[:2]
+    hydra_logger.info(f"Serving paper predictions at http://{host}:{port}/predict")
+    try:
+        prediction_server.serve_forever()
+    except KeyboardInterrupt:
+        hydra_logger.info("Stopping prediction server!")
+    finally:
+        prediction_server.server_close()
+        prediction_server.prediction_coalescer.stop()
+    return
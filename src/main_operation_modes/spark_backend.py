@@ -0,0 +1,167 @@
+from json import dumps
+from logging import getLogger
+from os import path
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from omegaconf import DictConfig
+from data.corpus_reader import Corpus_Reader
+from main_operation_modes.generate_cleaned_papers import CleanedPapersGenerator
+from main_operation_modes.static_text_analysis import StaticTextAnalyzer
+
+hydra_logger = getLogger(__name__)
+
+
+def clean_papers_partition(
+    paper_ids: Iterator[str], cfg: DictConfig, output_dataset_path: str
+) -> Iterator[Tuple[str, str, Optional[Dict[str, int]]]]:
+    # Runs on the Spark executors, one corpus reader per partition.
+    corpus_reader = Corpus_Reader(**cfg.data)
+    cleaned_papers_generator = CleanedPapersGenerator(cfg)
+    for paper_id in paper_ids:
+        yield (paper_id,) + cleaned_papers_generator.clean_paper(
+            paper_id, output_dataset_path, corpus_reader
+        )
+
+
+def detect_in_papers_partition(
+    paper_ids: Iterator[str], cfg: DictConfig, static_text_analysis_mode: str
+) -> Iterator[str]:
+    # Runs on the Spark executors, yields one jsonl record per paper.
+    corpus_reader = Corpus_Reader(**cfg.data)
+    static_text_analyzer = StaticTextAnalyzer(cfg)
+    query_keywords = static_text_analyzer.get_section_keywords_to_query_in_papers(
+        corpus_reader
+    )
+    for paper_id in paper_ids:
+        paper_contents = corpus_reader.read_paper_folder_contents(
+            cfg.data.data_path, paper_id
+        )
+        try:
+            if static_text_analysis_mode == "detect-keywords":
+                paper_summary = static_text_analyzer.find_keywords_in_paper(
+                    paper_contents, query_keywords, corpus_reader, paper_id
+                )
+            else:
+                paper_summary = static_text_analyzer.detect_first_reference_in_paper(
+                    paper_contents, corpus_reader, paper_id
+                )
+        finally:
+            corpus_reader.close_paper_contents(paper_contents)
+        yield dumps(paper_summary)
+
+
+class SparkCorpusProcessor:
+    # Distributes the per paper work of the cleanup and static text analysis modes
+    # over the paper folders of data.data_path with Spark. Results are streamed back
+    # to the driver partition by partition, so outputs keep the listing order.
+    def __init__(self, cfg: DictConfig):
+        self.cfg = cfg
+        self.spark_session = None
+
+    def get_spark_context(self):
+        if self.spark_session is None:
+            # Only the spark backend depends on pyspark, import it on demand.
+            from pyspark.sql import SparkSession
+
+            spark_config = self.cfg.data.spark_backend
+            # Executors import the per partition functions from this source tree.
+            source_root = path.dirname(path.dirname(path.abspath(__file__)))
+            self.spark_session = (
+                SparkSession.builder.master(spark_config.master)
+                .appName(spark_config.app_name)
+                .config("spark.executorEnv.PYTHONPATH", source_root)
+                .getOrCreate()
+            )
+        return self.spark_session.sparkContext
+
+    def stop(self):
+        if self.spark_session is not None:
+            self.spark_session.stop()
+            self.spark_session = None
+        return
+
+    def parallelize_paper_ids(self, paper_ids: List[str]):
+        spark_context = self.get_spark_context()
+        num_partitions = (
+            self.cfg.data.spark_backend.num_partitions
+            or spark_context.defaultParallelism
+        )
+        return spark_context.parallelize(paper_ids, num_partitions)
+
+    def run_paper_cleanup(
+        self,
+        cleaned_papers_generator: CleanedPapersGenerator,
+        dataset_reader_handler: Type[Corpus_Reader],
+    ):
+        output_dataset_path, dataset_type = (
+            cleaned_papers_generator.create_dataset_type_folder_structure()
+        )
+        cleanup_manifest = cleaned_papers_generator.create_manifest(output_dataset_path)
+        paper_ids = cleaned_papers_generator.find_papers_to_clean(
+            dataset_reader_handler, cleanup_manifest, output_dataset_path
+        )
+        hydra_logger.info(
+            f"Cleaning up {len(paper_ids)} papers for dataset type {dataset_type} with Spark!"
+        )
+        cfg = self.cfg
+        cleanup_statuses = self.parallelize_paper_ids(paper_ids).mapPartitions(
+            lambda paper_ids_partition: clean_papers_partition(
+                paper_ids_partition, cfg, output_dataset_path
+            )
+        )
+        try:
+            with cleanup_manifest:
+                for (
+                    paper_id,
+                    cleanup_status,
+                    source_file_info,
+                ) in cleanup_statuses.toLocalIterator():
+                    cleanup_manifest.record_paper(
+                        paper_id, cleanup_status, source_file_info
+                    )
+        finally:
+            self.stop()
+        hydra_logger.info(
+            f"Finished processing paper dataset! Output path: {output_dataset_path}"
+        )
+        return
+
+    def run_static_text_analysis(
+        self,
+        static_text_analyzer: StaticTextAnalyzer,
+        dataset_reader_handler: Type[Corpus_Reader],
+    ):
+        static_text_analysis_mode = (
+            self.cfg.data.static_text_analysis.static_text_analysis_mode
+        )
+        if static_text_analysis_mode not in {
+            "detect-keywords",
+            "detect-first-reference",
+        }:
+            raise NotImplementedError(
+                f"Static text analysis mode {static_text_analysis_mode} is not supported by the spark backend!"
+            )
+        paper_ids = dataset_reader_handler.get_paper_folder_ids(self.cfg.data.data_path)
+        hydra_logger.info(
+            f"Running {static_text_analysis_mode} over {len(paper_ids)} papers with Spark!"
+        )
+        cfg = self.cfg
+        paper_summaries = self.parallelize_paper_ids(paper_ids).mapPartitions(
+            lambda paper_ids_partition: detect_in_papers_partition(
+                paper_ids_partition, cfg, static_text_analysis_mode
+            )
+        )
+        output_filename = self.cfg.data.static_text_analysis.keywords_dump_path
+        keyword_summary_writer = static_text_analyzer.create_keyword_summary_writer(
+            output_filename
+        )
+        try:
+            with keyword_summary_writer:
+                for paper_summary in paper_summaries.toLocalIterator():
+                    keyword_summary_writer.write_serialized_record(paper_summary)
+        finally:
+            self.stop()
+        hydra_logger.info(
+            f"Finished running {static_text_analysis_mode} with Spark! Output path: {output_filename}"
+        )
+        return
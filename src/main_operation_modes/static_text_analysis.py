@@ -1,9 +1,16 @@
 from omegaconf import DictConfig
 from typing import Dict, Generator, Tuple, List, Any, Type, Union
 from data.corpus_reader import Corpus_Reader
-from json import dumps
+from data.paper_analysis_store import PaperAnalysisStore
 from os import path
-from utils.serialization_utils import get_jsonl_reader_iterator, write_dict_to_json_file
+from utils.serialization_utils import (
+    JsonlWriter,
+    SpilledJsonDict,
+    SpilledJsonList,
+    close_spilled_json_containers,
+    get_jsonl_reader_iterator,
+    write_dict_to_json_file,
+)
 
 from logging import getLogger
 
@@ -43,12 +50,18 @@ class StaticTextAnalyzer(object):
             == "section-keywords-analysis"
         ):
             path_to_analysis_file = self.get_section_keyword_analysis_file_path()
-            jsonl_keyword_sums = StaticTextAnalyzer.get_jsonl_keywords_iterator(
-                path_to_analysis_file
-            )
-            summary_dict = self.compute_semantic_section_full_dataset_metrics(
-                jsonl_keyword_sums
-            )
+            if self.cfg.data.static_text_analysis.output_format == "sqlite":
+                with self.open_analysis_store(path_to_analysis_file) as analysis_store:
+                    summary_dict = (
+                        analysis_store.compute_semantic_section_full_dataset_metrics()
+                    )
+            else:
+                jsonl_keyword_sums = StaticTextAnalyzer.get_jsonl_keywords_iterator(
+                    path_to_analysis_file
+                )
+                summary_dict = self.compute_semantic_section_full_dataset_metrics(
+                    jsonl_keyword_sums
+                )
             StaticTextAnalyzer.write_keywords_json_to_disk(
                 "keywords_analysis.json", summary_dict
             )
@@ -58,13 +71,20 @@ class StaticTextAnalyzer(object):
 
     def handle_first_reference_analysis_mode(self):
         path_to_analysis_file = self.get_section_keyword_analysis_file_path()
-        jsonl_keyword_sums = StaticTextAnalyzer.get_jsonl_keywords_iterator(
-            path_to_analysis_file
-        )
-        (
-            single_count_ref_json,
-            non_single_count_ref_json,
-        ) = self.compute_first_reference_detection_breakdown(jsonl_keyword_sums)
+        if self.cfg.data.static_text_analysis.output_format == "sqlite":
+            with self.open_analysis_store(path_to_analysis_file) as analysis_store:
+                (
+                    single_count_ref_json,
+                    non_single_count_ref_json,
+                ) = analysis_store.compute_first_reference_detection_breakdown()
+        else:
+            jsonl_keyword_sums = StaticTextAnalyzer.get_jsonl_keywords_iterator(
+                path_to_analysis_file
+            )
+            (
+                single_count_ref_json,
+                non_single_count_ref_json,
+            ) = self.compute_first_reference_detection_breakdown(jsonl_keyword_sums)
         StaticTextAnalyzer.write_keywords_json_to_disk(
             "first_ref_single_counts_analysis.json", single_count_ref_json
         )
@@ -77,40 +97,31 @@ class StaticTextAnalyzer(object):
     def compute_first_reference_detection_breakdown(
         self, jsonl_data_iter: Generator[Dict, None, None]
     ) -> Tuple[Dict, Dict]:
+        # Only the counters stay in memory, the samples info of every paper is
+        # spilled to disk and streamed into the json files.
         single_count_first_refs_json = {
             "total_count": 0,
             "dataset_size_diff": 0,
-            "samples_info": {},
+            "samples_info": SpilledJsonDict(),
         }
         non_single_count_refs_json = {
             "total_count": 0,
             "dataset_size_diff": 0,
-            "samples_info": {},
+            "samples_info": SpilledJsonDict(),
         }
         dataset_size = 0
         for current_jsonl_sample in jsonl_data_iter:
             dataset_size += 1
             current_paper_id = current_jsonl_sample["id"]
             if current_jsonl_sample["first_ref_det_info"]["count"] == 1:
-                single_count_first_refs_json["total_count"] += 1
-                single_count_first_refs_json["samples_info"][current_paper_id] = {
-                    "ref_tuples": current_jsonl_sample["first_ref_det_info"][
-                        "ref_tuples"
-                    ]
-                }
-                single_count_first_refs_json["samples_info"][current_paper_id][
-                    "paper_len_count"
-                ] = current_jsonl_sample["paper_len_count"]
+                count_refs_json = single_count_first_refs_json
             else:
-                non_single_count_refs_json["total_count"] += 1
-                non_single_count_refs_json["samples_info"][current_paper_id] = {
-                    "ref_tuples": current_jsonl_sample["first_ref_det_info"][
-                        "ref_tuples"
-                    ]
-                }
-                non_single_count_refs_json["samples_info"][current_paper_id][
-                    "paper_len_count"
-                ] = current_jsonl_sample["paper_len_count"]
+                count_refs_json = non_single_count_refs_json
+            count_refs_json["total_count"] += 1
+            count_refs_json["samples_info"][current_paper_id] = {
+                "ref_tuples": current_jsonl_sample["first_ref_det_info"]["ref_tuples"],
+                "paper_len_count": current_jsonl_sample["paper_len_count"],
+            }
         single_count_first_refs_json["dataset_size_diff"] = (
             dataset_size - single_count_first_refs_json["total_count"]
         )
@@ -125,22 +136,32 @@ class StaticTextAnalyzer(object):
         dataset_reader_handler: Type[Corpus_Reader],
     ):
         hydra_logger.info("Searching dataset for presence of first reference!")
-        for current_paper_contents, paper_id in dataset_reader:
-            current_paper_contents = dataset_reader_handler.paper_contents_processor.remove_paper_contents_by_token_count(
-                current_paper_contents,
-                self.cfg.data.token_processing.token_threshold,
-                dataset_reader_handler.paper_semantic_keywords["refer"],
-            )
-            sample_first_ref_det = self.find_first_reference_matches_in_paper(
-                current_paper_contents, dataset_reader_handler, paper_id
-            )
-            self.write_keyword_summary_to_file(
-                sample_first_ref_det,
-                self.cfg.data.static_text_analysis.keywords_dump_path,
-            )
+        with self.create_keyword_summary_writer(
+            self.cfg.data.static_text_analysis.keywords_dump_path
+        ) as keyword_summary_writer:
+            for current_paper_contents, paper_id in dataset_reader:
+                sample_first_ref_det = self.detect_first_reference_in_paper(
+                    current_paper_contents, dataset_reader_handler, paper_id
+                )
+                keyword_summary_writer.write_record(sample_first_ref_det)
         hydra_logger.info("Finished searching dataset for first reference!")
         return
 
+    def detect_first_reference_in_paper(
+        self,
+        current_paper_contents: List[str],
+        dataset_reader_handler: Type[Corpus_Reader],
+        paper_id: str,
+    ):
+        current_paper_contents = dataset_reader_handler.paper_contents_processor.remove_paper_contents_by_token_count(
+            current_paper_contents,
+            self.cfg.data.token_processing.token_threshold,
+            dataset_reader_handler.paper_semantic_keywords["refer"],
+        )
+        return self.find_first_reference_matches_in_paper(
+            current_paper_contents, dataset_reader_handler, paper_id
+        )
+
     def find_first_reference_matches_in_paper(
         self,
         current_paper_contents: List[str],
@@ -179,16 +200,16 @@ class StaticTextAnalyzer(object):
     def compute_semantic_section_full_dataset_metrics(
         self, jsonl_data_iter: Generator[Dict, None, None]
     ):
-
+        # The paper id listings are spilled to disk, only the counters stay in memory.
         dataset_size = 0
         keywords_breakdown = {
-            "intro": {"count": 0, "paper_ids_missing": []},
-            "ending": {"count": 0, "paper_ids_missing": []},
+            "intro": {"count": 0, "paper_ids_missing": SpilledJsonList()},
+            "ending": {"count": 0, "paper_ids_missing": SpilledJsonList()},
         }
-        endings_sample_assignment = {}
+        endings_sample_assignment = SpilledJsonDict()
         for current_sample in jsonl_data_iter:
             dataset_size += 1
-            endings_sample_assignment[current_sample["id"]] = False
+            found_ending_section = False
             for current_section_type in current_sample["section_keyword_detection"]:
                 detection_section_info = current_sample["section_keyword_detection"][
                     current_section_type
@@ -198,27 +219,30 @@ class StaticTextAnalyzer(object):
                         keywords_breakdown["intro"]["count"] += 1
                     else:
                         # Visiting an ending section.
-                        if not endings_sample_assignment[current_sample["id"]]:
-                            keywords_breakdown["ending"]["count"] += 1
-                            endings_sample_assignment[current_sample["id"]] = True
+                        found_ending_section = True
                 else:
                     # This keyword was not detected so we track paper id that didn't have it.
                     if current_section_type == "intro":
                         keywords_breakdown[current_section_type][
                             "paper_ids_missing"
                         ].append(current_sample["id"])
+            if found_ending_section:
+                keywords_breakdown["ending"]["count"] += 1
+            endings_sample_assignment[current_sample["id"]] = found_ending_section
         keywords_breakdown["dataset_size"] = dataset_size
-        keywords_breakdown["ending"][
-            "paper_ids_missing"
-        ] = self.find_missing_paper_ids_for_ending_section(endings_sample_assignment)
+        self.find_missing_paper_ids_for_ending_section(
+            endings_sample_assignment,
+            keywords_breakdown["ending"]["paper_ids_missing"],
+        )
+        endings_sample_assignment.close()
         return keywords_breakdown
 
     def find_missing_paper_ids_for_ending_section(
-        self, endings_assignment_dict: Dict[str, bool]
-    ):
-        missing_paper_ids = []
-        for current_paper_id in endings_assignment_dict:
-            paper_id_status = endings_assignment_dict[current_paper_id]
+        self,
+        endings_assignment_dict: SpilledJsonDict,
+        missing_paper_ids: SpilledJsonList,
+    ) -> SpilledJsonList:
+        for current_paper_id, paper_id_status in endings_assignment_dict.items():
             if not paper_id_status:
                 missing_paper_ids.append(current_paper_id)
         return missing_paper_ids
@@ -227,7 +251,10 @@ class StaticTextAnalyzer(object):
     def write_keywords_json_to_disk(
         json_output_path: str, keywords_dict: Dict[str, Dict]
     ):
-        return write_dict_to_json_file(json_output_path, keywords_dict)
+        try:
+            return write_dict_to_json_file(json_output_path, keywords_dict)
+        finally:
+            close_spilled_json_containers(keywords_dict)
 
     @staticmethod
     def get_jsonl_keywords_iterator(jsonl_file_path: str):
@@ -248,28 +275,49 @@ class StaticTextAnalyzer(object):
             dataset_reader_handler
         )
         hydra_logger.info("Starting paper section keyword search across dataset!")
-        for current_paper, paper_id in dataset_reader:
-            current_paper_keyword_sum = self.find_keywords_in_paper(
-                current_paper, query_keywords, dataset_reader_handler, paper_id
-            )
-            self.write_keyword_summary_to_file(
-                current_paper_keyword_sum,
-                self.cfg.data.static_text_analysis.keywords_dump_path,
-            )
+        with self.create_keyword_summary_writer(
+            self.cfg.data.static_text_analysis.keywords_dump_path
+        ) as keyword_summary_writer:
+            for current_paper, paper_id in dataset_reader:
+                current_paper_keyword_sum = self.find_keywords_in_paper(
+                    current_paper, query_keywords, dataset_reader_handler, paper_id
+                )
+                keyword_summary_writer.write_record(current_paper_keyword_sum)
         hydra_logger.info(
             "Finished running static analysis on semantic section detection on research papers!"
         )
         return
 
-    def write_keyword_summary_to_file(
-        self, keyword_sum: Dict[str, Union[str, Dict]], output_filename: str
-    ):
-        if ".jsonl" in output_filename:
-            with open(output_filename, "a") as file_object:
-                file_object.write(dumps(keyword_sum))
-                file_object.write("\n")
-        else:
-            raise NotImplementedError(f"Output of analysis only in jsonl so far!")
+    def create_keyword_summary_writer(
+        self, output_filename: str
+    ) -> Union[JsonlWriter, PaperAnalysisStore]:
+        output_format = self.cfg.data.static_text_analysis.output_format
+        if output_format == "sqlite":
+            if not output_filename.endswith((".sqlite", ".db")):
+                raise NotImplementedError(
+                    "Output of analysis in sqlite only to .sqlite or .db files so far!"
+                )
+            return PaperAnalysisStore(
+                output_filename,
+                self.cfg.data.static_text_analysis.output_flush_every_records,
+            )
+        if output_format != "jsonl" or ".jsonl" not in output_filename:
+            raise NotImplementedError(
+                f"Output of analysis only in jsonl or sqlite so far!"
+            )
+        # One writer per run, summaries are appended through its buffer instead of
+        # reopening the output file for every paper.
+        return JsonlWriter(
+            output_filename,
+            self.cfg.data.static_text_analysis.output_buffer_size,
+            self.cfg.data.static_text_analysis.output_flush_every_records,
+        )
+
+    @staticmethod
+    def open_analysis_store(store_path: str) -> PaperAnalysisStore:
+        if not path.isfile(store_path):
+            raise RuntimeError(f"No analysis store found at {store_path}!")
+        return PaperAnalysisStore(store_path)
 
     def find_keywords_in_paper(
         self,
@@ -279,14 +327,14 @@ class StaticTextAnalyzer(object):
         paper_id: str,
     ):
         paper_content_info_dict = {"id": paper_id, "section_keyword_detection": {}}
+        sections_keyword_tuples = (
+            dataset_reader_handler.find_semantic_sections_in_paper(
+                paper_content, query_keywords
+            )
+        )
         for current_section_keyword in query_keywords:
-            try:
-                section_keyword_tuples = (
-                    dataset_reader_handler.find_semantic_section_in_paper(
-                        paper_content, current_section_keyword
-                    )
-                )
-            except AssertionError:
+            section_keyword_tuples = sections_keyword_tuples[current_section_keyword]
+            if not section_keyword_tuples:
                 hydra_logger.info(
                     f"Paper {paper_id} does not contain section type: {current_section_keyword}"
                 )
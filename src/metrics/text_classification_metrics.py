@@ -1,121 +1,160 @@
 from typing import Any, Dict
 
 import numpy as np
-from torchmetrics import Accuracy, Precision, Recall, F1, ConfusionMatrix
-import torch
 
 
 class TextClassificationMetrics:
+    # Accumulates a single num_labels x num_labels confusion matrix (rows are ground
+    # truth labels, columns are predictions) and derives the micro averaged metrics
+    # from it, so the memory footprint does not grow with the number of minibatches.
     def __init__(self, cfg: Dict, num_labels: int, dataset_type: str):
         self.cfg = cfg
+        self.num_labels = num_labels
+        self.metric_names = [
+            "accuracy",
+            "precision",
+            "recall",
+            "f1",
+            "confusion_matrix",
+        ]
+        self.mdmc_average = self.cfg.metrics_config.mdmc_average
         if dataset_type == "train":
-            self.metrics_summary = {
-                "accuracy": Accuracy(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.train_config.compute_on_step,
-                ),
-                "precision": Precision(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.train_config.compute_on_step,
-                ),
-                "recall": Recall(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.train_config.compute_on_step,
-                ),
-                "f1": F1(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.train_config.compute_on_step,
-                ),
-                "confusion_matrix": ConfusionMatrix(
-                    num_classes=num_labels,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.train_config.compute_on_step,
-                ),
-            }
+            self.compute_on_step = self.cfg.metrics_config.train_config.compute_on_step
         else:
-            self.metrics_summary = {
-                "accuracy": Accuracy(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.test_config.compute_on_step,
-                ),
-                "precision": Precision(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.test_config.compute_on_step,
-                ),
-                "recall": Recall(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.test_config.compute_on_step,
-                ),
-                "f1": F1(
-                    num_classes=num_labels,
-                    mdmc_average=self.cfg.metrics_config.mdmc_average,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.test_config.compute_on_step,
-                ),
-                "confusion_matrix": ConfusionMatrix(
-                    num_classes=num_labels,
-                    threshold=self.cfg.metrics_config.threshold,
-                    compute_on_step=self.cfg.metrics_config.test_config.compute_on_step,
-                ),
-            }
+            self.compute_on_step = self.cfg.metrics_config.test_config.compute_on_step
+        self.reset()
+
+    def reset(self):
+        self.confusion_matrix = np.zeros(
+            (self.num_labels, self.num_labels), dtype=np.int64
+        )
+        # Per sample metric sums, only used when mdmc_average is samplewise.
+        self.samplewise_metric_sums = np.zeros(4, dtype=np.float64)
+        self.num_samples = 0
+        return
 
     def __call__(self, predictions: Any, ground_truth: Any):
-        # TODO: Change the type of predictions later.
         # Compute the minibatch metric performance here.
-        predictions, ground_truth = self.check_and_transform_data_to_torch_tensors(
+        predictions, ground_truth = self.check_and_transform_data_to_label_arrays(
             predictions, ground_truth
         )
-        per_step_metric = {
-            "accuracy": None,
-            "precision": None,
-            "recall": None,
-            "f1": None,
-            "confusion_matrix": None,
-        }
-        for current_metric in self.metrics_summary:
-            metric_value = self.metrics_summary[current_metric](
+        batch_confusion_matrix = self.compute_confusion_matrix(
+            predictions, ground_truth
+        )
+        self.confusion_matrix += batch_confusion_matrix
+        if self.mdmc_average == "samplewise":
+            batch_samplewise_metrics = self.compute_samplewise_metrics(
                 predictions, ground_truth
             )
-            per_step_metric[current_metric] = metric_value
-        return per_step_metric
+            self.samplewise_metric_sums += batch_samplewise_metrics.sum(axis=0)
+            self.num_samples += batch_samplewise_metrics.shape[0]
+        if not self.compute_on_step:
+            return {metric_name: None for metric_name in self.metric_names}
+        if self.mdmc_average == "samplewise":
+            return self.create_metrics_summary(
+                batch_samplewise_metrics.mean(axis=0), batch_confusion_matrix
+            )
+        return self.create_metrics_summary(
+            self.compute_micro_metrics(batch_confusion_matrix), batch_confusion_matrix
+        )
 
-    def check_and_transform_data_to_torch_tensors(
+    def check_and_transform_data_to_label_arrays(
         self, predictions: Any, ground_truth: Any
     ):
-        if isinstance(predictions, np.ndarray) and isinstance(ground_truth, np.ndarray):
-            predictions = torch.from_numpy(predictions)
-            ground_truth = torch.from_numpy(ground_truth)
-        else:
+        if not (
+            isinstance(predictions, np.ndarray) and isinstance(ground_truth, np.ndarray)
+        ):
             raise RuntimeError(
                 "Predictions and ground truths have different data types. Handle!"
             )
-        return predictions, ground_truth
+        if predictions.ndim == ground_truth.ndim + 1:
+            # Class scores, keep the highest scoring label.
+            predictions = predictions.argmax(axis=-1)
+        if predictions.shape != ground_truth.shape:
+            raise RuntimeError(
+                f"Predictions of shape {predictions.shape} do not match ground truths of shape {ground_truth.shape}!"
+            )
+        if ground_truth.ndim > 1 and self.mdmc_average not in {"global", "samplewise"}:
+            raise RuntimeError(
+                "Multi-dimensional inputs require mdmc_average to be global or samplewise!"
+            )
+        return predictions.astype(np.int64), ground_truth.astype(np.int64)
 
-    def compute_global_metric_performance(self):
-        global_metrics_summary = {
-            "accuracy": None,
-            "precision": None,
-            "recall": None,
-            "f1": None,
-            "confusion_matrix": None,
+    def compute_confusion_matrix(
+        self, predictions: np.ndarray, ground_truth: np.ndarray
+    ) -> np.ndarray:
+        flat_indexes = ground_truth.ravel() * self.num_labels + predictions.ravel()
+        return np.bincount(flat_indexes, minlength=self.num_labels**2).reshape(
+            self.num_labels, self.num_labels
+        )
+
+    def compute_micro_metrics(self, confusion_matrix: np.ndarray) -> np.ndarray:
+        true_positives = np.trace(confusion_matrix)
+        num_predictions = confusion_matrix.sum()
+        # Every wrong prediction is a false positive of the predicted label and a
+        # false negative of the ground truth label.
+        false_positives = num_predictions - true_positives
+        false_negatives = num_predictions - true_positives
+        accuracy = TextClassificationMetrics.safe_divide(
+            true_positives, num_predictions
+        )
+        precision = TextClassificationMetrics.safe_divide(
+            true_positives, true_positives + false_positives
+        )
+        recall = TextClassificationMetrics.safe_divide(
+            true_positives, true_positives + false_negatives
+        )
+        f1 = TextClassificationMetrics.safe_divide(
+            2 * precision * recall, precision + recall
+        )
+        return np.array([accuracy, precision, recall, f1], dtype=np.float64)
+
+    def compute_samplewise_metrics(
+        self, predictions: np.ndarray, ground_truth: np.ndarray
+    ) -> np.ndarray:
+        # Micro metrics of every sample (first axis) computed over its remaining axes.
+        predictions = predictions.reshape(predictions.shape[0], -1)
+        ground_truth = ground_truth.reshape(ground_truth.shape[0], -1)
+        true_positives = (predictions == ground_truth).sum(axis=1)
+        num_predictions = np.full(true_positives.shape, ground_truth.shape[1])
+        accuracy = TextClassificationMetrics.safe_divide(
+            true_positives, num_predictions
+        )
+        # Micro precision and recall reduce to accuracy for multi-class inputs.
+        f1 = TextClassificationMetrics.safe_divide(
+            2 * accuracy * accuracy, accuracy + accuracy
+        )
+        return np.stack([accuracy, accuracy, accuracy, f1], axis=1)
+
+    @staticmethod
+    def safe_divide(numerator: Any, denominator: Any) -> Any:
+        numerator = np.asarray(numerator, dtype=np.float64)
+        denominator = np.asarray(denominator, dtype=np.float64)
+        return np.divide(
+            numerator,
+            denominator,
+            out=np.zeros(np.broadcast(numerator, denominator).shape),
+            where=denominator != 0,
+        )
+
+    def create_metrics_summary(
+        self, metric_values: np.ndarray, confusion_matrix: np.ndarray
+    ) -> Dict[str, Any]:
+        metrics_summary = {
+            metric_name: np.float32(metric_value)
+            for metric_name, metric_value in zip(self.metric_names, metric_values)
         }
-        for current_metric in self.metrics_summary:
-            curr_global_value = self.metrics_summary[current_metric].compute()
-            global_metrics_summary[current_metric] = curr_global_value
-            # Reset each metric to be used for a new epoch calculation.
-            self.metrics_summary[current_metric].reset()
+        metrics_summary["confusion_matrix"] = confusion_matrix.astype(np.float32)
+        return metrics_summary
+
+    def compute_global_metric_performance(self):
+        if self.mdmc_average == "samplewise":
+            metric_values = self.samplewise_metric_sums / max(self.num_samples, 1)
+        else:
+            metric_values = self.compute_micro_metrics(self.confusion_matrix)
+        global_metrics_summary = self.create_metrics_summary(
+            metric_values, self.confusion_matrix
+        )
+        # Reset the accumulated statistics to be used for a new epoch calculation.
+        self.reset()
         return global_metrics_summary
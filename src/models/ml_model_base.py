@@ -22,6 +22,11 @@ class MLModel:
     def forward_pass(self, input_data: Any, return_predicted_labels: bool):
         raise NotImplementedError("Overwrite this method for the forward pass logic!")
 
+    def predict_from_features(self, transformed_features: Any):
+        raise NotImplementedError(
+            "Overwrite this method for predicting labels from forward pass outputs!"
+        )
+
     def load_model(self, model_path: str):
         raise NotImplementedError("Overwrite this method for the model loading logic!")
 
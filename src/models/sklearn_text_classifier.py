@@ -1,9 +1,17 @@
-from typing import List
+from json import dump, load
+from os import path
+from typing import List, Optional
 from models.ml_model_base import MLModel, Dict, Any
 import mlflow.sklearn
+import numpy as np
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import SGDClassifier
+from utils.paper_aggregation_utils import (
+    average_sentence_scores_per_paper,
+    count_sentence_label_votes_per_paper,
+)
+from utils.feature_scaling_utils import StreamingScalerStatistics
 from logging import getLogger
 
 hydra_logger = getLogger(__name__)
@@ -26,17 +34,79 @@ class SklearnModel(MLModel):
         hydra_logger.info(f"Finished saving sklearn model at: {model_path}!")
         return
 
+    def save_feature_preprocessors(
+        self, feature_preprocessors: Pipeline, model_path: str
+    ):
+        # Fitted preprocessing statistics are needed to transform inference inputs.
+        mlflow.sklearn.save_model(
+            feature_preprocessors,
+            path.join(model_path, "feature_preprocessors"),
+            serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_PICKLE,
+        )
+        return
+
     def load_model(self, model_path: str):
-        sklearn_model = mlflow.sklearn.load_model(model_path)
-        # TODO: Figure out how to best reassign the class model attribute
-        # once starting on the inference mode.
+        self.model = mlflow.sklearn.load_model(model_path)
+        hydra_logger.info(f"Finished loading sklearn model from: {model_path}!")
         return
 
 
 class SklearnTextClassifier(SklearnModel):
-    def __init__(self, model_config: Dict, class_ids: List[int]):
+    def __init__(
+        self,
+        model_config: Dict,
+        class_ids: List[int],
+        feature_extraction_params: Optional[Dict] = None,
+    ):
         super().__init__(model_config)
         self.class_ids = class_ids
+        self.is_training = True
+        # HashingVectorizer params of the training features, saved with the model so
+        # inference hashes sentences the same way.
+        self.feature_extraction_params = feature_extraction_params
+
+    def set_training_mode(self, is_training: bool):
+        # Streaming preprocessors only update their statistics while training.
+        self.is_training = is_training
+        if not is_training:
+            self.finalize_streaming_scaler()
+        return
+
+    def save_model(self, model_path: str):
+        super().save_model(model_path)
+        if hasattr(self, "feature_preprocessors"):
+            self.finalize_streaming_scaler()
+            self.save_feature_preprocessors(self.feature_preprocessors, model_path)
+        if self.feature_extraction_params is not None:
+            with open(
+                path.join(model_path, "feature_extraction.json"), "w"
+            ) as file_object:
+                dump(self.feature_extraction_params, file_object)
+        return
+
+    def load_model(self, model_path: str):
+        super().load_model(model_path)
+        feature_extraction_path = path.join(model_path, "feature_extraction.json")
+        if path.exists(feature_extraction_path):
+            with open(feature_extraction_path, "r") as file_object:
+                self.feature_extraction_params = load(file_object)
+        if hasattr(self, "feature_preprocessors"):
+            feature_preprocessors_path = path.join(model_path, "feature_preprocessors")
+            if path.exists(feature_preprocessors_path):
+                self.feature_preprocessors = mlflow.sklearn.load_model(
+                    feature_preprocessors_path
+                )
+            elif self.scaler_fit_mode == "streaming":
+                raise RuntimeError(
+                    f"Checkpoint at {model_path} has no fitted feature preprocessors!"
+                )
+        if hasattr(self.model, "coef_"):
+            # Predictions multiply sparse features by coef_.T, which scipy copies
+            # into C order on every call unless coef_ is stored in Fortran order.
+            self.model.coef_ = np.asfortranarray(self.model.coef_)
+        # Loaded checkpoints are only used for predictions.
+        self.set_training_mode(False)
+        return
 
     def initialize_model_architecture(self, model_config: Dict):
         if model_config.sklearn_model_config.feature_preprocessing:
@@ -51,13 +121,73 @@ class SklearnTextClassifier(SklearnModel):
 
     def forward_pass(self, input_data: Any, return_predicted_labels: bool = False):
         if hasattr(self, "feature_preprocessors"):
-            input_data = self.feature_preprocessors.fit_transform(input_data)
+            input_data = self.preprocess_features(input_data)
         if return_predicted_labels:
-            return self.model.predict(input_data)
+            return self.predict_from_features(input_data)
         else:
             return input_data
 
+    def predict_from_features(self, transformed_features: Any):
+        # Predicts on the output of a forward pass without re-running the feature
+        # preprocessors over the minibatch.
+        return self.model.predict(transformed_features)
+
+    def predict_paper_scores_from_features(
+        self,
+        transformed_features: Any,
+        paper_offsets: np.ndarray,
+        paper_aggregation: str,
+        sentence_label_ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        # Returns [num_papers, num_classes] scores, the predicted paper label is the
+        # argmax. Sentence rows of a paper are paper_offsets[i]:paper_offsets[i + 1].
+        if paper_aggregation == "vote":
+            if sentence_label_ids is None:
+                sentence_label_ids = self.predict_from_features(transformed_features)
+            return count_sentence_label_votes_per_paper(
+                sentence_label_ids, paper_offsets, len(self.class_ids)
+            )
+        elif paper_aggregation == "mean-proba":
+            return average_sentence_scores_per_paper(
+                self.model.predict_proba(transformed_features), paper_offsets
+            )
+        else:
+            raise NotImplementedError(
+                f"Paper aggregation {paper_aggregation} is not supported!"
+            )
+
+    def preprocess_features(self, input_data: Any):
+        if self.scaler_fit_mode == "per-batch":
+            return self.feature_preprocessors.fit_transform(input_data)
+        if self.is_training and self.feature_preprocessors.steps:
+            # Accumulate the statistics of every training minibatch seen so far, the
+            # scaler is only updated for the columns of the minibatch.
+            standard_scaler = self.feature_preprocessors.named_steps["standard-scaler"]
+            if self.scaler_statistics is None:
+                self.scaler_statistics = StreamingScalerStatistics(input_data.shape[1])
+            column_ids = self.scaler_statistics.update(input_data)
+            self.scaler_statistics.update_scaler(standard_scaler, column_ids)
+        return self.feature_preprocessors.transform(input_data)
+
+    def finalize_streaming_scaler(self):
+        # Columns missing from the last minibatches still have the mean and variance
+        # of fewer samples, all columns are updated once before the scaler is used
+        # outside of training.
+        if getattr(self, "scaler_statistics", None) is not None:
+            self.scaler_statistics.update_scaler(
+                self.feature_preprocessors.named_steps["standard-scaler"]
+            )
+        return
+
     def setup_feature_preprocessor(self, feature_preprocessor_config: Dict):
+        self.scaler_fit_mode = feature_preprocessor_config.get(
+            "scaler_fit_mode", "per-batch"
+        )
+        self.scaler_statistics = None
+        if self.scaler_fit_mode not in {"per-batch", "streaming"}:
+            raise NotImplementedError(
+                f"Scaler fit mode {self.scaler_fit_mode} is not supported!"
+            )
         pipeline_steps = []
         if feature_preprocessor_config.use_standard_scaler:
             pipeline_steps.append(
@@ -1,5 +1,6 @@
 from types import GeneratorType
 from data.corpus_reader import Corpus_Reader
+from data.mapped_paper import MappedPaper
 from hydra import initialize, compose
 
 
@@ -70,7 +71,7 @@ class TestCorpusReader:
         assert (
             "economics" in paper_category
             and type(corpus_data_iter) == GeneratorType
-            and type(sample_paper_contents) == list
+            and type(sample_paper_contents) == MappedPaper
         )
 
     def test_corpus_reader_unique_labels(self):
@@ -137,3 +138,32 @@ class TestCorpusReader:
             multiple_sem_section_tuples, paper_length, 0.8
         )
         assert selected_section[0] == ("References\n", "references", 1409)
+
+    def test_corpus_reader_detect_all_sections_single_pass(self, tmp_path):
+        paper_path = tmp_path / "economics_1" / "paper.txt"
+        paper_path.parent.mkdir()
+        paper_path.write_text(
+            "A study of markets\n1 Introduction\nMarkets are studied here.\n"
+            + "Body text line.\n" * 20
+            + "5 Conclusion\nWe conclude.\nReferences\n[1] A. Author (2001).\n"
+        )
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=["data=exploration", f"data.data_path={paper_path}"],
+            )
+        corpus_reader = Corpus_Reader(**cfg.data)
+        test_paper_contents = corpus_reader()
+        section_types = list(corpus_reader.paper_semantic_keywords_dict.keys())
+        sections_keyword_tuples = corpus_reader.find_semantic_sections_in_paper(
+            test_paper_contents, section_types
+        )
+        assert list(sections_keyword_tuples.keys()) == section_types
+        assert sections_keyword_tuples["acknow"] == []
+        for section_type in ["intro", "conc", "refer"]:
+            assert sections_keyword_tuples[
+                section_type
+            ] == corpus_reader.find_semantic_section_in_paper(
+                test_paper_contents, section_type
+            )
+        assert sections_keyword_tuples["intro"][0][1:] == ("introduction", 1)
@@ -0,0 +1,50 @@
+from data.dataset_index import DatasetIndex
+
+
+def write_mock_papers(dataset_path, paper_ids):
+    for paper_id in paper_ids:
+        paper_folder = dataset_path / paper_id
+        paper_folder.mkdir(parents=True)
+        (paper_folder / "processed_paper.txt").write_text(f"Paper {paper_id}. Ends!")
+
+
+class TestDatasetIndex:
+    def test_dataset_index_build_and_reload(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_papers(dataset_path, ["robotics_1", "biology_1", "robotics_2"])
+        (dataset_path / ".DS_Store").write_text("")
+        index_path = str(tmp_path / ".dataset_index" / "train.npz")
+        dataset_index = DatasetIndex.load_or_build(
+            str(dataset_path), index_path, "processed_paper.txt"
+        )
+        assert sorted(dataset_index.paper_ids) == [
+            "biology_1",
+            "robotics_1",
+            "robotics_2",
+        ]
+        assert dataset_index.categories == ["biology", "robotics"]
+
+        # An unchanged partition is loaded from disk.
+        reloaded_index = DatasetIndex.load_or_build(
+            str(dataset_path), index_path, "processed_paper.txt"
+        )
+        assert reloaded_index.paper_ids == dataset_index.paper_ids
+
+        write_mock_papers(dataset_path, ["astrophysics_1"])
+        rebuilt_index = DatasetIndex.load_or_build(
+            str(dataset_path), index_path, "processed_paper.txt"
+        )
+        assert len(rebuilt_index) == 4
+        assert rebuilt_index.categories == ["astrophysics", "biology", "robotics"]
+
+    def test_dataset_index_only_lists_the_partition(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_papers(dataset_path, ["robotics_1"])
+        # Paper files are not opened while indexing, a folder without its paper
+        # file is listed and only fails when the paper is read.
+        (dataset_path / "biology_1").mkdir()
+        dataset_index = DatasetIndex.build(str(dataset_path), "processed_paper.txt")
+        assert sorted(dataset_index.paper_ids) == ["biology_1", "robotics_1"]
+        assert dataset_index.get_paper_filepath(str(dataset_path), "biology_1") == str(
+            dataset_path / "biology_1" / "processed_paper.txt"
+        )
@@ -1,5 +1,6 @@
 from hydra import initialize, compose
 from data.experiment_corpus_readers import SklearnTextClassificationReader
+from data.minibatch_prefetcher import MinibatchPrefetcher
 from scipy.sparse.csr import csr_matrix
 
 
@@ -27,3 +28,204 @@ class TestSklearnTextClassificationReader:
         assert reader_sample[2] == ["robotics_30", "astrophysics_70"]
         assert len(reader_sample[1]) == 408
         assert isinstance(reader_sample[0], csr_matrix)
+
+    def test_sklearn_text_classification_reader_feature_cache(self, tmp_path):
+        write_mock_processed_dataset(tmp_path)
+        raw_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false"]
+        )
+        cached_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=true"]
+        )
+        assert (tmp_path / ".feature_cache").is_dir()
+        assert_same_minibatches(raw_minibatches, cached_minibatches)
+
+    def test_sklearn_text_classification_reader_worker_pool(self, tmp_path):
+        write_mock_processed_dataset(tmp_path)
+        raw_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false"]
+        )
+        worker_pool_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false", "data.num_workers=2"]
+        )
+        assert_same_minibatches(raw_minibatches, worker_pool_minibatches)
+
+    def test_sklearn_text_classification_reader_shared_label_vocabulary(self, tmp_path):
+        write_mock_processed_dataset(tmp_path)
+        # The valid partition misses the robotics category.
+        paper_folder = tmp_path / "valid" / "biology_4"
+        paper_folder.mkdir(parents=True)
+        (paper_folder / "processed_paper.txt").write_text("A biology sentence.")
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=experiments",
+                    f"data.data_path={tmp_path}",
+                    "data.batch_size=1",
+                ],
+            )
+        train_reader = SklearnTextClassificationReader(cfg.data, "train")
+        valid_reader = SklearnTextClassificationReader(
+            cfg.data, "valid", label_vocabulary=train_reader.label_vocabulary
+        )
+        assert train_reader.labels == valid_reader.labels == ["biology", "robotics"]
+        assert list(valid_reader)[0][1] == [0]
+
+    def test_sklearn_text_classification_reader_sentence_budget(self, tmp_path):
+        write_mock_processed_dataset(tmp_path)
+        raw_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false"]
+        )
+        # Every mock paper has 3 sentences, a budget of 7 packs two papers.
+        packed_minibatches = read_mock_dataset_minibatches(
+            tmp_path,
+            [
+                "data.batch_budget.unit=sentences",
+                "data.batch_budget.max_units_per_batch=7",
+            ],
+        )
+        assert_same_minibatches(raw_minibatches, packed_minibatches)
+        # A budget below the paper length splits papers into row chunks.
+        split_minibatches = read_mock_dataset_minibatches(
+            tmp_path,
+            [
+                "data.batch_budget.unit=nonzeros",
+                "data.batch_budget.max_units_per_batch=8",
+                "data.feature_cache.enabled=false",
+            ],
+        )
+        assert all(minibatch[0].nnz <= 8 for minibatch in split_minibatches)
+        assert sum(minibatch[0].shape[0] for minibatch in split_minibatches) == 15
+        assert split_minibatches[0][2] == [raw_minibatches[0][2][0]]
+
+    def test_sklearn_text_classification_reader_empty_paper(self, tmp_path):
+        write_mock_processed_dataset(tmp_path, empty_paper_ids=["robotics_3"])
+        minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false"], num_papers=6
+        )
+        assert_empty_paper_minibatches(minibatches, "robotics_3")
+
+    def test_sklearn_text_classification_reader_feature_cache_empty_paper(
+        self, tmp_path
+    ):
+        write_mock_processed_dataset(tmp_path, empty_paper_ids=["robotics_3"])
+        raw_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false"], num_papers=6
+        )
+        # The store is built with the empty paper, then read back from disk.
+        for _ in range(2):
+            cached_minibatches = read_mock_dataset_minibatches(
+                tmp_path, ["data.feature_cache.enabled=true"], num_papers=6
+            )
+            assert_empty_paper_minibatches(cached_minibatches, "robotics_3")
+            for raw_minibatch, cached_minibatch in zip(
+                raw_minibatches, cached_minibatches
+            ):
+                assert raw_minibatch[1:3] == cached_minibatch[1:3]
+                assert (raw_minibatch[0] != cached_minibatch[0]).nnz == 0
+                assert raw_minibatch[3].tolist() == cached_minibatch[3].tolist()
+        assert len(list((tmp_path / ".feature_cache").iterdir())) == 1
+
+    def test_sklearn_text_classification_reader_worker_pool_empty_paper(self, tmp_path):
+        write_mock_processed_dataset(tmp_path, empty_paper_ids=["robotics_3"])
+        worker_pool_minibatches = read_mock_dataset_minibatches(
+            tmp_path,
+            ["data.feature_cache.enabled=false", "data.num_workers=2"],
+            num_papers=6,
+        )
+        assert_empty_paper_minibatches(worker_pool_minibatches, "robotics_3")
+
+    def test_sklearn_text_classification_reader_reuses_worker_pool(self, tmp_path):
+        write_mock_processed_dataset(tmp_path)
+        raw_minibatches = read_mock_dataset_minibatches(
+            tmp_path, ["data.feature_cache.enabled=false"]
+        )
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=experiments",
+                    f"data.data_path={tmp_path}",
+                    "data.batch_size=2",
+                    "data.feature_cache.enabled=false",
+                    "data.num_workers=2",
+                ],
+            )
+        with SklearnTextClassificationReader(
+            cfg.data, "train", cfg.experiment_seed
+        ) as sklearn_experiment_reader:
+            featurization_pools = []
+            for _ in range(2):
+                # Epochs are iterated in the prefetcher thread, like in the trainer.
+                assert_same_minibatches(
+                    raw_minibatches,
+                    list(MinibatchPrefetcher(sklearn_experiment_reader, 2)),
+                )
+                featurization_pools.append(sklearn_experiment_reader.featurization_pool)
+            assert featurization_pools[0] is featurization_pools[1] is not None
+        assert sklearn_experiment_reader.featurization_pool is None
+
+
+def write_mock_processed_dataset(dataset_path, empty_paper_ids=()):
+    for paper_id in ["robotics_1", "robotics_2", "biology_1", "biology_2", "biology_3"]:
+        paper_folder = dataset_path / "train" / paper_id
+        paper_folder.mkdir(parents=True)
+        (paper_folder / "processed_paper.txt").write_text(
+            f"First sentence of {paper_id}. A second one! And a third? "
+        )
+    for paper_id in empty_paper_ids:
+        paper_folder = dataset_path / "train" / paper_id
+        paper_folder.mkdir(parents=True)
+        (paper_folder / "processed_paper.txt").write_text("")
+    (dataset_path / "train" / ".DS_Store").write_text("")
+
+
+def read_mock_dataset_minibatches(dataset_path, overrides, num_papers=5):
+    with initialize(config_path="../config"):
+        cfg = compose(
+            config_name="config.yaml",
+            overrides=[
+                "data=experiments",
+                f"data.data_path={dataset_path}",
+                "data.batch_size=2",
+            ]
+            + overrides,
+        )
+    with SklearnTextClassificationReader(
+        cfg.data, "train", cfg.experiment_seed
+    ) as sklearn_experiment_reader:
+        minibatches = list(sklearn_experiment_reader)
+    assert sklearn_experiment_reader.epoch_stats["num_papers"] == num_papers
+    assert sklearn_experiment_reader.epoch_stats["num_sentences"] == 15
+    return minibatches
+
+
+def assert_same_minibatches(expected_minibatches, minibatches):
+    # 5 papers in minibatches of 2, the last minibatch holds the remaining paper.
+    assert len(expected_minibatches) == len(minibatches) == 3
+    for expected_minibatch, minibatch in zip(expected_minibatches, minibatches):
+        assert expected_minibatch[2] == minibatch[2]
+        assert expected_minibatch[1] == minibatch[1]
+        assert (expected_minibatch[0] != minibatch[0]).nnz == 0
+        assert expected_minibatch[3].tolist() == minibatch[3].tolist()
+    assert [minibatch[3].tolist() for minibatch in minibatches] == [
+        [0, 3, 6],
+        [0, 3, 6],
+        [0, 3],
+    ]
+
+
+def assert_empty_paper_minibatches(minibatches, empty_paper_id):
+    # The empty paper is read as a paper without feature rows.
+    for (
+        minibatch_features,
+        minibatch_labels,
+        minibatch_paper_ids,
+        paper_offsets,
+    ) in minibatches:
+        assert minibatch_features.shape[0] == len(minibatch_labels) == paper_offsets[-1]
+        if empty_paper_id in minibatch_paper_ids:
+            paper_position = minibatch_paper_ids.index(empty_paper_id)
+            assert paper_offsets[paper_position] == paper_offsets[paper_position + 1]
+    assert sum(len(minibatch[2]) for minibatch in minibatches) == 6
@@ -0,0 +1,133 @@
+from json import loads
+from data.corpus_reader import Corpus_Reader
+from hydra import initialize, compose
+from main_operation_modes.generate_cleaned_papers import (
+    CleanedPapersGenerator,
+    CleanupManifest,
+)
+
+
+def write_mock_paper_dataset(dataset_path):
+    for paper_id in ["economics_1", "robotics_1", "robotics_2"]:
+        paper_folder = dataset_path / paper_id
+        paper_folder.mkdir(parents=True)
+        (paper_folder / "paper.txt").write_text(
+            "1 Introduction\n"
+            + f"The body of paper {paper_id} spans a few lines of text.\n" * 10
+            + "References\n[1] A. Author et al. Some journal (2001).\n"
+        )
+
+
+class TestCleanedPapersGenerator:
+    def test_cleaned_papers_generator_resumes_from_manifest(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=paper_cleanup",
+                    f"data.data_path={dataset_path}",
+                    f"data.cleanup_processing.output_path={tmp_path / 'cleaned'}",
+                ],
+            )
+        corpus_reader = Corpus_Reader(**cfg.data)
+        cleaned_papers_generator = CleanedPapersGenerator(cfg)
+        cleaned_papers_generator(corpus_reader)
+        output_path = tmp_path / "cleaned" / "train"
+        cleaned_paper = (output_path / "robotics_1" / "processed_paper.txt").read_text()
+        assert cleaned_paper.startswith("The body of paper robotics_1")
+        assert "References" not in cleaned_paper
+        manifest_lines = (
+            (output_path / "cleanup_manifest.jsonl").read_text().split("\n")
+        )
+        assert len(manifest_lines) == 4 and '"status": "cleaned"' in manifest_lines[0]
+
+        (dataset_path / "robotics_2" / "paper.txt").write_text(
+            "1 Introduction\nAn updated body for the second robotics paper.\n"
+        )
+        papers_to_clean = cleaned_papers_generator.find_papers_to_clean(
+            corpus_reader,
+            cleaned_papers_generator.create_manifest(str(output_path)),
+            str(output_path),
+        )
+        assert papers_to_clean == ["robotics_2"]
+
+    def test_cleaned_papers_generator_records_missing_source_as_failed(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        (dataset_path / "robotics_3").mkdir()
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=paper_cleanup",
+                    f"data.data_path={dataset_path}",
+                    f"data.cleanup_processing.output_path={tmp_path / 'cleaned'}",
+                ],
+            )
+        corpus_reader = Corpus_Reader(**cfg.data)
+        cleaned_papers_generator = CleanedPapersGenerator(cfg)
+        cleaned_papers_generator(corpus_reader)
+        output_path = tmp_path / "cleaned" / "train"
+        paper_statuses = {
+            paper_record["id"]: paper_record["status"]
+            for paper_record in map(
+                loads, (output_path / "cleanup_manifest.jsonl").read_text().splitlines()
+            )
+        }
+        assert paper_statuses == {
+            "economics_1": "cleaned",
+            "robotics_1": "cleaned",
+            "robotics_2": "cleaned",
+            "robotics_3": "failed",
+        }
+        papers_to_clean = cleaned_papers_generator.find_papers_to_clean(
+            corpus_reader,
+            cleaned_papers_generator.create_manifest(str(output_path)),
+            str(output_path),
+        )
+        assert papers_to_clean == ["robotics_3"]
+
+    def test_cleaned_papers_generator_records_worker_source_file_info(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        (dataset_path / "robotics_3").mkdir()
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=paper_cleanup",
+                    f"data.data_path={dataset_path}",
+                    f"data.cleanup_processing.output_path={tmp_path / 'cleaned'}",
+                    "data.cleanup_processing.num_workers=2",
+                    "data.cleanup_processing.worker_chunksize=1",
+                ],
+            )
+        corpus_reader = Corpus_Reader(**cfg.data)
+        cleaned_papers_generator = CleanedPapersGenerator(cfg)
+        cleaned_papers_generator(corpus_reader)
+        output_path = tmp_path / "cleaned" / "train"
+        paper_records = {
+            paper_record["id"]: paper_record
+            for paper_record in map(
+                loads, (output_path / "cleanup_manifest.jsonl").read_text().splitlines()
+            )
+        }
+        assert paper_records["robotics_3"]["status"] == "failed"
+        assert "source_mtime_ns" not in paper_records["robotics_3"]
+        for paper_id in ["economics_1", "robotics_1", "robotics_2"]:
+            source_file_info = CleanupManifest.get_source_file_info(
+                dataset_path / paper_id / "paper.txt"
+            )
+            assert paper_records[paper_id]["status"] == "cleaned"
+            assert all(
+                paper_records[paper_id][info_key] == info_value
+                for info_key, info_value in source_file_info.items()
+            )
+        papers_to_clean = cleaned_papers_generator.find_papers_to_clean(
+            corpus_reader,
+            cleaned_papers_generator.create_manifest(str(output_path)),
+            str(output_path),
+        )
+        assert papers_to_clean == ["robotics_3"]
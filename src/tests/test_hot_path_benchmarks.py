@@ -0,0 +1,59 @@
+from os import listdir
+
+import pytest
+from benchmarks.hot_path_benchmarks import HotPathBenchmarks
+from benchmarks.synthetic_corpus import SyntheticCorpusGenerator
+
+
+class TestHotPathBenchmarks:
+    def test_synthetic_corpus_layout(self, tmp_path):
+        corpus_path = SyntheticCorpusGenerator(
+            ["economics", "robotics"],
+            {"train": 3, "valid": 1},
+            (20, 40),
+            reference_styles=["bracketed"],
+        )(str(tmp_path / "corpus"))
+        assert sorted(listdir(tmp_path / "corpus" / "valid")) == [
+            "economics_0",
+            "robotics_0",
+        ]
+        paper_folder = tmp_path / "corpus" / "train" / "robotics_2"
+        assert "[1] " in (paper_folder / "paper.txt").read_text()
+        processed_paper = (paper_folder / "processed_paper.txt").read_text()
+        assert processed_paper and "\n" not in processed_paper
+        assert "[1] " not in processed_paper
+        assert corpus_path == str(tmp_path / "corpus")
+
+    def test_unknown_styles_not_supported(self):
+        with pytest.raises(NotImplementedError):
+            SyntheticCorpusGenerator(
+                ["economics"], {"train": 1}, (20, 40), heading_styles=["italic"]
+            )
+
+    @pytest.mark.parametrize(
+        "benchmark_name",
+        [
+            "read-papers",
+            "find-first-reference",
+            "cleaned-papers-generator",
+            "text-classification-reader-uncached",
+        ],
+    )
+    def test_benchmark_counts_corpus_papers(self, tmp_path, benchmark_name):
+        corpus_path = SyntheticCorpusGenerator(
+            ["economics", "robotics"], {"train": 2}, (20, 40)
+        )(str(tmp_path / "corpus"))
+        benchmark_result = HotPathBenchmarks(
+            corpus_path, str(tmp_path / "outputs"), []
+        )(benchmark_name, repetitions=1)
+        assert benchmark_result["num_papers"] == 4
+        assert benchmark_result["papers_per_second"] > 0
+
+    def test_uncached_benchmark_featurizes_papers(self, tmp_path):
+        corpus_path = SyntheticCorpusGenerator(
+            ["economics", "robotics"], {"train": 2}, (20, 40)
+        )(str(tmp_path / "corpus"))
+        HotPathBenchmarks(corpus_path, str(tmp_path / "outputs"), [])(
+            "text-classification-reader-uncached", repetitions=1
+        )
+        assert not (tmp_path / "outputs" / "feature_cache").exists()
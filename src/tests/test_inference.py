@@ -0,0 +1,91 @@
+from json import loads
+from data.label_vocabulary import LabelVocabulary
+from hydra import initialize, compose
+from omegaconf import OmegaConf
+from main_operation_modes.inference import SklearnPaperClassifier
+from models.sklearn_text_classifier import SklearnTextClassifier
+from sklearn.feature_extraction.text import HashingVectorizer
+import numpy as np
+
+
+def write_mock_checkpoint(cfg, model_path):
+    training_sentences = ["robots move arms", "markets set prices"] * 10
+    feature_extractor = HashingVectorizer(
+        **cfg.data.sklearn_feature_extraction.hashing_vectorizer
+    )
+    sklearn_classifier = SklearnTextClassifier(
+        cfg.models,
+        [0, 1],
+        OmegaConf.to_container(cfg.data.sklearn_feature_extraction.hashing_vectorizer),
+    )
+    for _ in range(20):
+        sklearn_classifier.compute_loss(
+            sklearn_classifier(feature_extractor.transform(training_sentences)),
+            np.array([1, 0] * 10),
+        )
+    sklearn_classifier.save_model(str(model_path))
+    LabelVocabulary(["economics", "robotics"]).save(str(model_path / "labels.json"))
+
+
+class TestSklearnPaperClassifier:
+    def test_sklearn_paper_classifier_votes_per_paper(self, tmp_path):
+        input_path = tmp_path / "papers"
+        for paper_id, paper_contents in [
+            ("paper_1", "Robots move arms. Robots move arms! Markets set prices."),
+            ("paper_2", "Markets set prices. Markets set prices?"),
+            ("paper_3", " . "),
+        ]:
+            (input_path / paper_id).mkdir(parents=True)
+            (input_path / paper_id / "processed_paper.txt").write_text(paper_contents)
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=inference",
+                    "main_operation_mode=inference",
+                    f"data.inference.model_path={tmp_path / 'final_model'}",
+                    f"data.inference.input_path={input_path}",
+                    f"data.inference.output_path={tmp_path / 'predictions.jsonl'}",
+                    "data.inference.micro_batch_size=2",
+                    "models.sklearn_model_config.sgd_config.loss=hinge",
+                ],
+            )
+        write_mock_checkpoint(cfg, tmp_path / "final_model")
+        sklearn_paper_classifier = SklearnPaperClassifier(cfg)
+        sklearn_paper_classifier()
+        paper_predictions = {
+            paper_prediction["paper_id"]: paper_prediction
+            for paper_prediction in map(
+                loads, (tmp_path / "predictions.jsonl").read_text().splitlines()
+            )
+        }
+        assert paper_predictions["paper_1"]["predicted_label"] == "robotics"
+        assert paper_predictions["paper_1"]["num_sentences"] == 3
+        assert paper_predictions["paper_2"]["predicted_label"] == "economics"
+        assert paper_predictions["paper_3"]["predicted_label"] == None
+
+    def test_sklearn_paper_classifier_uses_checkpoint_feature_extraction(
+        self, tmp_path
+    ):
+        overrides = [
+            "data=inference",
+            f"data.inference.model_path={tmp_path / 'final_model'}",
+            "models.sklearn_model_config.sgd_config.loss=hinge",
+        ]
+        with initialize(config_path="../config"):
+            cfg = compose(config_name="config.yaml", overrides=overrides)
+            # Settings drifting from the training ones do not change the features.
+            drifted_cfg = compose(
+                config_name="config.yaml",
+                overrides=overrides
+                + ["+data.sklearn_feature_extraction.hashing_vectorizer.n_features=16"],
+            )
+        write_mock_checkpoint(cfg, tmp_path / "final_model")
+        sklearn_paper_classifier = SklearnPaperClassifier(drifted_cfg)
+        assert sklearn_paper_classifier.feature_extractor.get_params() == (
+            HashingVectorizer(norm="l2").get_params()
+        )
+        paper_predictions = sklearn_paper_classifier.predict_papers_micro_batch(
+            ["paper_1"], ["Robots move arms. Robots move arms!"]
+        )
+        assert paper_predictions[0]["predicted_label"] == "robotics"
@@ -0,0 +1,21 @@
+from json import dump
+from data.label_vocabulary import LabelVocabulary
+import pytest
+
+
+class TestLabelVocabulary:
+    def test_label_vocabulary_is_sorted_and_persisted(self, tmp_path):
+        label_vocabulary = LabelVocabulary(["robotics", "biology", "robotics"])
+        assert label_vocabulary.labels == ["biology", "robotics"]
+        assert label_vocabulary.get_label_id("robotics") == 1
+        assert "economics" not in label_vocabulary
+        vocabulary_path = str(tmp_path / "labels.json")
+        label_vocabulary.save(vocabulary_path)
+        assert LabelVocabulary.load(vocabulary_path) == label_vocabulary
+
+    def test_label_vocabulary_rejects_unsorted_labels(self, tmp_path):
+        vocabulary_path = tmp_path / "labels.json"
+        with open(vocabulary_path, "w") as file_object:
+            dump({"version": 1, "labels": ["robotics", "biology"]}, file_object)
+        with pytest.raises(RuntimeError):
+            LabelVocabulary.load(str(vocabulary_path))
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+from os import path
+
+import pytest
+
+SOURCE_ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+class TestMain:
+    @pytest.mark.parametrize(
+        "operation_mode_module",
+        ["main_operation_modes.exploration", "main_operation_modes.paper_cleanup"],
+    )
+    def test_corpus_modes_skip_training_dependencies(self, operation_mode_module):
+        completed_process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                f"import sys, main, {operation_mode_module}; "
+                "print(sorted({'mlflow', 'sklearn', 'torch', 'torchmetrics'} & set(sys.modules)))",
+            ],
+            cwd=SOURCE_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert completed_process.stdout.strip() == "[]"
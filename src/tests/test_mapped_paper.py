@@ -0,0 +1,79 @@
+from mmap import mmap
+
+import pytest
+from data.corpus_reader import Corpus_Reader
+from data.mapped_paper import MappedPaper
+from hydra import initialize, compose
+
+PAPER_TEXT = (
+    "A study of markets\n\n1 Introduction\n \nMarkets are studied here in détail.\n"
+    + "Body text line with enough tokens.\n" * 20
+    + "References\n[1] A. Author (2001).\nshort line\n"
+    + "1. Last line without newline (2003)"
+)
+
+
+class TestMappedPaper:
+    def test_mapped_paper_lines_match_text_mode_lines(self, tmp_path):
+        paper_path = tmp_path / "paper.txt"
+        paper_path.write_text(PAPER_TEXT, encoding="utf-8")
+        mapped_paper = MappedPaper.open(str(paper_path))
+        with open(paper_path, "r", encoding="utf-8") as file_object:
+            paper_lines = list(file_object)
+        assert len(mapped_paper) == len(paper_lines)
+        assert list(mapped_paper) == paper_lines
+        assert mapped_paper[-1] == paper_lines[-1]
+        assert list(mapped_paper[2:5]) == paper_lines[2:5]
+
+    def test_mapped_paper_close(self, tmp_path):
+        paper_path = tmp_path / "paper.txt"
+        paper_path.write_text(PAPER_TEXT, encoding="utf-8")
+        # Small files are read into memory and hold no file descriptor.
+        assert isinstance(MappedPaper.open(str(paper_path)).file_buffer, bytes)
+        with MappedPaper.open(str(paper_path), min_mapped_file_bytes=1) as mapped_paper:
+            assert isinstance(mapped_paper.file_buffer, mmap)
+            first_lines = mapped_paper[:2]
+            assert list(first_lines) == PAPER_TEXT.splitlines(keepends=True)[:2]
+        assert mapped_paper.file_buffer.closed
+        with pytest.raises(ValueError):
+            list(first_lines)
+
+    def test_mapped_paper_empty_file(self, tmp_path):
+        paper_path = tmp_path / "paper.txt"
+        paper_path.write_text("")
+        mapped_paper = MappedPaper.open(str(paper_path))
+        assert len(mapped_paper) == 0 and list(mapped_paper) == []
+
+    def test_corpus_reader_mapped_and_list_backends_agree(self, tmp_path):
+        paper_path = tmp_path / "economics_1" / "paper.txt"
+        paper_path.parent.mkdir()
+        paper_path.write_text(PAPER_TEXT, encoding="utf-8")
+        paper_contents_by_backend = {}
+        for paper_contents_backend in ["list", "mmap"]:
+            with initialize(config_path="../config"):
+                cfg = compose(
+                    config_name="config.yaml",
+                    overrides=[
+                        "data=exploration",
+                        f"data.data_path={paper_path}",
+                        f"data.paper_contents_backend={paper_contents_backend}",
+                    ],
+                )
+            corpus_reader = Corpus_Reader(**cfg.data)
+            paper_contents = corpus_reader()
+            paper_contents = corpus_reader.paper_contents_processor.remove_paper_contents_by_token_count(
+                paper_contents,
+                cfg.data.token_processing.token_threshold,
+                corpus_reader.paper_semantic_keywords["refer"],
+            )
+            paper_contents_by_backend[paper_contents_backend] = (
+                paper_contents,
+                corpus_reader.find_beginning_of_references_in_paper(
+                    paper_contents, "refer"
+                ),
+            )
+        list_contents, list_references = paper_contents_by_backend["list"]
+        mapped_contents, mapped_references = paper_contents_by_backend["mmap"]
+        assert isinstance(mapped_contents, MappedPaper)
+        assert list(mapped_contents) == list_contents
+        assert mapped_references == list_references
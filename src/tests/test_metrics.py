@@ -27,21 +27,16 @@ class TestTextClassificationMetrics:
         tc_valid_metrics = TextClassificationMetrics(
             cfg.metrics, num_labels=4, dataset_type="test"
         )
-        assert list(tc_train_metrics.metrics_summary.keys()) == [
+        assert tc_train_metrics.metric_names == [
             "accuracy",
             "precision",
             "recall",
             "f1",
             "confusion_matrix",
         ]
-        assert (
-            tc_train_metrics.metrics_summary["accuracy"].__dict__["compute_on_step"]
-            == True
-        )
-        assert (
-            tc_valid_metrics.metrics_summary["accuracy"].__dict__["compute_on_step"]
-            == False
-        )
+        assert tc_train_metrics.compute_on_step == True
+        assert tc_valid_metrics.compute_on_step == False
+        assert tc_train_metrics.confusion_matrix.shape == (4, 4)
 
     def test_text_classification_metrics_global_calculation(self):
         with initialize(config_path="../config"):
@@ -80,3 +75,30 @@ class TestTextClassificationMetrics:
         assert samplewise_metric_values[0]["precision"].item() == 0.7500
         assert samplewise_metric_values[1]["precision"].item() == 0.5000
         assert global_metric_info["precision"].item() == 0.625
+
+    def test_text_classification_metrics_confusion_matrix(self):
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "metrics=text_classification_metrics",
+                    "metrics.metrics_config.test_config.compute_on_step=false",
+                ],
+            )
+        tc_valid_metrics = TextClassificationMetrics(
+            cfg.metrics, num_labels=4, dataset_type="test"
+        )
+        per_step_metrics = tc_valid_metrics(
+            np.array([0, 1, 2]), np.array([0, 2, 2], dtype=np.int32)
+        )
+        assert per_step_metrics["accuracy"] is None
+        tc_valid_metrics(np.array([2, 3, 1]), np.array([2, 3, 0], dtype=np.int32))
+        global_metric_info = tc_valid_metrics.compute_global_metric_performance()
+        np.testing.assert_array_equal(
+            global_metric_info["confusion_matrix"],
+            np.array([[1, 1, 0, 0], [0, 0, 0, 0], [0, 1, 2, 0], [0, 0, 0, 1]]),
+        )
+        for metric_name in ["accuracy", "precision", "recall", "f1"]:
+            assert global_metric_info[metric_name].item() == np.float32(4 / 6)
+        # Statistics are reset after every global computation.
+        assert tc_valid_metrics.confusion_matrix.sum() == 0
@@ -0,0 +1,37 @@
+from data.minibatch_prefetcher import MinibatchPrefetcher
+import pytest
+
+
+def mock_minibatch_reader(num_minibatches: int, fail_at: int = -1):
+    for minibatch_index in range(num_minibatches):
+        if minibatch_index == fail_at:
+            raise RuntimeError("Mock reader failure!")
+        yield [minibatch_index] * 3, minibatch_index
+
+
+class TestMinibatchPrefetcher:
+    def test_minibatch_prefetcher_keeps_reader_order(self):
+        for prefetch_depth in [0, 1, 3]:
+            prefetcher = MinibatchPrefetcher(
+                list(mock_minibatch_reader(10)), prefetch_depth
+            )
+            assert list(prefetcher) == list(mock_minibatch_reader(10))
+            # Prefetchers can be iterated once per epoch.
+            assert list(prefetcher) == list(mock_minibatch_reader(10))
+            assert prefetcher.wait_stats["num_minibatches"] == 10
+            assert prefetcher.wait_stats["wait_seconds"] >= 0.0
+
+    def test_minibatch_prefetcher_raises_reader_errors(self):
+        prefetcher = MinibatchPrefetcher(mock_minibatch_reader(10, fail_at=4), 2)
+        consumed_minibatches = []
+        with pytest.raises(RuntimeError):
+            for minibatch in prefetcher:
+                consumed_minibatches.append(minibatch)
+        assert len(consumed_minibatches) == 4
+
+    def test_minibatch_prefetcher_stops_with_consumer(self):
+        prefetcher = MinibatchPrefetcher(mock_minibatch_reader(100), 1)
+        for minibatch in prefetcher:
+            break
+        assert minibatch == ([0, 0, 0], 0)
+        assert prefetcher.wait_stats["num_minibatches"] == 1
@@ -0,0 +1,26 @@
+from utils.paper_aggregation_utils import (
+    create_paper_offsets,
+    average_sentence_scores_per_paper,
+    count_sentence_label_votes_per_paper,
+)
+import numpy as np
+
+
+class TestPaperAggregationUtils:
+    def test_count_sentence_label_votes_per_paper(self):
+        # The second and last papers have no sentences.
+        paper_offsets = create_paper_offsets([3, 0, 2, 0])
+        assert paper_offsets.tolist() == [0, 3, 3, 5, 5]
+        label_votes = count_sentence_label_votes_per_paper(
+            np.array([1, 1, 0, 2, 2]), paper_offsets, num_labels=3
+        )
+        np.testing.assert_array_equal(
+            label_votes, [[1, 2, 0], [0, 0, 0], [0, 0, 2], [0, 0, 0]]
+        )
+
+    def test_average_sentence_scores_per_paper(self):
+        sentence_scores = np.array([[0.2, 0.8], [0.6, 0.4], [0.9, 0.1]])
+        paper_scores = average_sentence_scores_per_paper(
+            sentence_scores, create_paper_offsets([0, 2, 1])
+        )
+        np.testing.assert_allclose(paper_scores, [[0, 0], [0.4, 0.6], [0.9, 0.1]])
@@ -0,0 +1,111 @@
+import pytest
+from data.paper_analysis_store import PaperAnalysisStore
+from hydra import initialize, compose
+from main_operation_modes.static_text_analysis import StaticTextAnalyzer
+from utils.serialization_utils import write_dict_to_json_file
+
+FIRST_REFERENCE_SUMMARIES = [
+    {
+        "id": "biology_0",
+        "first_ref_det_info": {
+            "count": 1,
+            "ref_tuples": [["References\n", "references", 40]],
+        },
+        "paper_len_count": 50,
+    },
+    {
+        "id": "biology_1",
+        "first_ref_det_info": {
+            "count": 2,
+            "ref_tuples": [["1 A. Author (2001)\n", 30], ["1 B. Author\n", 31]],
+        },
+        "paper_len_count": 35,
+    },
+    {
+        "id": "biology_2",
+        "first_ref_det_info": {"count": 0, "ref_tuples": []},
+        "paper_len_count": 0,
+    },
+]
+
+SECTION_KEYWORD_SUMMARIES = [
+    {
+        "id": "economics_0",
+        "section_keyword_detection": {
+            "intro": [["1 Introduction\n", "introduction", 1]],
+            "conc": ["Not found!"],
+            "refer": [["References\n", "references", 20]],
+        },
+    },
+    {
+        "id": "economics_1",
+        "section_keyword_detection": {
+            "intro": ["Not found!"],
+            "conc": ["Not found!"],
+            "refer": ["Not found!"],
+        },
+    },
+    # A rerun appends a second summary of the same paper.
+    {
+        "id": "economics_0",
+        "section_keyword_detection": {
+            "intro": ["Not found!"],
+            "conc": ["Not found!"],
+            "refer": ["Not found!"],
+        },
+    },
+]
+
+
+def read_written_json(json_output_path, json_document):
+    write_dict_to_json_file(str(json_output_path), json_document)
+    return json_output_path.read_text()
+
+
+class TestPaperAnalysisStore:
+    def test_analysis_store_matches_jsonl_analysis(self, tmp_path):
+        store_path = str(tmp_path / "summaries.sqlite")
+        with PaperAnalysisStore(store_path, flush_every_records=2) as analysis_store:
+            for paper_summary in FIRST_REFERENCE_SUMMARIES + SECTION_KEYWORD_SUMMARIES:
+                analysis_store.write_record(paper_summary)
+        static_text_analyzer = StaticTextAnalyzer(None)
+        with PaperAnalysisStore(store_path) as analysis_store:
+            store_json_documents = list(
+                analysis_store.compute_first_reference_detection_breakdown()
+            ) + [analysis_store.compute_semantic_section_full_dataset_metrics()]
+        jsonl_json_documents = list(
+            static_text_analyzer.compute_first_reference_detection_breakdown(
+                iter(FIRST_REFERENCE_SUMMARIES)
+            )
+        ) + [
+            static_text_analyzer.compute_semantic_section_full_dataset_metrics(
+                iter(SECTION_KEYWORD_SUMMARIES)
+            )
+        ]
+        for store_json_document, jsonl_json_document in zip(
+            store_json_documents, jsonl_json_documents
+        ):
+            assert read_written_json(
+                tmp_path / "store.json", store_json_document
+            ) == read_written_json(tmp_path / "jsonl.json", jsonl_json_document)
+
+    @pytest.mark.parametrize(
+        "output_format,keywords_dump_path",
+        [("sqlite", "first_ref_summary.jsonl"), ("jsonl", "first_ref_summary.sqlite")],
+    )
+    def test_summary_writer_rejects_other_format_paths(
+        self, tmp_path, output_format, keywords_dump_path
+    ):
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=exploration",
+                    f"data.static_text_analysis.output_format={output_format}",
+                ],
+            )
+        with pytest.raises(NotImplementedError):
+            StaticTextAnalyzer(cfg).create_keyword_summary_writer(
+                str(tmp_path / keywords_dump_path)
+            )
+        assert not (tmp_path / keywords_dump_path).exists()
@@ -0,0 +1,52 @@
+from data.mapped_paper import MappedPaper
+from data.paper_preprocessor import Paper_Preprocessor
+
+PAPER_LINES = [
+    "A study of markets\n",
+    "REFERENCES\n",
+    "Références\n",
+    "short line\n",
+    "A line with enough tokens to be kept.\n",
+    "Cited literature of the fiеld\n",
+    "[1] A. Author, Bibliography (2001).\n",
+    "last",
+]
+
+
+def remove_lines_by_token_count_line_by_line(paper_lines, token_thresh, keywords):
+    filtered_lines = []
+    for current_line in paper_lines:
+        if any(keyword in current_line.lower() for keyword in keywords):
+            filtered_lines.append(current_line)
+        elif len(current_line.split(" ")) > token_thresh:
+            filtered_lines.append(current_line)
+    return filtered_lines
+
+
+class TestPaperPreprocessor:
+    def test_token_count_filter_matches_line_by_line_filter(self, tmp_path):
+        paper_path = tmp_path / "paper.txt"
+        paper_path.write_text("".join(PAPER_LINES), encoding="utf-8")
+        paper_preprocessor = Paper_Preprocessor()
+        for keywords in [[], ["references", "literature", "bibliography"], ["é"]]:
+            for token_thresh in [1, 3]:
+                expected_lines = remove_lines_by_token_count_line_by_line(
+                    PAPER_LINES, token_thresh, keywords
+                )
+                assert (
+                    paper_preprocessor.remove_paper_contents_by_token_count(
+                        PAPER_LINES, token_thresh, keywords
+                    )
+                    == expected_lines
+                )
+                mapped_lines = paper_preprocessor.remove_paper_contents_by_token_count(
+                    MappedPaper.open(str(paper_path)), token_thresh, keywords
+                )
+                assert list(mapped_lines) == expected_lines
+
+    def test_token_count_filter_ascii_lines_without_newlines(self):
+        paper_lines = ["see the refer", "ences below", "one two three four"]
+        filtered_lines = Paper_Preprocessor().remove_paper_contents_by_token_count(
+            paper_lines, 3, ["references"]
+        )
+        assert filtered_lines == ["one two three four"]
@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps, loads
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from hydra import initialize, compose
+from main_operation_modes.prediction_server import create_prediction_server
+from tests.test_inference import write_mock_checkpoint
+
+
+def post_paper_text(server_url, paper_id, paper_contents):
+    request = Request(
+        f"{server_url}/predict",
+        data=dumps({"paper_id": paper_id, "text": paper_contents}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urlopen(request) as response:
+        return loads(response.read())
+
+
+def create_mock_prediction_server(tmp_path):
+    with initialize(config_path="../config"):
+        cfg = compose(
+            config_name="config.yaml",
+            overrides=[
+                "data=prediction_server",
+                "main_operation_mode=prediction-server",
+                f"data.inference.model_path={tmp_path / 'final_model'}",
+                "data.prediction_server.port=0",
+                "data.prediction_server.coalescing_window_ms=200",
+                "models.sklearn_model_config.sgd_config.loss=hinge",
+            ],
+        )
+    write_mock_checkpoint(cfg, tmp_path / "final_model")
+    return create_prediction_server(cfg)
+
+
+class TestPredictionServer:
+    def test_prediction_server_coalesces_concurrent_requests(self, tmp_path):
+        prediction_server = create_mock_prediction_server(tmp_path)
+        prediction_coalescer = prediction_server.prediction_coalescer
+        predicted_batch_sizes = []
+        predict_papers_micro_batch = (
+            prediction_coalescer.sklearn_paper_classifier.predict_papers_micro_batch
+        )
+
+        def record_micro_batch(paper_ids, paper_contents):
+            predicted_batch_sizes.append(len(paper_ids))
+            return predict_papers_micro_batch(paper_ids, paper_contents)
+
+        prediction_coalescer.sklearn_paper_classifier.predict_papers_micro_batch = (
+            record_micro_batch
+        )
+        prediction_coalescer.start()
+        server_thread = Thread(target=prediction_server.serve_forever, daemon=True)
+        server_thread.start()
+        server_url = f"http://127.0.0.1:{prediction_server.server_address[1]}"
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                paper_predictions = list(
+                    executor.map(
+                        post_paper_text,
+                        [server_url] * 4,
+                        ["paper_1", "paper_2", "paper_3", "paper_4"],
+                        ["Robots move arms.", "Markets set prices."] * 2,
+                    )
+                )
+        finally:
+            prediction_server.shutdown()
+            prediction_server.server_close()
+            prediction_coalescer.stop()
+        assert [
+            paper_prediction["predicted_label"]
+            for paper_prediction in paper_predictions
+        ] == ["robotics", "economics"] * 2
+        assert paper_predictions[2]["paper_id"] == "paper_3"
+        assert sum(predicted_batch_sizes) == 4 and len(predicted_batch_sizes) < 4
+
+    def test_prediction_server_rejects_non_string_text(self, tmp_path):
+        prediction_server = create_mock_prediction_server(tmp_path)
+        prediction_coalescer = prediction_server.prediction_coalescer
+        prediction_coalescer.start()
+        server_thread = Thread(target=prediction_server.serve_forever, daemon=True)
+        server_thread.start()
+        server_url = f"http://127.0.0.1:{prediction_server.server_address[1]}"
+
+        def post_paper_text_or_error(paper_id, paper_contents):
+            try:
+                return post_paper_text(server_url, paper_id, paper_contents)
+            except HTTPError as http_error:
+                return http_error.code
+
+        try:
+            # Both requests arrive in the same coalescing window.
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                paper_predictions = list(
+                    executor.map(
+                        post_paper_text_or_error,
+                        ["paper_1", "paper_2"],
+                        ["Robots move arms.", ["Markets set prices."]],
+                    )
+                )
+        finally:
+            prediction_server.shutdown()
+            prediction_server.server_close()
+            prediction_coalescer.stop()
+        assert paper_predictions[0]["predicted_label"] == "robotics"
+        assert paper_predictions[1] == 400
@@ -0,0 +1,23 @@
+from io import StringIO
+from utils.sentence_splitting_utils import (
+    iterate_sentences_in_file,
+    iterate_sentences_in_text,
+)
+import re
+
+
+class TestSentenceSplittingUtils:
+    def test_sentences_match_regex_split(self):
+        paper_contents = "First sentence. Second one!  ? Third\nline?.. Tail"
+        expected_sentences = [
+            sentence
+            for sentence in re.split("[.!?]", paper_contents)
+            if sentence.replace(" ", "") != ""
+        ]
+        assert list(iterate_sentences_in_text(paper_contents)) == expected_sentences
+        # Sentences crossing chunk boundaries are carried over to the next chunk.
+        for chunk_size in [1, 3, 7, 1024]:
+            assert (
+                list(iterate_sentences_in_file(StringIO(paper_contents), chunk_size))
+                == expected_sentences
+            )
@@ -0,0 +1,110 @@
+import sqlite3
+from json import dumps
+
+import pytest
+from main_operation_modes.static_text_analysis import StaticTextAnalyzer
+from utils.serialization_utils import (
+    JsonlWriter,
+    open_jsonl_file,
+    SpilledJsonContainer,
+    SpilledJsonDict,
+    SpilledJsonList,
+    get_jsonl_reader_iterator,
+    write_dict_to_json_file,
+)
+
+
+class TestJsonlWriter:
+    @pytest.mark.parametrize("jsonl_filename", ["summary.jsonl", "summary.jsonl.gz"])
+    def test_jsonl_writer_appends_records(self, tmp_path, jsonl_filename):
+        jsonl_file_path = str(tmp_path / jsonl_filename)
+        records = [{"id": f"biology_{index}", "count": index} for index in range(5)]
+        with JsonlWriter(jsonl_file_path, flush_every_records=2) as jsonl_writer:
+            for record in records[:3]:
+                jsonl_writer.write_record(record)
+        # Reopening appends to the summaries of the previous run.
+        with JsonlWriter(jsonl_file_path) as jsonl_writer:
+            for record in records[3:]:
+                jsonl_writer.write_record(record)
+        assert list(get_jsonl_reader_iterator(jsonl_file_path)) == records
+
+    def test_jsonl_writer_flushes_records_on_error(self, tmp_path):
+        jsonl_file_path = str(tmp_path / "summary.jsonl")
+        with pytest.raises(RuntimeError):
+            with JsonlWriter(jsonl_file_path) as jsonl_writer:
+                jsonl_writer.write_record({"id": "biology_0"})
+                raise RuntimeError("Paper detection failed!")
+        assert list(get_jsonl_reader_iterator(jsonl_file_path)) == [{"id": "biology_0"}]
+
+    def test_gzip_jsonl_file_is_buffered(self, tmp_path):
+        jsonl_file_path = str(tmp_path / "summary.jsonl.gz")
+        with open_jsonl_file(jsonl_file_path, "a", 1 << 16) as file_object:
+            file_object.write("a" * 10000)
+            # Written to the buffer, not yet to the gzip stream.
+            assert file_object.buffer.raw.tell() == 0
+        with open_jsonl_file(jsonl_file_path, "r") as file_object:
+            assert file_object.read() == "a" * 10000
+
+
+class TestSpilledJsonContainers:
+    def test_spilled_containers_write_same_json_as_dicts(self, tmp_path):
+        samples_info = {}
+        spilled_samples_info = SpilledJsonDict(flush_every_entries=2)
+        paper_ids_missing = []
+        spilled_paper_ids_missing = SpilledJsonList(flush_every_entries=2)
+        for paper_index in [0, 1, 2, 1, 3]:
+            # Paper 1 is summarized twice, its last value is kept at its first position.
+            sample_info = {"ref_tuples": [["References\n", paper_index]]}
+            samples_info[f"biology_{paper_index}"] = sample_info
+            spilled_samples_info[f"biology_{paper_index}"] = sample_info
+            paper_ids_missing.append(f"biology_{paper_index}")
+            spilled_paper_ids_missing.append(f"biology_{paper_index}")
+        assert list(spilled_samples_info.items()) == list(samples_info.items())
+        assert list(spilled_paper_ids_missing) == paper_ids_missing
+        json_output_path = tmp_path / "summary.json"
+        write_dict_to_json_file(
+            str(json_output_path),
+            {
+                "total_count": 5,
+                "samples_info": spilled_samples_info,
+                "ending": {"paper_ids_missing": spilled_paper_ids_missing},
+            },
+        )
+        assert json_output_path.read_text() == dumps(
+            {
+                "total_count": 5,
+                "samples_info": samples_info,
+                "ending": {"paper_ids_missing": paper_ids_missing},
+            }
+        )
+
+    def test_spilled_containers_coerce_keys_like_json(self, tmp_path):
+        keywords_dict = {1: "one", 2.5: "two and a half", True: "yes", None: "none"}
+        spilled_keywords_dict = SpilledJsonDict()
+        for key, value in keywords_dict.items():
+            spilled_keywords_dict[key] = value
+        json_output_path = tmp_path / "keywords.json"
+        write_dict_to_json_file(
+            str(json_output_path),
+            {"spilled": spilled_keywords_dict, "in_memory": keywords_dict},
+        )
+        assert json_output_path.read_text() == dumps(
+            {"spilled": keywords_dict, "in_memory": keywords_dict}
+        )
+        with pytest.raises(TypeError):
+            write_dict_to_json_file(str(json_output_path), {("a", "b"): 1})
+
+    def test_spilled_containers_are_closed(self, tmp_path):
+        with pytest.raises(TypeError):
+            SpilledJsonContainer()
+        with SpilledJsonList() as paper_ids:
+            paper_ids.append("biology_0")
+        with pytest.raises(sqlite3.ProgrammingError):
+            len(paper_ids)
+        samples_info = SpilledJsonDict()
+        samples_info["biology_0"] = {"paper_len_count": 3}
+        StaticTextAnalyzer.write_keywords_json_to_disk(
+            str(tmp_path / "summary.json"), {"samples_info": samples_info}
+        )
+        with pytest.raises(sqlite3.ProgrammingError):
+            len(samples_info)
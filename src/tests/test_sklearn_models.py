@@ -1,6 +1,8 @@
 from hydra import initialize, compose
 from models.sklearn_text_classifier import SklearnTextClassifier
+from scipy.sparse import random as sparse_random
 from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
 import numpy as np
 
 
@@ -83,3 +85,85 @@ class TestSklearnTextClassifier:
         # for sklearn models we return a null loss value.
         assert loss_value == None
         np.testing.assert_allclose(mock_prediction_logits, mock_input_data_featurized)
+
+    def test_sklearn_text_classifier_predict_from_features(self):
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "models=text_classification_sklearn",
+                    "models.sklearn_model_config.sgd_config.loss=hinge",
+                ],
+            )
+        mock_class_ids = [0, 1, 2, 3]
+        mock_input_data = np.eye(N=4, M=6)
+        mock_ground_truth = np.array([0, 1, 2, 3])
+        sklearn_classifier = SklearnTextClassifier(cfg.models, mock_class_ids)
+        mock_prediction_logits = sklearn_classifier(mock_input_data)
+        sklearn_classifier.compute_loss(mock_prediction_logits, mock_ground_truth)
+        np.testing.assert_array_equal(
+            sklearn_classifier.predict_from_features(mock_prediction_logits),
+            sklearn_classifier(mock_input_data, return_predicted_labels=True),
+        )
+
+    def test_sklearn_text_classifier_streaming_scaler(self):
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "models=text_classification_sklearn",
+                    "models.sklearn_model_config.feature_preprocessing_config.scaler_fit_mode=streaming",
+                ],
+            )
+        sklearn_classifier = SklearnTextClassifier(cfg.models, [0, 1])
+        first_minibatch = np.array([[1.0, 0.0], [3.0, 2.0]])
+        second_minibatch = np.array([[5.0, 4.0], [7.0, 6.0]])
+        sklearn_classifier(first_minibatch)
+        sklearn_classifier(second_minibatch)
+        all_features = np.concatenate([first_minibatch, second_minibatch])
+        np.testing.assert_allclose(
+            sklearn_classifier.feature_preprocessors.steps[0][1].var_,
+            all_features.var(axis=0),
+        )
+        # Outside of training the accumulated statistics are only applied.
+        sklearn_classifier.set_training_mode(False)
+        np.testing.assert_allclose(
+            sklearn_classifier(first_minibatch),
+            first_minibatch / all_features.std(axis=0),
+        )
+        np.testing.assert_allclose(
+            sklearn_classifier.feature_preprocessors.steps[0][1].var_,
+            all_features.var(axis=0),
+        )
+
+    def test_sklearn_text_classifier_streaming_scaler_matches_partial_fit(self):
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "models=text_classification_sklearn",
+                    "models.sklearn_model_config.feature_preprocessing_config.scaler_fit_mode=streaming",
+                ],
+            )
+        sklearn_classifier = SklearnTextClassifier(cfg.models, [0, 1])
+        reference_scaler = StandardScaler(with_mean=False)
+        random_state = np.random.RandomState(43)
+        for _ in range(3):
+            # Sparse hashed features, most columns are missing from every minibatch.
+            minibatch = sparse_random(
+                8, 1000, density=0.01, format="csr", random_state=random_state
+            )
+            reference_scaler.partial_fit(minibatch)
+            np.testing.assert_allclose(
+                sklearn_classifier(minibatch).toarray(),
+                reference_scaler.transform(minibatch).toarray(),
+            )
+        sklearn_classifier.set_training_mode(False)
+        streaming_scaler = sklearn_classifier.feature_preprocessors.steps[0][1]
+        for attribute_name in ["mean_", "var_", "scale_"]:
+            np.testing.assert_allclose(
+                getattr(streaming_scaler, attribute_name),
+                getattr(reference_scaler, attribute_name),
+                atol=1e-12,
+            )
+        assert streaming_scaler.n_samples_seen_ == reference_scaler.n_samples_seen_
@@ -0,0 +1,175 @@
+from json import loads
+from os import environ
+from shutil import which
+
+import pytest
+from data.corpus_reader import Corpus_Reader
+from hydra import initialize, compose
+from main_operation_modes.generate_cleaned_papers import (
+    CleanedPapersGenerator,
+    CleanupManifest,
+)
+from main_operation_modes.spark_backend import (
+    SparkCorpusProcessor,
+    clean_papers_partition,
+    detect_in_papers_partition,
+)
+from main_operation_modes.static_text_analysis import StaticTextAnalyzer
+from tests.test_generate_cleaned_papers import write_mock_paper_dataset
+
+PAPER_IDS = ["economics_1", "robotics_1", "robotics_2"]
+
+# The Spark runs need a local JVM besides pyspark.
+requires_java = pytest.mark.skipif(
+    which("java") is None and "JAVA_HOME" not in environ,
+    reason="Spark needs a Java runtime.",
+)
+
+
+def compose_spark_backend_config(data_config, overrides):
+    with initialize(config_path="../config"):
+        return compose(
+            config_name="config.yaml",
+            overrides=[
+                f"data={data_config}",
+                "data.spark_backend.master='local[2]'",
+                "data.spark_backend.num_partitions=2",
+            ]
+            + overrides,
+        )
+
+
+def compose_static_text_analysis_config(
+    dataset_path, static_text_analysis_mode, keywords_dump_path
+):
+    return compose_spark_backend_config(
+        "exploration",
+        [
+            f"data.data_path={dataset_path}",
+            f"data.static_text_analysis.static_text_analysis_mode={static_text_analysis_mode}",
+            f"data.static_text_analysis.keywords_dump_path={keywords_dump_path}",
+        ],
+    )
+
+
+def read_cleaned_papers(output_dataset_path):
+    return {
+        paper_id: (output_dataset_path / paper_id / "processed_paper.txt").read_text()
+        for paper_id in PAPER_IDS
+    }
+
+
+class TestSparkBackend:
+    def test_clean_papers_partition(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        cfg = compose_spark_backend_config(
+            "paper_cleanup",
+            [
+                f"data.data_path={dataset_path}",
+                f"data.cleanup_processing.output_path={tmp_path / 'cleaned'}",
+            ],
+        )
+        output_dataset_path = tmp_path / "cleaned" / "train"
+        output_dataset_path.mkdir(parents=True)
+        cleanup_statuses = list(
+            clean_papers_partition(
+                iter(PAPER_IDS + ["robotics_3"]), cfg, str(output_dataset_path)
+            )
+        )
+        assert [cleanup_status[:2] for cleanup_status in cleanup_statuses] == [
+            ("economics_1", "cleaned"),
+            ("robotics_1", "cleaned"),
+            ("robotics_2", "cleaned"),
+            ("robotics_3", "failed"),
+        ]
+        assert [cleanup_status[2] for cleanup_status in cleanup_statuses] == [
+            CleanupManifest.get_source_file_info(dataset_path / paper_id / "paper.txt")
+            for paper_id in PAPER_IDS
+        ] + [None]
+        cleaned_papers = read_cleaned_papers(output_dataset_path)
+        assert cleaned_papers["robotics_1"].startswith("The body of paper robotics_1")
+        assert all("References" not in paper for paper in cleaned_papers.values())
+
+    @pytest.mark.parametrize(
+        "static_text_analysis_mode", ["detect-keywords", "detect-first-reference"]
+    )
+    def test_detect_in_papers_partition(self, tmp_path, static_text_analysis_mode):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        cfg = compose_static_text_analysis_config(
+            dataset_path, static_text_analysis_mode, tmp_path / "summaries.jsonl"
+        )
+        corpus_reader = Corpus_Reader(**cfg.data)
+        StaticTextAnalyzer(cfg)(corpus_reader(), corpus_reader)
+        # The local backend reads the papers in folder listing order.
+        local_summaries = {
+            paper_summary["id"]: paper_summary
+            for paper_summary in map(
+                loads, (tmp_path / "summaries.jsonl").read_text().splitlines()
+            )
+        }
+        partition_summaries = list(
+            map(
+                loads,
+                detect_in_papers_partition(
+                    iter(PAPER_IDS), cfg, static_text_analysis_mode
+                ),
+            )
+        )
+        assert [
+            paper_summary["id"] for paper_summary in partition_summaries
+        ] == PAPER_IDS
+        assert partition_summaries == [
+            local_summaries[paper_id] for paper_id in PAPER_IDS
+        ]
+
+    @requires_java
+    def test_spark_paper_cleanup_matches_local_backend(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        cleaned_papers = []
+        for execution_backend in ["local", "spark"]:
+            cfg = compose_spark_backend_config(
+                "paper_cleanup",
+                [
+                    f"data.data_path={dataset_path}",
+                    f"data.cleanup_processing.output_path={tmp_path / execution_backend}",
+                ],
+            )
+            corpus_reader = Corpus_Reader(**cfg.data)
+            cleaned_papers_generator = CleanedPapersGenerator(cfg)
+            if execution_backend == "spark":
+                SparkCorpusProcessor(cfg).run_paper_cleanup(
+                    cleaned_papers_generator, corpus_reader
+                )
+            else:
+                cleaned_papers_generator(corpus_reader)
+            cleaned_papers.append(
+                read_cleaned_papers(tmp_path / execution_backend / "train")
+            )
+        assert cleaned_papers[0] == cleaned_papers[1]
+
+    @requires_java
+    def test_spark_static_text_analysis_matches_local_backend(self, tmp_path):
+        dataset_path = tmp_path / "train"
+        write_mock_paper_dataset(dataset_path)
+        paper_summaries = []
+        for execution_backend in ["local", "spark"]:
+            cfg = compose_static_text_analysis_config(
+                dataset_path,
+                "detect-first-reference",
+                tmp_path / f"{execution_backend}.jsonl",
+            )
+            corpus_reader = Corpus_Reader(**cfg.data)
+            static_text_analyzer = StaticTextAnalyzer(cfg)
+            if execution_backend == "spark":
+                SparkCorpusProcessor(cfg).run_static_text_analysis(
+                    static_text_analyzer, corpus_reader
+                )
+            else:
+                static_text_analyzer(corpus_reader(), corpus_reader)
+            paper_summaries.append(
+                (tmp_path / f"{execution_backend}.jsonl").read_text()
+            )
+        assert paper_summaries[0] == paper_summaries[1]
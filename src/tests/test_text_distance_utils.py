@@ -0,0 +1,40 @@
+import random
+
+import textdistance
+from utils.text_distance_utils import (
+    bounded_levenshtein_distance,
+    reaches_levenshtein_similarity_threshold,
+)
+
+
+class TestTextDistanceUtils:
+    def test_bounded_levenshtein_distance(self):
+        assert bounded_levenshtein_distance("introduction", "introduction", 0) == 0
+        assert bounded_levenshtein_distance("kitten", "sitting", 3) == 3
+        assert bounded_levenshtein_distance("kitten", "sitting", 2) == 3
+        assert bounded_levenshtein_distance("", "abc", 5) == 3
+        assert bounded_levenshtein_distance("references", "a long body line", 2) == 3
+
+    def test_similarity_threshold_matches_textdistance(self):
+        random.seed(43)
+        keywords = ["introduction", "conclusion", "references", "discussion"]
+        for _ in range(2000):
+            keyword = random.choice(keywords)
+            line = list(keyword)
+            for _ in range(random.randint(0, 8)):
+                edit_position = random.randint(0, len(line))
+                edit_type = random.choice(["insert", "delete", "replace"])
+                if edit_type == "insert" or not line:
+                    line.insert(edit_position, random.choice("abcdeinors. "))
+                elif edit_type == "delete":
+                    del line[min(edit_position, len(line) - 1)]
+                else:
+                    line[min(edit_position, len(line) - 1)] = random.choice("xyz")
+            line = "".join(line)
+            for similarity_threshold in [0.0, 0.5, 0.7, 0.75, 0.9, 1.0]:
+                assert reaches_levenshtein_similarity_threshold(
+                    line, keyword, similarity_threshold
+                ) == (
+                    textdistance.levenshtein.normalized_similarity(line, keyword)
+                    >= similarity_threshold
+                )
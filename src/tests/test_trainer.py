@@ -0,0 +1,94 @@
+import mlflow
+import numpy as np
+import pytest
+from data.experiment_corpus_readers import SklearnTextClassificationReader
+from hydra import initialize, compose
+from trainer.trainer import TextClassificationTrainer
+
+PAPER_SENTENCES = {
+    "robotics": ["Robots move arms.", "Robots grasp objects!", "Markets set prices."],
+    "economics": ["Markets set prices.", "Prices follow demand?", "Robots move arms."],
+}
+
+
+def write_mock_training_dataset(dataset_path):
+    for dataset_type, num_papers in [("train", 4), ("valid", 3)]:
+        for category, paper_sentences in PAPER_SENTENCES.items():
+            for paper_number in range(num_papers):
+                paper_folder = (
+                    dataset_path / dataset_type / f"{category}_{paper_number}"
+                )
+                paper_folder.mkdir(parents=True)
+                # Papers of 3 to 5 sentences, above the validation budget.
+                (paper_folder / "processed_paper.txt").write_text(
+                    " ".join(paper_sentences + paper_sentences[:paper_number])
+                )
+
+
+class TestTextClassificationTrainer:
+    @pytest.mark.parametrize(
+        "paper_aggregation,sgd_loss",
+        [("vote", "hinge"), ("mean-proba", "modified_huber")],
+    )
+    def test_paper_metrics_merge_papers_split_by_budget(
+        self, tmp_path, monkeypatch, paper_aggregation, sgd_loss
+    ):
+        # Newer mlflow releases only keep the file store behind this flag.
+        monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+        write_mock_training_dataset(tmp_path)
+        with initialize(config_path="../config"):
+            cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=experiments",
+                    f"data.data_path={tmp_path}",
+                    "data.feature_cache.enabled=false",
+                    f"trainer.paper_aggregation={paper_aggregation}",
+                    f"models.sklearn_model_config.sgd_config.loss={sgd_loss}",
+                ],
+            )
+        text_classification_trainer = TextClassificationTrainer(cfg)
+        valid_paper_metrics = text_classification_trainer.valid_paper_metrics
+        compute_global_metric_performance = (
+            valid_paper_metrics.compute_global_metric_performance
+        )
+        paper_confusion_matrices = []
+
+        def record_paper_confusion_matrix():
+            paper_confusion_matrices.append(valid_paper_metrics.confusion_matrix.copy())
+            return compute_global_metric_performance()
+
+        valid_paper_metrics.compute_global_metric_performance = (
+            record_paper_confusion_matrix
+        )
+        with initialize(config_path="../config"):
+            budget_cfg = compose(
+                config_name="config.yaml",
+                overrides=[
+                    "data=experiments",
+                    f"data.data_path={tmp_path}",
+                    "data.feature_cache.enabled=false",
+                    "data.batch_budget.unit=sentences",
+                    "data.batch_budget.max_units_per_batch=2",
+                ],
+            )
+        budget_valid_reader = SklearnTextClassificationReader(
+            budget_cfg.data,
+            "valid",
+            budget_cfg.experiment_seed,
+            label_vocabulary=text_classification_trainer.label_vocabulary,
+        )
+        mlflow.set_tracking_uri(f"file://{tmp_path / 'mlruns'}")
+        with mlflow.start_run():
+            text_classification_trainer.run_sklearn_training_epoch(
+                text_classification_trainer.train_reader
+            )
+            for valid_reader in [
+                text_classification_trainer.valid_reader,
+                budget_valid_reader,
+            ]:
+                text_classification_trainer.run_sklearn_validation_epoch(valid_reader)
+        # Every validation paper is split into chunks of at most 2 sentences.
+        assert budget_valid_reader.epoch_stats["num_minibatches"] > 6
+        assert paper_confusion_matrices[0].sum() == 6
+        assert np.array_equal(paper_confusion_matrices[0], paper_confusion_matrices[1])
@@ -1,8 +1,10 @@
 from typing import List, Dict, Tuple, Any
-from omegaconf import DictConfig
+from omegaconf import DictConfig, OmegaConf
 from models.sklearn_text_classifier import SklearnTextClassifier
 from data.experiment_corpus_readers import SklearnTextClassificationReader
+from data.minibatch_prefetcher import MinibatchPrefetcher
 from metrics.text_classification_metrics import TextClassificationMetrics
+from utils.paper_aggregation_utils import get_nonempty_papers_mask
 from logging import getLogger
 import numpy as np
 import os
@@ -17,9 +19,9 @@ class TextClassificationTrainer:
         self.train_reader, self.valid_reader = self.initialize_dataset_readers(
             self.full_config.trainer.model_framework, self.full_config
         )
-        self.ids_to_labels = self.create_label_name_to_label_id_mapping(
-            self.train_reader
-        )
+        # The valid reader shares the vocabulary of the train reader.
+        self.label_vocabulary = self.train_reader.label_vocabulary
+        self.ids_to_labels = self.label_vocabulary.ids_to_labels
         self.model_class = self.initialize_model_class(
             self.full_config.trainer.model_framework,
             self.full_config,
@@ -27,26 +29,30 @@ class TextClassificationTrainer:
         )
         self.train_metrics = TextClassificationMetrics(
             self.full_config.metrics,
-            num_labels=len(self.train_reader.labels),
+            num_labels=len(self.label_vocabulary),
             dataset_type="train",
         )
         self.valid_metrics = TextClassificationMetrics(
             self.full_config.metrics,
-            num_labels=len(self.valid_reader.labels),
+            num_labels=len(self.label_vocabulary),
             dataset_type="test",
         )
-
-    def create_label_name_to_label_id_mapping(
-        self, train_reader: SklearnTextClassificationReader
-    ) -> Dict[int, str]:
-        labels_array = train_reader.labels
-        id_to_labels_dict = {}
-        for current_id, current_label in enumerate(labels_array):
-            id_to_labels_dict[current_id] = current_label
-        return id_to_labels_dict
+        self.valid_paper_metrics = TextClassificationMetrics(
+            self.full_config.metrics,
+            num_labels=len(self.label_vocabulary),
+            dataset_type="test",
+        )
+        # Last paper of the previous validation minibatch, its chunks may continue
+        # in the next one when the batch budget splits papers.
+        self.pending_valid_paper = None
 
     def __call__(self):
-        self.run_training_loop(self.full_config)
+        try:
+            self.run_training_loop(self.full_config)
+        finally:
+            # Stops the featurization workers the readers kept across epochs.
+            self.train_reader.close()
+            self.valid_reader.close()
         return
 
     def run_training_loop(self, cfg: DictConfig):
@@ -87,51 +93,93 @@ class TextClassificationTrainer:
             mlflow.log_artifacts(os.path.join(os.getcwd(), ".hydra"))
             for current_epoch in range(cfg.trainer.train_epochs):
                 hydra_logger.info(f"Starting training epoch {current_epoch}")
-                self.train_reader, self.valid_reader = self.initialize_dataset_readers(
-                    self.full_config.trainer.model_framework, self.full_config
-                )
-                self.run_sklearn_training_epoch(self.train_reader)
-                self.run_sklearn_validation_epoch(self.valid_reader)
+                # Readers are re-iterable and reshuffle with the experiment seed on
+                # every pass, reusing them keeps their feature stores loaded.
+                self.run_sklearn_training_epoch(self.train_reader, current_epoch)
+                self.run_sklearn_validation_epoch(self.valid_reader, current_epoch)
                 if (
                     current_epoch % self.full_config.trainer.save_after_num_epochs == 0
                     and current_epoch != 0
                 ):
                     checkpoint_suffix = f"model_epoch_{current_epoch}"
-                    self.model_class.save_model(
-                        os.path.join(os.getcwd(), checkpoint_suffix)
-                    )
+                    self.save_checkpoint(os.path.join(os.getcwd(), checkpoint_suffix))
             hydra_logger.info(
                 f"Trainer finished training sklearn model for {cfg.trainer.train_epochs} epochs!"
             )
-            self.model_class.save_model(os.path.join(os.getcwd(), "final_model"))
+            self.save_checkpoint(os.path.join(os.getcwd(), "final_model"))
+        return
+
+    def save_checkpoint(self, checkpoint_path: str):
+        self.model_class.save_model(checkpoint_path)
+        # Label names of the predicted class ids, needed by the inference mode.
+        self.label_vocabulary.save(os.path.join(checkpoint_path, "labels.json"))
         return
 
     def run_sklearn_validation_epoch(
-        self, valid_reader: SklearnTextClassificationReader
+        self, valid_reader: SklearnTextClassificationReader, current_epoch: int = 0
     ):
-        for valid_minibatch in valid_reader:
-            paper_features, paper_labels, _ = valid_minibatch
-            predicted_labels = self.model_class(
-                paper_features, return_predicted_labels=True
+        valid_minibatches = MinibatchPrefetcher(
+            valid_reader, self.full_config.trainer.prefetch_depth
+        )
+        self.model_class.set_training_mode(False)
+        self.pending_valid_paper = None
+        for valid_minibatch in valid_minibatches:
+            paper_features, paper_labels, paper_ids, paper_offsets = valid_minibatch
+            transformed_features = self.model_class(paper_features)
+            predicted_labels = self.model_class.predict_from_features(
+                transformed_features
             )
             paper_labels = np.array(paper_labels, dtype=np.int32)
             self.valid_metrics(predicted_labels, paper_labels)
+            self.log_paper_metrics_on_validation_minibatch(
+                transformed_features,
+                predicted_labels,
+                paper_labels,
+                paper_ids,
+                paper_offsets,
+            )
+        self.log_pending_valid_paper_metrics()
         epoch_summary_valid_metrics = (
             self.valid_metrics.compute_global_metric_performance()
         )
         hydra_logger.info(
             f"Validation metrics summary: P = {epoch_summary_valid_metrics['precision'].item()} R = {epoch_summary_valid_metrics['recall'].item()} F1 = {epoch_summary_valid_metrics['f1'].item()} Acc = {epoch_summary_valid_metrics['accuracy'].item()}"
         )
+        epoch_summary_valid_paper_metrics = (
+            self.valid_paper_metrics.compute_global_metric_performance()
+        )
+        hydra_logger.info(
+            f"Validation paper-level metrics summary: P = {epoch_summary_valid_paper_metrics['precision'].item()} R = {epoch_summary_valid_paper_metrics['recall'].item()} F1 = {epoch_summary_valid_paper_metrics['f1'].item()} Acc = {epoch_summary_valid_paper_metrics['accuracy'].item()}"
+        )
+        mlflow.log_metrics(
+            {
+                "valid_sentence_accuracy": epoch_summary_valid_metrics[
+                    "accuracy"
+                ].item(),
+                "valid_paper_accuracy": epoch_summary_valid_paper_metrics[
+                    "accuracy"
+                ].item(),
+            },
+            step=current_epoch,
+        )
+        self.log_reader_wait_stats(valid_minibatches, "valid", current_epoch)
+        self.log_reader_epoch_stats(valid_reader, "valid", current_epoch)
         return
 
-    def run_sklearn_training_epoch(self, train_reader: SklearnTextClassificationReader):
-        for train_minibatch in train_reader:
-            paper_features, paper_labels, _ = train_minibatch
+    def run_sklearn_training_epoch(
+        self, train_reader: SklearnTextClassificationReader, current_epoch: int = 0
+    ):
+        train_minibatches = MinibatchPrefetcher(
+            train_reader, self.full_config.trainer.prefetch_depth
+        )
+        self.model_class.set_training_mode(True)
+        for train_minibatch in train_minibatches:
+            paper_features, paper_labels, _, _ = train_minibatch
             # Run a forward pass on the sklearn model.
             prediction_logits = self.model_class(paper_features)
             self.model_class.compute_loss(prediction_logits, paper_labels)
             if self.full_config.trainer.log_metrics_on_train_set:
-                self.log_metrics_on_training_minibatch(train_minibatch)
+                self.log_metrics_on_training_minibatch(prediction_logits, paper_labels)
         if self.full_config.trainer.log_metrics_on_train_set:
             epoch_summary_train_metrics = (
                 self.train_metrics.compute_global_metric_performance()
@@ -139,19 +187,119 @@ class TextClassificationTrainer:
             hydra_logger.info(
                 f"Training metrics summary: P = {epoch_summary_train_metrics['precision'].item()} R = {epoch_summary_train_metrics['recall'].item()} F1 = {epoch_summary_train_metrics['f1'].item()} Acc = {epoch_summary_train_metrics['accuracy'].item()}"
             )
+        self.log_reader_wait_stats(train_minibatches, "train", current_epoch)
+        self.log_reader_epoch_stats(train_reader, "train", current_epoch)
         return
 
-    def log_metrics_on_training_minibatch(
-        self, train_minibatch: Tuple[Any, list, list]
+    def log_reader_wait_stats(
+        self, minibatches: MinibatchPrefetcher, dataset_type: str, current_epoch: int
+    ):
+        # Time the trainer spent blocked on the reader, used to size prefetch_depth.
+        wait_stats = minibatches.wait_stats
+        hydra_logger.info(
+            f"Waited {wait_stats['wait_seconds']:.3f}s on the {dataset_type} reader over {wait_stats['num_minibatches']} minibatches (max {wait_stats['max_wait_seconds']:.3f}s, prefetch depth {minibatches.prefetch_depth})"
+        )
+        mlflow.log_metrics(
+            {
+                f"{dataset_type}_reader_{stat_name}": stat_value
+                for stat_name, stat_value in wait_stats.items()
+            },
+            step=current_epoch,
+        )
+        return
+
+    def log_reader_epoch_stats(
+        self,
+        reader: SklearnTextClassificationReader,
+        dataset_type: str,
+        current_epoch: int,
     ):
-        paper_features, paper_labels, _ = train_minibatch
-        predicted_labels = self.model_class(
-            paper_features, return_predicted_labels=True
+        epoch_stats = reader.epoch_stats
+        hydra_logger.info(
+            f"Read {epoch_stats['num_papers']} papers ({epoch_stats['num_sentences']} sentences, {epoch_stats['num_nonzeros']} non zeros) in {epoch_stats['num_minibatches']} minibatches from the {dataset_type} reader, skipped {epoch_stats['num_skipped_papers']} papers"
+        )
+        mlflow.log_metrics(
+            {
+                f"{dataset_type}_epoch_{stat_name}": stat_value
+                for stat_name, stat_value in epoch_stats.items()
+            },
+            step=current_epoch,
         )
+        return
+
+    def log_metrics_on_training_minibatch(
+        self, prediction_logits: Any, paper_labels: List[int]
+    ):
+        # Reuses the preprocessed features of the training forward pass.
+        predicted_labels = self.model_class.predict_from_features(prediction_logits)
         paper_labels = np.array(paper_labels, dtype=np.int32)
         self.train_metrics(predicted_labels, paper_labels)
         return
 
+    def log_paper_metrics_on_validation_minibatch(
+        self,
+        transformed_features: Any,
+        predicted_labels: np.ndarray,
+        paper_labels: np.ndarray,
+        paper_ids: List[str],
+        paper_offsets: np.ndarray,
+    ):
+        # Papers without sentences have no predictions and are left out.
+        nonempty_papers = get_nonempty_papers_mask(paper_offsets)
+        paper_scores = self.model_class.predict_paper_scores_from_features(
+            transformed_features,
+            paper_offsets,
+            self.full_config.trainer.paper_aggregation,
+            predicted_labels,
+        )
+        if self.full_config.trainer.paper_aggregation == "mean-proba":
+            # Score sums keep the argmax of the averages and add up over the chunks
+            # of a paper split by the batch budget.
+            paper_scores = paper_scores * np.diff(paper_offsets)[:, np.newaxis]
+        paper_ids = [
+            paper_id
+            for paper_id, is_nonempty in zip(paper_ids, nonempty_papers)
+            if is_nonempty
+        ]
+        paper_scores = paper_scores[nonempty_papers]
+        # Every sentence row carries the label of its paper.
+        paper_labels = paper_labels[paper_offsets[:-1][nonempty_papers]]
+        if not paper_ids:
+            return
+        # Chunks of a split paper are consecutive, the first chunk may continue the
+        # last paper of the previous minibatch.
+        if (
+            self.pending_valid_paper is not None
+            and self.pending_valid_paper[0] == paper_ids[0]
+        ):
+            paper_scores[0] += self.pending_valid_paper[1]
+        else:
+            self.log_pending_valid_paper_metrics()
+        complete_papers = np.ones(len(paper_ids), dtype=bool)
+        for paper_position in range(1, len(paper_ids)):
+            if paper_ids[paper_position] == paper_ids[paper_position - 1]:
+                paper_scores[paper_position] += paper_scores[paper_position - 1]
+                complete_papers[paper_position - 1] = False
+        # The last paper may continue in the next minibatch.
+        complete_papers[-1] = False
+        self.pending_valid_paper = (paper_ids[-1], paper_scores[-1], paper_labels[-1])
+        if complete_papers.any():
+            self.valid_paper_metrics(
+                paper_scores[complete_papers].argmax(axis=1),
+                paper_labels[complete_papers],
+            )
+        return
+
+    def log_pending_valid_paper_metrics(self):
+        if self.pending_valid_paper is not None:
+            _, pending_scores, pending_label = self.pending_valid_paper
+            self.valid_paper_metrics(
+                pending_scores[np.newaxis].argmax(axis=1),
+                np.array([pending_label], dtype=np.int32),
+            )
+            self.pending_valid_paper = None
+        return
+
     def run_tensorflow_training_loop(self, cfg: DictConfig):
         raise NotImplementedError("Insert full trainer logic for tensorflow here!")
 
@@ -161,7 +309,10 @@ class TextClassificationTrainer:
                 cfg.data, "train", cfg.experiment_seed
             )
             valid_reader = SklearnTextClassificationReader(
-                cfg.data, "valid", cfg.experiment_seed
+                cfg.data,
+                "valid",
+                cfg.experiment_seed,
+                label_vocabulary=train_reader.label_vocabulary,
             )
         else:
             raise NotImplementedError(
@@ -173,7 +324,14 @@ class TextClassificationTrainer:
         self, model_framework: str, cfg: DictConfig, mock_class_ids: List[int]
     ):
         if model_framework == "sklearn":
-            model_class = SklearnTextClassifier(cfg.models, mock_class_ids)
+            model_class = SklearnTextClassifier(
+                cfg.models,
+                mock_class_ids,
+                OmegaConf.to_container(
+                    cfg.data.sklearn_feature_extraction.hashing_vectorizer,
+                    resolve=True,
+                ),
+            )
         else:
             raise NotImplementedError(
                 f"Model class framework {model_framework} for text classification not implemented!"
@@ -3,13 +3,20 @@ from typing import List
 
 
 def get_all_classes_for_text_classification(data_path: str) -> List[str]:
-    # Yield the contents of one research paper at a time.
-    paper_folders = listdir(data_path)
-    paper_categories = set()
-    for current_paper_folder in paper_folders:
-        if current_paper_folder.startswith("."):
-            continue
-        category_paper = current_paper_folder.split("_")[0]
-        if category_paper not in paper_categories:
-            paper_categories.add(category_paper)
-    return list(paper_categories)
+    paper_folders = [
+        paper_folder
+        for paper_folder in listdir(data_path)
+        if not paper_folder.startswith(".")
+    ]
+    return get_categories_of_paper_folders(paper_folders)
+
+
+def get_categories_of_paper_folders(paper_folders: List[str]) -> List[str]:
+    # Sorted, so label ids are the same across runs and dataset partitions.
+    return sorted(
+        set(get_paper_folder_category(paper_folder) for paper_folder in paper_folders)
+    )
+
+
+def get_paper_folder_category(paper_folder: str) -> str:
+    return paper_folder.split("_")[0]
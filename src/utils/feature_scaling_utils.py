@@ -0,0 +1,69 @@
+from typing import Any
+
+import numpy as np
+from scipy.sparse import issparse
+from sklearn.preprocessing import StandardScaler
+
+
+class StreamingScalerStatistics:
+    # Count, sum and sum of squares of every feature column over the training
+    # minibatches seen so far. Sparse minibatches only update the columns they hold,
+    # StandardScaler.partial_fit would update all hashed columns on every call.
+    def __init__(self, num_features: int):
+        self.num_samples = 0
+        self.column_sums = np.zeros(num_features, dtype=np.float64)
+        self.column_squared_sums = np.zeros(num_features, dtype=np.float64)
+
+    def update(self, input_data: Any) -> np.ndarray:
+        # Returns the ids of the columns updated by the minibatch.
+        self.num_samples += input_data.shape[0]
+        if issparse(input_data):
+            input_data = input_data.tocsr()
+            column_ids, column_positions = np.unique(
+                input_data.indices, return_inverse=True
+            )
+            column_values = input_data.data.astype(np.float64, copy=False)
+            self.column_sums[column_ids] += np.bincount(
+                column_positions, weights=column_values, minlength=len(column_ids)
+            )
+            self.column_squared_sums[column_ids] += np.bincount(
+                column_positions,
+                weights=column_values * column_values,
+                minlength=len(column_ids),
+            )
+            return column_ids
+        input_data = np.asarray(input_data, dtype=np.float64)
+        self.column_sums += input_data.sum(axis=0)
+        self.column_squared_sums += (input_data * input_data).sum(axis=0)
+        return np.arange(len(self.column_sums))
+
+    def update_scaler(
+        self, standard_scaler: StandardScaler, column_ids: Any = slice(None)
+    ) -> None:
+        # Sets the fitted attributes of the scaler for column_ids, only the columns
+        # of a minibatch are needed to transform it.
+        if not hasattr(standard_scaler, "scale_"):
+            num_features = len(self.column_sums)
+            standard_scaler.n_features_in_ = num_features
+            standard_scaler.mean_ = np.zeros(num_features, dtype=np.float64)
+            standard_scaler.var_ = np.zeros(num_features, dtype=np.float64)
+            standard_scaler.scale_ = np.ones(num_features, dtype=np.float64)
+        standard_scaler.n_samples_seen_ = self.num_samples
+        column_means = self.column_sums[column_ids] / self.num_samples
+        column_vars = np.maximum(
+            self.column_squared_sums[column_ids] / self.num_samples
+            - column_means * column_means,
+            0.0,
+        )
+        standard_scaler.mean_[column_ids] = column_means
+        standard_scaler.var_[column_ids] = column_vars
+        if standard_scaler.with_std:
+            # Constant columns keep a scale of 1, like StandardScaler. The bound
+            # absorbs the cancellation error of non zero constant columns.
+            constant_columns = column_vars <= 10 * np.finfo(np.float64).eps * (
+                column_means * column_means
+            )
+            standard_scaler.scale_[column_ids] = np.where(
+                constant_columns, 1.0, np.sqrt(column_vars)
+            )
+        return
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def create_paper_offsets(paper_num_sentences) -> np.ndarray:
+    # Sentence rows of paper i are rows paper_offsets[i]:paper_offsets[i + 1].
+    paper_offsets = np.zeros(len(paper_num_sentences) + 1, dtype=np.int64)
+    np.cumsum(paper_num_sentences, out=paper_offsets[1:])
+    return paper_offsets
+
+
+def get_nonempty_papers_mask(paper_offsets: np.ndarray) -> np.ndarray:
+    return np.diff(paper_offsets) > 0
+
+
+def sum_sentence_rows_per_paper(
+    sentence_rows: np.ndarray, paper_offsets: np.ndarray
+) -> np.ndarray:
+    # Segment sums over the sentence axis, papers without sentences sum to 0.
+    nonempty_papers = get_nonempty_papers_mask(paper_offsets)
+    paper_sums = np.zeros(
+        (len(nonempty_papers),) + sentence_rows.shape[1:], dtype=sentence_rows.dtype
+    )
+    if nonempty_papers.any():
+        # reduceat reads empty segments as a single row, so only the starts of non
+        # empty papers are passed. Each segment then ends where the next one starts.
+        paper_sums[nonempty_papers] = np.add.reduceat(
+            sentence_rows, paper_offsets[:-1][nonempty_papers], axis=0
+        )
+    return paper_sums
+
+
+def average_sentence_scores_per_paper(
+    sentence_scores: np.ndarray, paper_offsets: np.ndarray
+) -> np.ndarray:
+    paper_num_sentences = np.diff(paper_offsets)
+    paper_score_sums = sum_sentence_rows_per_paper(
+        sentence_scores.astype(np.float64, copy=False), paper_offsets
+    )
+    return paper_score_sums / np.maximum(paper_num_sentences, 1)[:, np.newaxis]
+
+
+def count_sentence_label_votes_per_paper(
+    sentence_label_ids: np.ndarray, paper_offsets: np.ndarray, num_labels: int
+) -> np.ndarray:
+    # Returns a [num_papers, num_labels] matrix of sentence predictions per paper.
+    sentence_label_votes = np.zeros(
+        (len(sentence_label_ids), num_labels), dtype=np.int64
+    )
+    sentence_label_votes[np.arange(len(sentence_label_ids)), sentence_label_ids] = 1
+    return sum_sentence_rows_per_paper(sentence_label_votes, paper_offsets)
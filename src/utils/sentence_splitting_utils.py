@@ -0,0 +1,41 @@
+import re
+from typing import IO, Iterator, Optional
+
+# Sentences are the runs of text between the punctuation marks [.!?], the same
+# pieces re.split("[.!?]", text) returns. Pieces made only of spaces are dropped.
+SENTENCE_DELIMITERS = ".!?"
+SENTENCE_REGEX = re.compile("[^.!?]+")
+NON_SPACE_REGEX = re.compile("[^ ]")
+
+
+def iterate_sentences_in_text(
+    text: str, start_position: int = 0, end_position: Optional[int] = None
+) -> Iterator[str]:
+    if end_position is None:
+        end_position = len(text)
+    for sentence_match in SENTENCE_REGEX.finditer(text, start_position, end_position):
+        # Checked in place, blank pieces are never copied out of the text.
+        if NON_SPACE_REGEX.search(text, sentence_match.start(), sentence_match.end()):
+            yield sentence_match.group()
+
+
+def iterate_sentences_in_file(
+    file_object: IO[str], chunk_size: int = 1 << 16
+) -> Iterator[str]:
+    # Reads chunk_size characters at a time. Only the unfinished sentence at the end
+    # of a chunk is carried over, so memory does not grow with the file length.
+    unfinished_sentence = ""
+    while True:
+        file_chunk = file_object.read(chunk_size)
+        if not file_chunk:
+            break
+        text = unfinished_sentence + file_chunk
+        last_delimiter_position = max(
+            text.rfind(delimiter) for delimiter in SENTENCE_DELIMITERS
+        )
+        if last_delimiter_position == -1:
+            unfinished_sentence = text
+            continue
+        yield from iterate_sentences_in_text(text, 0, last_delimiter_position)
+        unfinished_sentence = text[last_delimiter_position + 1 :]
+    yield from iterate_sentences_in_text(unfinished_sentence)
@@ -1,14 +1,219 @@
-from json import loads, dump
-from typing import Any, Dict
+import gzip
+import io
+import sqlite3
+from abc import ABC, abstractmethod
+from json import loads, dump, dumps
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+
+def open_jsonl_file(jsonl_file_path: str, mode: str, buffer_size: int = -1) -> IO[str]:
+    # Files ending in .gz are read and written through stdlib gzip, with the same
+    # buffer in front of the compressor as plain files have in front of the disk.
+    if jsonl_file_path.endswith(".gz"):
+        if buffer_size < 1:
+            buffer_size = io.DEFAULT_BUFFER_SIZE
+        gzip_file = gzip.open(jsonl_file_path, f"{mode}b")
+        buffered_class = io.BufferedReader if mode == "r" else io.BufferedWriter
+        return io.TextIOWrapper(
+            buffered_class(gzip_file, buffer_size), encoding="utf-8"
+        )
+    return open(jsonl_file_path, mode, buffering=buffer_size)
 
 
 def get_jsonl_reader_iterator(jsonl_file_path: str):
-    with open(jsonl_file_path, "r") as file_object:
+    with open_jsonl_file(jsonl_file_path, "r") as file_object:
         for current_paper_summary in file_object:
             yield loads(current_paper_summary)
 
 
 def write_dict_to_json_file(json_output_path: str, input_dict: Dict[str, Any]):
     with open(json_output_path, "w") as file_object:
-        dump(input_dict, file_object)
+        write_json_value(file_object, input_dict)
+    return
+
+
+def write_json_value(file_object: IO[str], json_value: Any) -> None:
+    # Writes the same text as json.dump, spilled containers are streamed from disk.
+    if isinstance(json_value, SpilledJsonContainer):
+        json_value.write_json(file_object)
+    elif isinstance(json_value, dict):
+        file_object.write("{")
+        for item_position, (key, value) in enumerate(json_value.items()):
+            if item_position:
+                file_object.write(", ")
+            file_object.write(f"{dumps(get_json_object_key(key))}: ")
+            write_json_value(file_object, value)
+        file_object.write("}")
+    else:
+        dump(json_value, file_object)
     return
+
+
+def get_json_object_key(key: Any) -> str:
+    # Same coercion of object keys as json.dump, scalar keys are written as their json.
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return dumps(key)
+    raise TypeError(
+        f"Keys must be str, int, float, bool or None, not {type(key).__name__}!"
+    )
+
+
+def close_spilled_json_containers(json_value: Any) -> None:
+    # Deletes the temporary databases of the spilled containers nested in json_value.
+    if isinstance(json_value, SpilledJsonContainer):
+        json_value.close()
+    elif isinstance(json_value, dict):
+        for value in json_value.values():
+            close_spilled_json_containers(value)
+    return
+
+
+class JsonlWriter:
+    # Appends records to a jsonl file kept open for the whole run. Writes go through
+    # a buffer of buffer_size bytes, which is flushed every flush_every_records
+    # records and when the writer is closed, also when the run fails.
+    def __init__(
+        self,
+        jsonl_file_path: str,
+        buffer_size: int = 1 << 20,
+        flush_every_records: int = 1000,
+    ):
+        self.jsonl_file_path = jsonl_file_path
+        self.buffer_size = buffer_size
+        self.flush_every_records = flush_every_records
+        self.num_unflushed_records = 0
+        self.file_object = None
+
+    def __enter__(self):
+        self.file_object = open_jsonl_file(self.jsonl_file_path, "a", self.buffer_size)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file_object.close()
+        self.file_object = None
+        return False
+
+    def write_record(self, record: Dict[str, Any]) -> None:
+        self.write_serialized_record(dumps(record))
+        return
+
+    def write_serialized_record(self, serialized_record: str) -> None:
+        self.file_object.write(serialized_record)
+        self.file_object.write("\n")
+        self.num_unflushed_records += 1
+        if self.num_unflushed_records >= self.flush_every_records:
+            self.file_object.flush()
+            self.num_unflushed_records = 0
+        return
+
+
+class SpilledJsonContainer(ABC):
+    # Entries of a JSON list or object kept in a private temporary SQLite database
+    # on disk instead of in memory, in insertion order. Entries are serialized when
+    # added and inserted in batches of flush_every_entries. The database is deleted
+    # when the container is closed.
+    def __init__(self, flush_every_entries: int = 1000):
+        # An empty path opens a database file which is deleted when it is closed.
+        self.connection = sqlite3.connect("")
+        self.connection.execute("""
+            CREATE TABLE entries (
+                position INTEGER PRIMARY KEY,
+                entry_key TEXT UNIQUE,
+                entry_json TEXT NOT NULL
+            )
+            """)
+        self.flush_every_entries = flush_every_entries
+        self.pending_entries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        self.pending_entries.clear()
+        self.connection.close()
+        return
+
+    def add_entry(self, entry_key: Optional[str], entry_value: Any) -> None:
+        self.pending_entries.append((entry_key, dumps(entry_value)))
+        if len(self.pending_entries) >= self.flush_every_entries:
+            self.flush()
+        return
+
+    def flush(self) -> None:
+        # Adding a key again replaces its value and keeps its first position, list
+        # entries have no key and never conflict.
+        with self.connection:
+            self.connection.executemany(
+                """
+                INSERT INTO entries (entry_key, entry_json) VALUES (?, ?)
+                ON CONFLICT (entry_key) DO UPDATE SET entry_json = excluded.entry_json
+                """,
+                self.pending_entries,
+            )
+        self.pending_entries.clear()
+        return
+
+    def iterate_serialized_entries(self) -> Iterator[Tuple[Optional[str], str]]:
+        self.flush()
+        yield from self.connection.execute(
+            "SELECT entry_key, entry_json FROM entries ORDER BY position"
+        )
+
+    def __len__(self) -> int:
+        self.flush()
+        (num_entries,) = self.connection.execute(
+            "SELECT COUNT(*) FROM entries"
+        ).fetchone()
+        return num_entries
+
+    @abstractmethod
+    def write_json(self, file_object: IO[str]) -> None:
+        pass
+
+
+class SpilledJsonList(SpilledJsonContainer):
+    def append(self, entry_value: Any) -> None:
+        self.add_entry(None, entry_value)
+        return
+
+    def __iter__(self) -> Iterator[Any]:
+        for _, entry_json in self.iterate_serialized_entries():
+            yield loads(entry_json)
+
+    def write_json(self, file_object: IO[str]) -> None:
+        file_object.write("[")
+        for entry_position, (_, entry_json) in enumerate(
+            self.iterate_serialized_entries()
+        ):
+            if entry_position:
+                file_object.write(", ")
+            file_object.write(entry_json)
+        file_object.write("]")
+        return
+
+
+class SpilledJsonDict(SpilledJsonContainer):
+    def __setitem__(self, entry_key: str, entry_value: Any) -> None:
+        self.add_entry(get_json_object_key(entry_key), entry_value)
+        return
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for entry_key, entry_json in self.iterate_serialized_entries():
+            yield entry_key, loads(entry_json)
+
+    def write_json(self, file_object: IO[str]) -> None:
+        file_object.write("{")
+        for entry_position, (entry_key, entry_json) in enumerate(
+            self.iterate_serialized_entries()
+        ):
+            if entry_position:
+                file_object.write(", ")
+            file_object.write(f"{dumps(entry_key)}: {entry_json}")
+        file_object.write("}")
+        return
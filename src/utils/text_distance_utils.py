@@ -0,0 +1,88 @@
+def reaches_levenshtein_similarity_threshold(
+    first_sequence: str, second_sequence: str, similarity_threshold: float
+) -> bool:
+    # Exact equivalent of
+    # textdistance.levenshtein.normalized_similarity(a, b) >= similarity_threshold
+    # that skips pairs whose length difference alone rules out the threshold and
+    # stops computing the edit distance once it exceeds the allowed budget.
+    maximum_length = max(len(first_sequence), len(second_sequence))
+    if maximum_length == 0:
+        return 1 >= similarity_threshold
+    length_difference = abs(len(first_sequence) - len(second_sequence))
+    # The edit distance is never below the length difference.
+    if 1 - length_difference / maximum_length < similarity_threshold:
+        return False
+    max_distance = find_max_distance_for_similarity_threshold(
+        maximum_length, similarity_threshold
+    )
+    return (
+        bounded_levenshtein_distance(first_sequence, second_sequence, max_distance)
+        <= max_distance
+    )
+
+
+def find_max_distance_for_similarity_threshold(
+    maximum_length: int, similarity_threshold: float
+) -> int:
+    # Largest distance d with 1 - d / maximum_length >= similarity_threshold, evaluated
+    # with the same floating point expression as the normalized similarity.
+    max_distance = max(int((1 - similarity_threshold) * maximum_length), 0)
+    while (
+        max_distance < maximum_length
+        and 1 - (max_distance + 1) / maximum_length >= similarity_threshold
+    ):
+        max_distance += 1
+    while (
+        max_distance >= 0 and 1 - max_distance / maximum_length < similarity_threshold
+    ):
+        max_distance -= 1
+    return max_distance
+
+
+def bounded_levenshtein_distance(
+    first_sequence: str, second_sequence: str, max_distance: int
+) -> int:
+    # Levenshtein distance restricted to the diagonal band of width max_distance.
+    # Returns max_distance + 1 as soon as the distance is known to exceed the bound.
+    out_of_bound = max_distance + 1
+    if max_distance < 0:
+        return out_of_bound
+    if first_sequence == second_sequence:
+        return 0
+    if len(first_sequence) > len(second_sequence):
+        first_sequence, second_sequence = second_sequence, first_sequence
+    first_length = len(first_sequence)
+    second_length = len(second_sequence)
+    if second_length - first_length > max_distance:
+        return out_of_bound
+    previous_row = [
+        column if column <= max_distance else out_of_bound
+        for column in range(second_length + 1)
+    ]
+    for row in range(1, first_length + 1):
+        current_row = [out_of_bound] * (second_length + 1)
+        if row <= max_distance:
+            current_row[0] = row
+        band_start = max(1, row - max_distance)
+        band_end = min(second_length, row + max_distance)
+        first_char = first_sequence[row - 1]
+        row_minimum = current_row[band_start - 1]
+        for column in range(band_start, band_end + 1):
+            substitution_cost = previous_row[column - 1] + (
+                first_char != second_sequence[column - 1]
+            )
+            cell_distance = min(
+                previous_row[column] + 1,
+                current_row[column - 1] + 1,
+                substitution_cost,
+            )
+            if cell_distance > max_distance:
+                cell_distance = out_of_bound
+            current_row[column] = cell_distance
+            if cell_distance < row_minimum:
+                row_minimum = cell_distance
+        if row_minimum > max_distance:
+            # Every alignment goes through this row, the bound is already exceeded.
+            return out_of_bound
+        previous_row = current_row
+    return previous_row[second_length]